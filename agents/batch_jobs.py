@@ -0,0 +1,439 @@
+"""
+Offline batch-job submission for overnight screens
+
+Prompts are rendered to a JSONL job file, submitted through a provider batch
+interface and polled until done. Job state lives on disk under
+BATCH_JOBS_DIR/<job_id>/, so a job can be resumed by ID after a restart:
+
+    manifest.json    job metadata (provider, provider job id, model, status)
+    requests.jsonl   one {"key", "prompt", "acquirer_data", "target_data"} per deal
+    results.jsonl    parsed analyses, appended as they are streamed back
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+
+import requests
+
+from agents.llm_backends import GeminiBackend, QuotaExceededError
+from utils.profiling import profile_run
+
+
+def get_jobs_dir():
+    return os.getenv('BATCH_JOBS_DIR', 'batch_jobs')
+
+
+def _read_jsonl(path):
+    """
+    Rows of a JSONL file
+
+    A crash mid-append leaves a torn last line without its newline; it is
+    skipped here and cut off by _truncate_torn_tail before the next append.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn line an older run appended onto; the rest is intact
+                continue
+
+
+def _truncate_torn_tail(path):
+    """Cut a torn last line off a JSONL file so appends start on a fresh line"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        data = f.read()
+    valid_bytes = data.rfind(b'\n') + 1
+    if valid_bytes != len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(valid_bytes)
+
+
+def _write_json(path, data):
+    """Write JSON atomically so a crash never leaves a half-written file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BatchProvider(ABC):
+    """
+    Interface for provider batch APIs
+
+    submit() takes a job's requests.jsonl and returns a provider job ID;
+    status() returns 'pending', 'running', 'succeeded' or 'failed';
+    iter_outputs() yields {"key", "text"} or {"key", "error"} dicts once done.
+    """
+    name = 'base'
+
+    @abstractmethod
+    def submit(self, job_dir, model_name, generation_config):
+        """Submit the job in job_dir and return its provider job ID"""
+
+    @abstractmethod
+    def status(self, provider_job_id):
+        """Return 'pending', 'running', 'succeeded' or 'failed'"""
+
+    @abstractmethod
+    def iter_outputs(self, provider_job_id):
+        """Yield {"key", "text"} or {"key", "error"} dicts for a finished job"""
+
+
+class LocalBatchProvider(BatchProvider):
+    """
+    Local stand-in for a provider batch API
+
+    Runs the job through an LLMBackend on a background thread and writes
+    outputs next to the job. A job interrupted by a restart carries on from
+    the first request without an output the next time its status is polled.
+    The provider job ID is the job directory's absolute path, so a job can
+    be resumed from any working directory.
+    """
+    name = 'local'
+
+    def __init__(self, backend, scheduler=None):
+        self.backend = backend
+        # Batch work runs in the bulk lane of the analyzer's scheduler
+        self.scheduler = scheduler
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_dir, model_name, generation_config):
+        _write_json(os.path.join(job_dir, 'provider_state.json'), {
+            "state": "running",
+            "model": model_name,
+            "generation_config": generation_config
+        })
+        job_dir = os.path.abspath(job_dir)
+        self._start(job_dir)
+        return job_dir
+
+    def status(self, provider_job_id):
+        state = self._read_state(provider_job_id)
+        if state['state'] == 'running':
+            self._start(provider_job_id)
+        return state['state']
+
+    def iter_outputs(self, provider_job_id):
+        return _read_jsonl(os.path.join(provider_job_id, 'provider_output.jsonl'))
+
+    def _read_state(self, job_dir):
+        with open(os.path.join(job_dir, 'provider_state.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _start(self, job_dir):
+        with self._lock:
+            thread = self._threads.get(job_dir)
+            if thread and thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, args=(job_dir,), daemon=True)
+            self._threads[job_dir] = thread
+            thread.start()
+
+    def _run(self, job_dir):
+        state = self._read_state(job_dir)
+        output_path = os.path.join(job_dir, 'provider_output.jsonl')
+        _truncate_torn_tail(output_path)
+        done = {row['key'] for row in _read_jsonl(output_path)}
+        # Identical prompts within a job are generated once
+        by_prompt = {}
+
+        with profile_run(f"batch-{os.path.basename(job_dir)}") as profiler:
+            with open(output_path, 'a', encoding='utf-8') as out:
+                for row in _read_jsonl(os.path.join(job_dir, 'requests.jsonl')):
+                    if row['key'] in done:
+                        continue
+                    output = by_prompt.get(row['prompt'])
+                    if output is None or 'error' in output:
+                        output = self._generate(state, row)
+                        by_prompt[row['prompt']] = output
+                    out.write(json.dumps(dict(output, key=row['key'])) + "\n")
+                    out.flush()
+
+        state['state'] = 'succeeded'
+        if profiler:
+            state['profile'] = profiler.artifacts
+        _write_json(os.path.join(job_dir, 'provider_state.json'), state)
+
+    def _generate(self, state, row, attempts=3):
+        """Generate one output, backing off and retrying on quota errors"""
+        for attempt in range(attempts):
+            try:
+                with self.scheduler.slot('bulk') if self.scheduler else nullcontext():
+                    text = self.backend.generate(state['model'], row['prompt'], state['generation_config'])
+                return {"key": row['key'], "text": text}
+            except QuotaExceededError as e:
+                error = e
+                if attempt < attempts - 1:
+                    time.sleep(min(30, 2 ** attempt))
+            except Exception as e:
+                return {"key": row['key'], "error": str(e)}
+
+        return {"key": row['key'], "error": str(error)}
+
+
+class GeminiBatchProvider(BatchProvider):
+    """Gemini Batch API (batchGenerateContent) with inlined requests"""
+    name = 'gemini'
+
+    API_BASE = 'https://generativelanguage.googleapis.com/v1beta'
+
+    STATES = {
+        'BATCH_STATE_PENDING': 'pending',
+        'BATCH_STATE_RUNNING': 'running',
+        'BATCH_STATE_SUCCEEDED': 'succeeded',
+        'BATCH_STATE_FAILED': 'failed',
+        'BATCH_STATE_CANCELLED': 'failed',
+        'BATCH_STATE_EXPIRED': 'failed'
+    }
+
+    def __init__(self, api_key=None, timeout=60):
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("Gemini API key not found. Set GEMINI_API_KEY environment variable.")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['x-goog-api-key'] = self.api_key
+
+    def submit(self, job_dir, model_name, generation_config):
+        config = {_camel_case(k): v for k, v in (generation_config or {}).items()}
+        batch_requests = [
+            {
+                "request": {
+                    "contents": [{"parts": [{"text": row['prompt']}]}],
+                    "generationConfig": config
+                },
+                "metadata": {"key": row['key']}
+            }
+            for row in _read_jsonl(os.path.join(job_dir, 'requests.jsonl'))
+        ]
+
+        response = self.session.post(
+            f"{self.API_BASE}/{model_name}:batchGenerateContent",
+            json={
+                "batch": {
+                    "display_name": os.path.basename(job_dir),
+                    "input_config": {"requests": {"requests": batch_requests}}
+                }
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()['name']
+
+    def _get(self, provider_job_id):
+        response = self.session.get(f"{self.API_BASE}/{provider_job_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, provider_job_id):
+        state = self._get(provider_job_id).get('metadata', {}).get('state', 'BATCH_STATE_PENDING')
+        return self.STATES.get(state, 'running')
+
+    def iter_outputs(self, provider_job_id):
+        operation = self._get(provider_job_id)
+        inlined = operation.get('response', {}).get('inlinedResponses', {}).get('inlinedResponses', [])
+
+        for item in inlined:
+            key = item.get('metadata', {}).get('key')
+            if 'error' in item:
+                yield {"key": key, "error": item['error'].get('message', str(item['error']))}
+                continue
+            try:
+                parts = item['response']['candidates'][0]['content']['parts']
+                yield {"key": key, "text": "".join(part.get('text', '') for part in parts)}
+            except (KeyError, IndexError):
+                yield {"key": key, "error": "Empty response from batch"}
+
+
+def _camel_case(name):
+    head, *rest = name.split('_')
+    return head + ''.join(word.title() for word in rest)
+
+
+def get_batch_provider(name, backend, api_key=None, scheduler=None):
+    """
+    Build a batch provider by name
+
+    Args:
+        name: 'gemini', 'local' or None (gemini for the Gemini SDK backend, else local)
+        backend: LLMBackend used by the local provider
+        api_key: Gemini API key
+        scheduler: PriorityScheduler the local provider shares with interactive work
+    """
+    if name is None:
+        name = os.getenv('BATCH_PROVIDER') or ('gemini' if isinstance(backend, GeminiBackend) else 'local')
+
+    if name == 'gemini':
+        return GeminiBatchProvider(api_key=api_key)
+    if name == 'local':
+        return LocalBatchProvider(backend, scheduler=scheduler)
+
+    raise ValueError(f"Unknown batch provider '{name}'. Use gemini or local.")
+
+
+class BatchJobManager:
+    def __init__(self, analyzer, jobs_dir=None):
+        """
+        Submit, poll and stream results of analyzer batch jobs
+
+        Args:
+            analyzer: GeminiAnalyzer used to render prompts and parse results
+            jobs_dir: Root directory for job state (or set BATCH_JOBS_DIR)
+        """
+        self.analyzer = analyzer
+        self.jobs_dir = jobs_dir or get_jobs_dir()
+        self._providers = {}
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _provider(self, name):
+        if name not in self._providers:
+            self._providers[name] = get_batch_provider(
+                name, self.analyzer.backend, self.analyzer.api_key, scheduler=self.analyzer.scheduler
+            )
+        return self._providers[name]
+
+    def _provider_job_id(self, manifest):
+        # Local jobs submitted before provider IDs were absolute hold a path relative to the old cwd
+        if manifest['provider'] == 'local' and not os.path.isabs(manifest['provider_job_id']):
+            return os.path.abspath(self._job_dir(manifest['job_id']))
+        return manifest['provider_job_id']
+
+    def load_manifest(self, job_id):
+        path = os.path.join(self._job_dir(job_id), 'manifest.json')
+        if not os.path.exists(path):
+            raise ValueError(f"Batch job '{job_id}' not found in {self.jobs_dir}")
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def submit(self, deals, provider=None, model_name=None):
+        """
+        Render prompts for deals and submit them as one batch job
+
+        Args:
+            deals: List of dicts with acquirer_data, target_data, collected_data
+                   and an optional unique key
+            provider: Batch provider name (see get_batch_provider)
+            model_name: Model to run the batch on (defaults to the first pool model)
+
+        Returns:
+            str: Job ID for status polling and resuming
+        """
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+
+        with open(os.path.join(job_dir, 'requests.jsonl'), 'w', encoding='utf-8') as f:
+            for i, deal in enumerate(deals):
+                row = {
+                    "key": deal.get('key') or f"deal-{i:06d}",
+                    "prompt": self.analyzer.build_prompt(
+                        deal['acquirer_data'], deal['target_data'], deal.get('collected_data', {})
+                    ),
+                    "acquirer_data": deal['acquirer_data'],
+                    "target_data": deal['target_data']
+                }
+                f.write(json.dumps(row) + "\n")
+
+        batch_provider = self._provider(provider)
+        model_name = model_name or self.analyzer.router.model_names[0]
+        manifest = {
+            "job_id": job_id,
+            "provider": batch_provider.name,
+            "model": model_name,
+            "count": len(deals),
+            "status": "submitted",
+            "created": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        _write_json(os.path.join(job_dir, 'manifest.json'), manifest)
+
+        manifest['provider_job_id'] = batch_provider.submit(job_dir, model_name, self.analyzer.generation_config)
+        _write_json(os.path.join(job_dir, 'manifest.json'), manifest)
+
+        print(f"📦 Submitted batch job {job_id}: {len(deals)} deals via {batch_provider.name} ({model_name})")
+        return job_id
+
+    def status(self, job_id):
+        """Return the provider status of a job ('pending', 'running', 'succeeded', 'failed')"""
+        manifest = self.load_manifest(job_id)
+        if manifest['status'] in ('succeeded', 'failed'):
+            return manifest['status']
+
+        status = self._provider(manifest['provider']).status(self._provider_job_id(manifest))
+        if status != manifest['status']:
+            manifest['status'] = status
+            _write_json(os.path.join(self._job_dir(job_id), 'manifest.json'), manifest)
+        return status
+
+    def iter_results(self, job_id, poll_interval=30, timeout=None):
+        """
+        Wait for a job and stream its parsed results
+
+        Results already parsed by an earlier (possibly crashed) run are
+        replayed from results.jsonl before new outputs are parsed.
+
+        Yields:
+            dict: {"key", "acquirer_data", "target_data", "analysis"}
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(job_id)
+            if status in ('succeeded', 'failed'):
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job {job_id} still {status} after {timeout}s")
+            time.sleep(poll_interval)
+
+        manifest = self.load_manifest(job_id)
+        if status == 'failed':
+            raise RuntimeError(f"Batch job {job_id} failed at the provider")
+
+        job_dir = self._job_dir(job_id)
+        results_path = os.path.join(job_dir, 'results.jsonl')
+        _truncate_torn_tail(results_path)
+        seen = set()
+        for result in _read_jsonl(results_path):
+            seen.add(result['key'])
+            yield result
+
+        deals = {row['key']: row for row in _read_jsonl(os.path.join(job_dir, 'requests.jsonl'))}
+        outputs = self._provider(manifest['provider']).iter_outputs(self._provider_job_id(manifest))
+
+        with open(results_path, 'a', encoding='utf-8') as f:
+            for output in outputs:
+                if output['key'] in seen or output['key'] not in deals:
+                    continue
+                deal = deals[output['key']]
+                analysis = self.analyzer.finalize_response(
+                    output.get('text'), deal['acquirer_data'], deal['target_data'], output.get('error')
+                )
+                # Fallback analyses carry a note and no model produced them
+                if not analysis.get('note'):
+                    analysis['model'] = manifest['model']
+                result = {
+                    "key": output['key'],
+                    "acquirer_data": deal['acquirer_data'],
+                    "target_data": deal['target_data'],
+                    "analysis": analysis
+                }
+                f.write(json.dumps(result) + "\n")
+                f.flush()
+                seen.add(output['key'])
+                yield result
@@ -3,25 +3,70 @@ Data collection orchestrator - gathers information from multiple sources
 """
 
 from scrapers.website_scraper import WebsiteScraper
+from utils import metrics
+from utils.fingerprints import content_hash
+from utils.knowledge_base import PROFILE_FIELDS, get_knowledge_base
+from utils.singleflight import SingleFlight
+import os
 import time
 
+# Format of collected_at (and of screening records' completed_at)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class DataCollector:
-    def __init__(self, mode='fast'):
+    def __init__(self, mode='fast', scraper=None, knowledge_base=None, profile_max_age=None):
         """
         Initialize data collector
-        mode: 'fast' or 'deep'
+        mode: 'fast' or 'deep' (deep always scrapes, ignoring stored profiles)
+        scraper: WebsiteScraper to share (a new one is created if omitted)
+        knowledge_base: CompanyKnowledgeBase or CompanySnapshot holding stored
+            profiles (defaults to get_knowledge_base())
+        profile_max_age: Days a stored profile is used instead of scraping
+            (or set PROFILE_MAX_AGE_DAYS, default 30; 0 always scrapes)
         """
         self.mode = mode
-        self.website_scraper = WebsiteScraper()
+        self.website_scraper = scraper or WebsiteScraper()
+        self.knowledge_base = knowledge_base
+        if profile_max_age is None:
+            profile_max_age = float(os.getenv('PROFILE_MAX_AGE_DAYS', '30'))
+        self.profile_max_age = profile_max_age
+        self._inflight = SingleFlight()
     
     def collect_company_data(self, company_name, website=None, industry=None):
         """
         Collect comprehensive company data
         
+        Identical lookups already in progress (e.g. two sessions opening
+        the same example deal) are awaited instead of repeated.
+        
         Returns:
-            dict: Collected company information
+            dict: Collected company information, with a 'fingerprint' of
+            its content
         """
+        return self._inflight.do(
+            (company_name, website, industry),
+            self._collect_company_data,
+            company_name, website, industry
+        )
+    
+    def _stored_profile(self, company_name):
+        """A stored profile recent enough to use instead of scraping, or None"""
+        if self.mode == 'deep' or self.profile_max_age <= 0:
+            return None
+        knowledge_base = self.knowledge_base if self.knowledge_base is not None else get_knowledge_base()
+        profile = knowledge_base.profile(company_name)
+        if not profile:
+            return None
+        try:
+            collected = time.mktime(time.strptime(profile.get('collected_at') or '', TIMESTAMP_FORMAT))
+        except ValueError:
+            return None
+        if time.time() - collected > self.profile_max_age * 86400:
+            return None
+        return profile
+    
+    def _collect_company_data(self, company_name, website, industry):
         data = {
             "name": company_name,
             "industry": industry,
@@ -29,8 +74,15 @@ class DataCollector:
             "data_sources": []
         }
         
-        # Always scrape website in both modes
-        if website:
+        # A recent stored profile (e.g. from a compiled snapshot) saves scraping the website
+        profile = self._stored_profile(company_name)
+        collected_at = time.strftime(TIMESTAMP_FORMAT)
+        if profile:
+            data.update({field: profile.get(field) for field in PROFILE_FIELDS})
+            data["data_sources"].append("knowledge_base")
+            collected_at = profile['collected_at']
+        elif website:
+            # Otherwise scrape the website, in both modes
             try:
                 scraped = self.website_scraper.scrape_company(company_name, website)
                 if scraped.get('scraped_successfully'):
@@ -53,13 +105,23 @@ class DataCollector:
             # - Crunchbase data
             pass
         
+        # Hash of the collected content, to tell when a company's profile changed
+        data["fingerprint"] = content_hash(data)
+        # When the content was gathered; left out of the fingerprint
+        data["collected_at"] = collected_at
+        
         return data
     
     def collect_deal_data(self, acquirer_name, acquirer_website, acquirer_industry,
-                         target_name, target_website, target_industry):
+                         target_name, target_website, target_industry,
+                         progress_callback=None):
         """
         Collect data for both acquirer and target
         
+        Args:
+            progress_callback: Optional callable(stage, detail) notified as
+                each company's collection starts
+        
         Returns:
             dict: Combined data for the deal
         """
@@ -67,22 +129,27 @@ class DataCollector:
         
         # Collect acquirer data
         print(f"  → Scraping acquirer: {acquirer_name}")
-        acquirer_data = self.collect_company_data(
-            acquirer_name, 
-            acquirer_website, 
-            acquirer_industry
-        )
+        if progress_callback:
+            progress_callback('scrape_acquirer', acquirer_name)
+        with metrics.span('ma_stage_seconds', stage='scrape_acquirer'):
+            acquirer_data = self.collect_company_data(
+                acquirer_name, 
+                acquirer_website, 
+                acquirer_industry
+            )
         
-        # Small delay to be respectful to servers
-        time.sleep(1)
+        # Politeness delays are handled by the scraper's per-host rate limiter
         
         # Collect target data
         print(f"  → Scraping target: {target_name}")
-        target_data = self.collect_company_data(
-            target_name,
-            target_website,
-            target_industry
-        )
+        if progress_callback:
+            progress_callback('scrape_target', target_name)
+        with metrics.span('ma_stage_seconds', stage='scrape_target'):
+            target_data = self.collect_company_data(
+                target_name,
+                target_website,
+                target_industry
+            )
         
         return {
             "acquirer": acquirer_data,
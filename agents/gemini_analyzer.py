@@ -2,29 +2,67 @@
 Gemini-powered strategic analysis engine
 """
 
-import google.generativeai as genai
+import contextvars
+import copy
+import hashlib
 import json
 import os
 import re
-from config.prompts import get_analysis_prompt
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.prompts import (
+    PROMPT_VERSION, get_analysis_prompt, get_dimension_prompt, get_dimension_sections, get_prompt_sections
+)
+from config.scoring import DIMENSION_LABELS, DIMENSIONS, get_weights
+from agents.batch_jobs import BatchJobManager
+from agents.llm_backends import get_backend
+from agents.model_router import ModelRouter
+from utils import metrics
+from utils.fingerprints import content_hash
+from utils.response_cache import ResponseCache
+from utils.scheduler import get_scheduler
+from utils.scoring import score_analysis
+from utils.singleflight import SingleFlight
+
+# 'single': one prompt covering every dimension; 'per_dimension': one smaller
+# prompt per dimension, run concurrently and cached independently
+ANALYSIS_MODES = ('single', 'per_dimension')
 
 
 class GeminiAnalyzer:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, router=None, backend=None, scheduler=None,
+                 analysis_mode=None, dimension_cache=None):
         """
         Initialize Gemini analyzer
         
         Args:
             api_key: Google Gemini API key (or set GEMINI_API_KEY env var)
+            router: ModelRouter over the model pool (defaults to GEMINI_MODELS / config.models)
+            backend: LLMBackend to generate with (defaults to LLM_BACKEND, i.e. the Gemini SDK)
+            scheduler: PriorityScheduler gating model calls by lane (defaults to get_scheduler over
+                the pool's total concurrency)
+            analysis_mode: One of ANALYSIS_MODES (defaults to ANALYSIS_MODE, else 'single')
+            dimension_cache: ResponseCache for per-dimension results (defaults to DIMENSION_CACHE_*)
         """
+        self.analysis_mode = analysis_mode or os.getenv('ANALYSIS_MODE', 'single')
+        if self.analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode '{self.analysis_mode}'. Use one of: {', '.join(ANALYSIS_MODES)}")
+        # An empty cache is falsy, so compare with None
+        self.dimension_cache = dimension_cache if dimension_cache is not None else ResponseCache.from_env()
+        
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("Gemini API key not found. Set GEMINI_API_KEY environment variable.")
+        self.backend = backend or get_backend(api_key=self.api_key)
         
-        genai.configure(api_key=self.api_key)
+        # Requests are routed across the configured model pool
+        self.router = router or ModelRouter()
+        self._inflight = SingleFlight()
         
-        # Use Gemini 2.5 Flash for free tier (fast and efficient)
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+        # Interactive analyses jump ahead of bulk screens for model capacity,
+        # across every process sharing SCHEDULER_DB
+        self.scheduler = scheduler or get_scheduler(
+            capacity=sum(slot.max_concurrency for slot in self.router.slots),
+            name='model'
+        )
         
         # Generation config for more varied responses
         self.generation_config = {
@@ -35,10 +73,44 @@ class GeminiAnalyzer:
             "response_mime_type": "application/json", 
         }
     
-    def analyze_strategic_fit(self, acquirer_data, target_data, collected_data):
+    def build_prompt(self, acquirer_data, target_data, collected_data):
+        """Render the analysis prompt for a deal"""
+        # Get industry from acquirer data
+        industry = acquirer_data.get('industry', 'SaaS/Enterprise Software')
+        
+        return get_analysis_prompt(
+            acquirer_data=acquirer_data,
+            target_data=target_data,
+            collected_data=collected_data,
+            industry=industry
+        )
+    
+    def build_dimension_prompts(self, acquirer_data, target_data, collected_data):
+        """Render one standalone prompt per dimension, keyed by dimension"""
+        sections = get_dimension_sections(
+            acquirer_data, target_data, collected_data,
+            acquirer_data.get('industry', 'SaaS/Enterprise Software')
+        )
+        return {
+            dim: get_dimension_prompt(dim, sections, acquirer_data['name'], target_data['name'])
+            for dim in DIMENSIONS
+        }
+    
+    def build_prompts(self, acquirer_data, target_data, collected_data):
+        """Every prompt the current analysis mode sends for a deal, keyed by name"""
+        if self.analysis_mode == 'per_dimension':
+            return self.build_dimension_prompts(acquirer_data, target_data, collected_data)
+        return {"analysis": self.build_prompt(acquirer_data, target_data, collected_data)}
+    
+    def analyze_strategic_fit(self, acquirer_data, target_data, collected_data,
+                              progress_callback=None):
         """
         Analyze strategic fit between acquirer and target
         
+        Args:
+            progress_callback: Optional callable(stage, detail) notified when
+                the prompt is built, the model is called and the response parsed
+        
         Returns:
             dict: Analysis results with scores and recommendations
         """
@@ -46,37 +118,80 @@ class GeminiAnalyzer:
         print(f"   Acquirer: {acquirer_data['name']} ({acquirer_data['industry']})")
         print(f"   Target: {target_data['name']} ({target_data['industry']})")
         
-        # Get industry from acquirer data
-        industry = acquirer_data.get('industry', 'SaaS/Enterprise Software')
-        
         # Generate prompt
-        prompt = get_analysis_prompt(
-            acquirer_data=acquirer_data,
-            target_data=target_data,
-            collected_data=collected_data,
-            industry=industry
-        )
+        if progress_callback:
+            progress_callback('build_prompt', None)
+        if self.analysis_mode == 'per_dimension':
+            with metrics.span('ma_stage_seconds', stage='build_prompt'):
+                prompts = self.build_dimension_prompts(acquirer_data, target_data, collected_data)
+            print(f"   📝 {len(prompts)} dimension prompts: {sum(map(len, prompts.values()))} characters")
+            return self._analyze_dimensions(prompts, acquirer_data, target_data, progress_callback)
+        
+        with metrics.span('ma_stage_seconds', stage='build_prompt'):
+            prompt = self.build_prompt(acquirer_data, target_data, collected_data)
         
         print(f"   📝 Prompt length: {len(prompt)} characters")
         
+        # Identical analyses already in flight are awaited rather than re-run,
+        # with the running call's progress events sent to every caller
+        return self._inflight.do_with_progress(
+            self.fingerprint(prompt),
+            self._analyze_prompt,
+            prompt, acquirer_data, target_data,
+            progress_callback=progress_callback
+        )
+    
+    def input_fingerprints(self, acquirer_data, target_data, collected_data):
+        """
+        Content hashes of everything that determines a deal's analysis
+        
+        Returns:
+            dict: sections (hash per deal-specific prompt section), mode,
+            prompt_version, models, config, weights, and fingerprint, one
+            hash over all of them; equal fingerprints mean an analysis can
+            be reused
+        """
+        build_sections = get_dimension_sections if self.analysis_mode == 'per_dimension' else get_prompt_sections
+        sections = build_sections(
+            acquirer_data, target_data, collected_data,
+            acquirer_data.get('industry', 'SaaS/Enterprise Software')
+        )
+        inputs = {
+            "sections": {name: content_hash(text) for name, text in sections.items()},
+            "mode": self.analysis_mode,
+            "prompt_version": PROMPT_VERSION,
+            "models": content_hash(self.router.model_names),
+            "config": content_hash(self.generation_config),
+            "weights": content_hash(get_weights())
+        }
+        inputs["fingerprint"] = content_hash(inputs)
+        return inputs
+    
+    def fingerprint(self, prompt):
+        """Hash of everything that determines a model response for prompt"""
+        payload = json.dumps(
+            {"prompt": prompt, "config": self.generation_config, "models": self.router.model_names},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _analyze_prompt(self, prompt, acquirer_data, target_data, progress_callback=None):
         try:
-            # Call Gemini API with high temperature for variance
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            
-            print(f"   ✅ Received response from Gemini")
-            
-            # Extract and parse JSON response
-            analysis = self._parse_response(response.text)
-            
-            # Log key metrics for debugging
-            print(f"   📊 Overall Score: {analysis.get('overall_score', 'N/A')}/100")
-            print(f"   ✅ Recommendation: {analysis.get('recommendation', 'N/A')}")
+            # Call Gemini, failing over across the model pool
+            queued_at = time.perf_counter()
+            with self.scheduler.slot():
+                metrics.observe('ma_stage_seconds', time.perf_counter() - queued_at, stage='model_queue')
+                # Covers every model attempt, including failovers and parsing
+                with metrics.span('ma_stage_seconds', stage='model'):
+                    analysis = self._generate_analysis(prompt, progress_callback)
             
             # Validate analysis structure
             analysis = self._validate_analysis(analysis)
+            analysis['prompt_version'] = PROMPT_VERSION
+            
+            # Log key metrics for debugging
+            print(f"   📊 Overall Score: {analysis['overall_score']}/100")
+            print(f"   ✅ Recommendation: {analysis['recommendation']}")
             
             return analysis
         
@@ -85,6 +200,199 @@ class GeminiAnalyzer:
             # Return fallback analysis
             return self._get_fallback_analysis(acquirer_data, target_data)
     
+    def _analyze_dimensions(self, prompts, acquirer_data, target_data, progress_callback=None):
+        """Analyze every dimension concurrently, then combine them into one analysis"""
+        if progress_callback:
+            progress_callback('model', f"{len(prompts)} dimensions")
+        try:
+            # Covers the slowest dimension; cached dimensions return at once
+            with metrics.span('ma_stage_seconds', stage='model'):
+                with ThreadPoolExecutor(max_workers=len(prompts), thread_name_prefix='dimension') as executor:
+                    # Worker threads keep the caller's scheduler lane
+                    futures = {
+                        dim: executor.submit(contextvars.copy_context().run, self._dimension_result, dim, prompt)
+                        for dim, prompt in prompts.items()
+                    }
+                    results = {dim: future.result() for dim, future in futures.items()}
+        except Exception as e:
+            print(f"   ❌ Gemini API error: {str(e)}")
+            # Dimensions that succeeded stay cached, so a retry only re-runs the rest
+            return self._get_fallback_analysis(acquirer_data, target_data)
+        
+        if progress_callback:
+            progress_callback('parse', None)
+        analysis = self._combine_dimensions(results, acquirer_data, target_data)
+        print(f"   📊 Overall Score: {analysis['overall_score']}/100 "
+              f"({analysis['dimension_cache']['hits']} of {len(results)} dimensions cached)")
+        print(f"   ✅ Recommendation: {analysis['recommendation']}")
+        return analysis
+    
+    def _dimension_result(self, dimension, prompt):
+        """One dimension's result from the cache, or from the model on a miss"""
+        key = self.fingerprint(prompt)
+        entry = self.dimension_cache.get(key)
+        if entry is not None:
+            metrics.inc('ma_dimension_cache_total', dimension=dimension, outcome='hit')
+            entry['cached'] = True
+            return entry
+        
+        metrics.inc('ma_dimension_cache_total', dimension=dimension, outcome='miss')
+        # Callers sharing an in-flight call each get their own copy
+        entry = copy.deepcopy(self._inflight.do(key, self._generate_dimension, key, prompt))
+        entry['cached'] = False
+        return entry
+    
+    def _generate_dimension(self, key, prompt):
+        queued_at = time.perf_counter()
+        with self.scheduler.slot():
+            metrics.observe('ma_stage_seconds', time.perf_counter() - queued_at, stage='model_queue')
+            entry = self._generate_analysis(prompt, parse=self._parse_dimension_response)
+        self.dimension_cache.put(key, entry)
+        return entry
+    
+    def _combine_dimensions(self, results, acquirer_data, target_data):
+        """
+        Build a full analysis from per-dimension results
+        
+        Overall score and recommendation come from the weighted dimension
+        scores; synergies and risks are the leading evidence of the three
+        strongest and the leading risks of the three weakest dimensions.
+        """
+        dimensions = {
+            dim: {"score": results[dim]['score'], "evidence": results[dim]['evidence'], "risks": results[dim]['risks']}
+            for dim in DIMENSIONS if dim in results
+        }
+        overall, recommendation = score_analysis({"dimensions": dimensions})
+        ranked = sorted(dimensions, key=lambda dim: -float(dimensions[dim]['score']))
+        strongest, weakest = ranked[0], ranked[-1]
+        
+        return {
+            "overall_score": overall,
+            "recommendation": recommendation,
+            "recommendation_detail": (
+                f"{acquirer_data['name']} acquiring {target_data['name']} scores {overall}/100 across "
+                f"{len(dimensions)} independently assessed dimensions, strongest in "
+                f"{DIMENSION_LABELS[strongest]} ({dimensions[strongest]['score']}) and weakest in "
+                f"{DIMENSION_LABELS[weakest]} ({dimensions[weakest]['score']})."
+            ),
+            "dimensions": dimensions,
+            "top_synergies": [dimensions[dim]['evidence'][0] for dim in ranked[:3] if dimensions[dim]['evidence']],
+            "top_risks": [dimensions[dim]['risks'][0] for dim in ranked[::-1][:3] if dimensions[dim]['risks']],
+            "model": ", ".join(sorted({results[dim]['model'] for dim in dimensions})),
+            "prompt_version": PROMPT_VERSION,
+            "analysis_mode": "per_dimension",
+            "dimension_cache": {
+                "hits": sum(1 for dim in dimensions if results[dim]['cached']),
+                "misses": sum(1 for dim in dimensions if not results[dim]['cached'])
+            }
+        }
+    
+    def finalize_response(self, response_text, acquirer_data, target_data, error=None):
+        """
+        Turn a raw model response into a validated analysis
+        
+        Falls back to the static analysis if the request errored or the
+        response can't be parsed, like analyze_strategic_fit does.
+        """
+        try:
+            if error:
+                raise ValueError(error)
+            analysis = self._validate_analysis(self._parse_response(response_text))
+            analysis['prompt_version'] = PROMPT_VERSION
+            return analysis
+        except Exception as e:
+            print(f"   ❌ Batch result error for {target_data['name']}: {str(e)}")
+            return self._get_fallback_analysis(acquirer_data, target_data)
+    
+    def _batch_jobs(self):
+        if not hasattr(self, '_batch_manager'):
+            self._batch_manager = BatchJobManager(self)
+        return self._batch_manager
+    
+    def submit_batch(self, deals, provider=None, model_name=None):
+        """
+        Submit many deals as one offline batch job
+        
+        Args:
+            deals: List of dicts with acquirer_data, target_data, collected_data
+                   and an optional unique key
+            provider: 'gemini' (Batch API) or 'local' (stand-in using the backend)
+            model_name: Model to run the batch on (defaults to the first pool model)
+        
+        Returns:
+            str: Job ID, usable with batch_status/iter_batch_results after a restart
+        """
+        return self._batch_jobs().submit(deals, provider=provider, model_name=model_name)
+    
+    def batch_status(self, job_id):
+        """Get a batch job's status ('pending', 'running', 'succeeded' or 'failed')"""
+        return self._batch_jobs().status(job_id)
+    
+    def iter_batch_results(self, job_id, poll_interval=30, timeout=None):
+        """
+        Wait for a batch job and stream parsed, validated results
+        
+        Yields:
+            dict: {"key", "acquirer_data", "target_data", "analysis"}
+        """
+        return self._batch_jobs().iter_results(job_id, poll_interval=poll_interval, timeout=timeout)
+    
+    def _generate_analysis(self, prompt, progress_callback=None, parse=None):
+        """
+        Generate and parse an analysis, trying models in router order
+        
+        Errors, quota exhaustion and unparseable responses fail over to the
+        next model; the last error is raised once every model has failed.
+        parse defaults to _parse_response (a full analysis).
+        """
+        parse = parse or self._parse_response
+        last_error = None
+        
+        for slot in self.router.candidates():
+            if progress_callback:
+                progress_callback('model', slot.name)
+            latency = None
+            try:
+                with self.router.acquire(slot):
+                    start = time.perf_counter()
+                    try:
+                        response_text = self.backend.generate(
+                            slot.name,
+                            prompt,
+                            generation_config=self.generation_config
+                        )
+                    finally:
+                        latency = time.perf_counter() - start
+                
+                self.router.record_success(slot, latency)
+                metrics.observe('ma_model_latency_seconds', latency, model=slot.name, outcome='ok')
+                print(f"   ✅ Received response from {slot.name} ({latency:.1f}s)")
+            except Exception as e:
+                self.router.record_failure(slot, e)
+                if latency is not None:
+                    metrics.observe('ma_model_latency_seconds', latency, model=slot.name, outcome='error')
+                print(f"   ⚠️ {slot.name} failed: {str(e)} - trying next model")
+                last_error = e
+                continue
+            
+            if progress_callback:
+                progress_callback('parse', slot.name)
+            try:
+                with metrics.span('ma_stage_seconds', stage='parse'):
+                    analysis = parse(response_text)
+                # Record which model answered, for score history
+                analysis['model'] = slot.name
+                return analysis
+            except ValueError as e:
+                print(f"   ⚠️ Unparseable response from {slot.name} - trying next model")
+                last_error = e
+        
+        raise last_error or RuntimeError("No Gemini models configured")
+    
+    def get_latency_histograms(self):
+        """Get per-model latency histograms from the router"""
+        return self.router.latency_histograms()
+    
     def _parse_response(self, response_text):
         """Parse JSON from Gemini response"""
         try:
@@ -104,8 +412,10 @@ class GeminiAnalyzer:
             
             # Verify it has the expected structure
             if 'dimensions' not in analysis or 'overall_score' not in analysis:
+                metrics.inc('ma_parse_path_total', path='incomplete')
                 raise ValueError("Missing required fields in response")
             
+            metrics.inc('ma_parse_path_total', path='json')
             return analysis
         
         except json.JSONDecodeError as e:
@@ -128,6 +438,7 @@ class GeminiAnalyzer:
                     
                     analysis = json.loads(json_str)
                     print(f"   ✅ Recovered JSON after cleaning")
+                    metrics.inc('ma_parse_path_total', path='repaired')
                     return analysis
             except Exception as e2:
                 print(f"   ❌ Still couldn't parse after cleaning: {e2}")
@@ -140,6 +451,7 @@ class GeminiAnalyzer:
                 
                 if score_match:
                     print(f"   ⚠️ Using regex fallback - extracted score: {score_match.group(1)}")
+                    metrics.inc('ma_parse_path_total', path='regex')
                     # Return minimal valid structure
                     return {
                         "overall_score": float(score_match.group(1)),
@@ -152,8 +464,39 @@ class GeminiAnalyzer:
             except:
                 pass
             
+            metrics.inc('ma_parse_path_total', path='failed')
             raise ValueError("Could not parse Gemini response as JSON")
     
+    def _parse_dimension_response(self, response_text):
+        """Parse one dimension's {"score", "evidence", "risks"} JSON"""
+        cleaned = re.sub(r'^```(?:json)?|```$', '', response_text.strip()).strip()
+        try:
+            entry = json.loads(cleaned)
+            path = 'json'
+        except json.JSONDecodeError:
+            # Fall back to the outermost braces, as _parse_response does
+            start = response_text.find('{')
+            end = response_text.rfind('}')
+            try:
+                entry = json.loads(re.sub(r',\s*([}\]])', r'\1', response_text[start:end + 1]))
+                path = 'repaired'
+            except ValueError:
+                metrics.inc('ma_parse_path_total', path='failed')
+                raise ValueError("Could not parse dimension response as JSON")
+        
+        try:
+            score = min(100, max(0, float(entry['score'])))
+        except (TypeError, KeyError, ValueError):
+            metrics.inc('ma_parse_path_total', path='incomplete')
+            raise ValueError("Missing or invalid score in dimension response")
+        
+        metrics.inc('ma_parse_path_total', path=path)
+        return {
+            "score": int(score) if score == int(score) else score,
+            "evidence": [str(point) for point in entry.get('evidence') or []],
+            "risks": [str(point) for point in entry.get('risks') or []]
+        }
+    
     def _get_default_dimensions(self):
         """Return default dimension structure"""
         return {
@@ -185,37 +528,18 @@ class GeminiAnalyzer:
         }
     
     def _validate_analysis(self, analysis):
-        """Validate and fix analysis structure"""
-        # Calculate overall score if missing
-        if 'overall_score' not in analysis or analysis['overall_score'] is None:
-            dimensions = analysis.get('dimensions', {})
-            weights = {
-                'technology_synergy': 0.30,
-                'market_overlap': 0.25,
-                'product_complementarity': 0.20,
-                'cultural_alignment': 0.15,
-                'financial_health': 0.10
-            }
-            
-            total = 0
-            for dim, weight in weights.items():
-                score = dimensions.get(dim, {}).get('score', 50)
-                total += score * weight
-            
-            analysis['overall_score'] = round(total, 1)
+        """
+        Validate and fix analysis structure
         
-        # Determine recommendation if missing
-        if 'recommendation' not in analysis:
-            score = analysis['overall_score']
-            if score >= 80:
-                analysis['recommendation'] = "Strong Fit"
-            elif score >= 60:
-                analysis['recommendation'] = "Moderate Fit"
-            elif score >= 40:
-                analysis['recommendation'] = "Weak Fit"
-            else:
-                analysis['recommendation'] = "Poor Fit"
+        The overall score and recommendation are always derived from the
+        dimension scores and the current weights (SCORE_WEIGHTS), never taken
+        from the model, so fresh and carried-forward analyses rank alike.
+        """
+        dimensions = analysis.get('dimensions')
+        if not isinstance(dimensions, dict) or not any(isinstance(dimensions.get(dim), dict) for dim in DIMENSIONS):
+            raise ValueError("Analysis has no dimension scores")
         
+        analysis['overall_score'], analysis['recommendation'] = score_analysis(analysis)
         return analysis
     
     def _get_fallback_analysis(self, acquirer_data, target_data):
@@ -0,0 +1,273 @@
+"""
+Score history per deal pair
+
+Every append to the ResultStore also lands here as one narrow row per
+deal: the (acquirer, target) pair, when it was scored, the overall and
+dimension scores, and the model, prompt version and data fingerprints
+behind them. Rows are never replaced, so re-screening a pair builds its
+drift series, and history queries never read the text of past analyses.
+"""
+
+import os
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config.scoring import DIMENSIONS
+from utils.fingerprints import content_hash
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+
+HISTORY_SCHEMA = pa.schema([
+    pa.field('pair', pa.string()),
+    pa.field('key', pa.string()),
+    pa.field('acquirer', _TEXT),
+    pa.field('target', _TEXT),
+    pa.field('completed_at', pa.timestamp('s')),
+    pa.field('status', _TEXT),
+    pa.field('overall_score', pa.float32()),
+    *[pa.field(dim, pa.float32()) for dim in DIMENSIONS],
+    pa.field('model', _TEXT),
+    pa.field('prompt_version', _TEXT),
+    pa.field('acquirer_fingerprint', _TEXT),
+    pa.field('target_fingerprint', _TEXT)
+])
+
+# Inputs that can explain a score moving between runs
+PROVENANCE_COLUMNS = ['model', 'prompt_version', 'acquirer_fingerprint', 'target_fingerprint']
+
+# Rows per row group once compacted; groups are sorted by pair, so pair
+# and date filters skip most of the file
+ROW_GROUP_SIZE = 65536
+
+
+def pair_key(acquirer, target):
+    """Stable key for an (acquirer, target) pair, ignoring case and spacing"""
+    return content_hash([acquirer.strip().lower(), target.strip().lower()])
+
+
+def _timestamp(value):
+    return pa.scalar(value, type=pa.timestamp('s'))
+
+
+def read_parts(list_parts, read):
+    """
+    Return read(parts) over the current part files
+
+    A concurrent compaction can remove a part between listing and reading
+    it; its rows are in the compacted part by then, so the read is retried.
+    """
+    for attempt in range(3):
+        parts = list_parts()
+        try:
+            return read(parts)
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+
+def compacted_path(parts):
+    """
+    Path of the part that merges parts, named after the newest of them
+
+    Parts appended while the merge runs have later names, so name order
+    stays append order and the merged rows never hide newer ones.
+    """
+    base = os.path.basename(parts[-1])[:-len('.parquet')]
+    if base.endswith('-compacted'):
+        base = base[:-len('-compacted')]
+    return os.path.join(os.path.dirname(parts[-1]), f"{base}-compacted.parquet")
+
+
+def remove_parts(parts):
+    """Delete merged part files, skipping any a concurrent compaction already removed"""
+    for part in parts:
+        try:
+            os.remove(part)
+        except FileNotFoundError:
+            pass
+
+
+def _write(table, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+
+class ScoreHistory:
+    def __init__(self, root):
+        """
+        Append-only score history, one Parquet part per append
+
+        Args:
+            root: History directory (ResultStore keeps it in <store>/history)
+        """
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _parts(self):
+        return sorted(
+            os.path.join(self.root, name) for name in os.listdir(self.root) if name.endswith('.parquet')
+        )
+
+    def version(self):
+        """Names of the current part files; changes whenever the history does"""
+        return tuple(os.path.basename(part) for part in self._parts())
+
+    def append(self, results_table):
+        """
+        Record the scores of a ResultStore table; returns the rows written
+
+        Rows already recorded (same key and completed_at, e.g. a resumed
+        screen storing its results again) are skipped.
+        """
+        if self._parts() and len(results_table):
+            seen = read_parts(self._parts, lambda parts: pq.read_table(
+                parts, columns=['key', 'completed_at'], schema=HISTORY_SCHEMA,
+                filters=pc.field('key').isin(results_table['key'].to_pylist())
+            ))
+            if len(seen):
+                stored = set(zip(seen['key'].to_pylist(), seen['completed_at'].to_pylist()))
+                fresh = [
+                    (key, completed_at) not in stored for key, completed_at in zip(
+                        results_table['key'].to_pylist(), results_table['completed_at'].to_pylist()
+                    )
+                ]
+                results_table = results_table.filter(pa.array(fresh))
+        if not len(results_table):
+            return 0
+        pairs = [
+            pair_key(acquirer, target) for acquirer, target in zip(
+                results_table['acquirer'].to_pylist(), results_table['target'].to_pylist()
+            )
+        ]
+        table = results_table.append_column('pair', pa.array(pairs, type=pa.string()))
+        table = table.select(HISTORY_SCHEMA.names).cast(HISTORY_SCHEMA)
+        table = table.sort_by([('pair', 'ascending'), ('completed_at', 'ascending')])
+        _write(table, os.path.join(self.root, f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"))
+        return len(table)
+
+    def load(self, pairs=None, start=None, end=None, columns=None, status=None):
+        """
+        Read history rows, oldest first within each pair
+
+        Args:
+            pairs: pair_key()s to read (default every pair)
+            start, end: datetimes bounding completed_at, inclusive
+            columns: Columns to read (default all of HISTORY_SCHEMA)
+            status: Only rows with this status, e.g. 'ok' (default all rows)
+
+        Returns:
+            pyarrow.Table sorted by pair, then completed_at
+        """
+        columns = list(columns or HISTORY_SCHEMA.names)
+        read = list(dict.fromkeys(['pair', 'completed_at', *columns]))
+        parts = self._parts()
+        if not parts:
+            return HISTORY_SCHEMA.empty_table().select(columns)
+
+        where = None
+        for condition in (
+            pc.field('pair').isin(list(pairs)) if pairs is not None else None,
+            pc.field('completed_at') >= _timestamp(start) if start is not None else None,
+            pc.field('completed_at') <= _timestamp(end) if end is not None else None,
+            pc.field('status') == status if status is not None else None
+        ):
+            if condition is not None:
+                where = condition if where is None else where & condition
+
+        table = read_parts(
+            self._parts, lambda parts: pq.read_table(parts, columns=read, filters=where, schema=HISTORY_SCHEMA)
+        )
+        return table.sort_by([('pair', 'ascending'), ('completed_at', 'ascending')]).select(columns)
+
+    def series(self, acquirer, target, start=None, end=None):
+        """Score history of one pair, oldest first"""
+        return self.load(pairs=[pair_key(acquirer, target)], start=start, end=end)
+
+    def movers(self, limit=20, column='overall_score', since=None):
+        """
+        Pairs whose score moved most between runs
+
+        Only successful ('ok') runs count: a fallback's placeholder scores
+        are neither a current score nor a baseline. Pairs whose score didn't
+        move are left out.
+
+        Args:
+            limit: Pairs to return
+            column: 'overall_score' or a dimension
+            since: datetime; compare each pair's latest score with its last
+                score at or before since (default: with its previous run)
+
+        Returns:
+            list: dicts with pair, acquirer, target, previous, current,
+            delta, previous_at, current_at and changed (the provenance
+            columns that differ between the two runs), largest move first
+        """
+        if column not in ('overall_score', *DIMENSIONS):
+            raise ValueError(f"Unknown score column '{column}'")
+        table = self.load(
+            columns=['pair', 'acquirer', 'target', 'completed_at', column, *PROVENANCE_COLUMNS], status='ok'
+        )
+        if len(table) < 2:
+            return []
+
+        pairs = table['pair']
+        # Rows are sorted by pair: group ids step up where the pair changes
+        boundaries = pc.not_equal(pairs.slice(1), pairs.slice(0, len(pairs) - 1)).to_numpy(zero_copy_only=False)
+        groups = np.concatenate(([0], np.cumsum(boundaries)))
+        last = np.flatnonzero(np.append(boundaries, True))
+
+        if since is None:
+            baseline = last - 1
+            valid = (baseline >= 0) & (groups[np.maximum(baseline, 0)] == groups[last])
+        else:
+            times = table['completed_at'].cast(pa.int64()).to_numpy()
+            cutoff = int(_timestamp(since).cast(pa.int64()).as_py())
+            before = np.flatnonzero(times <= cutoff)
+            baseline = np.full(len(last), -1)
+            np.maximum.at(baseline, groups[before], before)
+            valid = (baseline >= 0) & (times[last] > cutoff)
+
+        last, baseline = last[valid], baseline[valid]
+        scores = table[column].to_numpy()
+        delta = scores[last].astype(np.float64) - scores[baseline]
+        moved = np.round(delta, 1) != 0
+        last, baseline, delta = last[moved], baseline[moved], delta[moved]
+        order = np.argsort(-np.abs(delta), kind='stable')[:limit]
+
+        provenance = {name: table[name].cast(pa.string()).to_numpy(zero_copy_only=False) for name in PROVENANCE_COLUMNS}
+        completed = table['completed_at']
+        movers = []
+        for i in order:
+            current, previous = last[i], baseline[i]
+            movers.append({
+                "pair": pairs[current].as_py(),
+                "acquirer": table['acquirer'][current].as_py(),
+                "target": table['target'][current].as_py(),
+                "previous": round(float(scores[previous]), 1),
+                "current": round(float(scores[current]), 1),
+                "delta": round(float(delta[i]), 1),
+                "previous_at": completed[previous].as_py(),
+                "current_at": completed[current].as_py(),
+                "changed": [
+                    name for name in PROVENANCE_COLUMNS if provenance[name][current] != provenance[name][previous]
+                ]
+            })
+        return movers
+
+    def compact(self):
+        """Merge every part into one file sorted by pair and time; no rows are dropped"""
+        parts = self._parts()
+        if len(parts) < 2:
+            return
+        table = pq.read_table(parts, schema=HISTORY_SCHEMA).sort_by(
+            [('pair', 'ascending'), ('completed_at', 'ascending')]
+        )
+        path = compacted_path(parts)
+        _write(table, path)
+        remove_parts(part for part in parts if part != path)
@@ -0,0 +1,135 @@
+"""
+Background job execution with stage events
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.pipeline import STAGE_LABELS, STAGE_PROGRESS
+from utils.scheduler import use_lane
+
+
+class AnalysisJob:
+    def __init__(self, job_id, label, lane='interactive'):
+        """
+        Handle for a submitted job
+
+        status is 'queued', 'running', 'done' or 'failed'; events is the list
+        of stage events reported by the pipeline so far.
+        """
+        self.id = job_id
+        self.label = label
+        self.lane = lane
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self.record_event('queued')
+
+    def record_event(self, stage, detail=None):
+        """Progress callback passed to the pipeline"""
+        with self._lock:
+            self.events.append({
+                "stage": stage,
+                "detail": detail,
+                "label": STAGE_LABELS.get(stage, stage),
+                "progress": STAGE_PROGRESS.get(stage),
+                "time": time.time()
+            })
+
+    @property
+    def latest_event(self):
+        with self._lock:
+            return self.events[-1]
+
+    @property
+    def progress(self):
+        """Progress (0-1) of the furthest stage reached"""
+        with self._lock:
+            values = [e['progress'] for e in self.events if e['progress'] is not None]
+        return max(values) if values else 0.0
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobManager:
+    def __init__(self, max_workers=4, max_jobs=500):
+        """
+        Run jobs on a background thread pool
+
+        Args:
+            max_workers: Jobs run concurrently
+            max_jobs: Finished jobs kept for lookup before the oldest are dropped
+        """
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def submit(self, label, fn, *args, lane='interactive', **kwargs):
+        """
+        Submit fn(*args, progress_callback=..., **kwargs) to the worker pool
+
+        Args:
+            lane: Scheduling lane fn runs in ('interactive' or 'bulk')
+
+        Returns:
+            AnalysisJob: Handle to poll for status, events and result
+        """
+        job = AnalysisJob(f"{next(self._counter)}-{uuid.uuid4().hex[:8]}", label, lane)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            with use_lane(job.lane):
+                job.result = fn(*args, progress_callback=job.record_event, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            job.record_event('failed', str(e))
+        finally:
+            job.finished_at = time.time()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids):
+        """Return the known jobs among job_ids, in order"""
+        with self._lock:
+            return [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.is_finished)
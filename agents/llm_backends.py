@@ -0,0 +1,205 @@
+"""
+LLM backends used by the analyzer
+
+GeminiAnalyzer only talks to an LLMBackend, so the Gemini SDK can be swapped
+for the offline mock (in-process or over HTTP) for load tests and benchmarks.
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+
+import requests
+
+from utils import metrics
+from utils.cassettes import Cassette, CassetteMiss, get_cassette
+
+
+class BackendError(Exception):
+    """Generation failed"""
+
+
+class QuotaExceededError(BackendError):
+    """The backend rejected the request because of rate limits or quota (HTTP 429)"""
+    code = 429
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) for backends that don't report usage"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def record_usage(model_name, prompt_tokens, output_tokens):
+    """Add a call's token counts to ma_llm_tokens_total"""
+    metrics.inc('ma_llm_tokens_total', prompt_tokens or 0, model=model_name, kind='prompt')
+    metrics.inc('ma_llm_tokens_total', output_tokens or 0, model=model_name, kind='output')
+
+
+class LLMBackend(ABC):
+    """
+    Interface for text generation backends
+
+    Subclasses implement generate(), returning the raw response text and
+    raising BackendError (or QuotaExceededError on 429s) on failure, and
+    report token usage with record_usage().
+    """
+    name = 'base'
+
+    @abstractmethod
+    def generate(self, model_name, prompt, generation_config=None):
+        """
+        Generate a completion
+
+        Args:
+            model_name: Model to use, e.g. "models/gemini-2.5-flash"
+            prompt: Prompt text
+            generation_config: Dict of generation parameters
+
+        Returns:
+            str: Response text
+        """
+
+
+class GeminiBackend(LLMBackend):
+    name = 'gemini'
+
+    def __init__(self, api_key=None):
+        """
+        Initialize Gemini SDK backend
+
+        Args:
+            api_key: Google Gemini API key (or set GEMINI_API_KEY env var)
+        """
+        import google.generativeai as genai
+
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("Gemini API key not found. Set GEMINI_API_KEY environment variable.")
+
+        self._genai = genai
+        genai.configure(api_key=self.api_key)
+        self._models = {}
+
+    def _get_model(self, model_name):
+        """Get a cached GenerativeModel for model_name"""
+        if model_name not in self._models:
+            self._models[model_name] = self._genai.GenerativeModel(model_name)
+        return self._models[model_name]
+
+    def generate(self, model_name, prompt, generation_config=None):
+        response = self._get_model(model_name).generate_content(
+            prompt,
+            generation_config=generation_config
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            record_usage(model_name, usage.prompt_token_count, usage.candidates_token_count)
+        return response.text
+
+
+class HTTPBackend(LLMBackend):
+    name = 'http'
+
+    def __init__(self, base_url=None, timeout=120):
+        """
+        Initialize client for the mock LLM server (agents/mock_backend.py)
+
+        Args:
+            base_url: Server URL (or set MOCK_LLM_URL env var)
+            timeout: Request timeout in seconds
+        """
+        self.base_url = (base_url or os.getenv('MOCK_LLM_URL', 'http://127.0.0.1:8765')).rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, model_name, prompt, generation_config=None):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/v1/generate",
+                json={
+                    "model": model_name,
+                    "prompt": prompt,
+                    "generation_config": generation_config or {}
+                },
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise BackendError(f"Mock LLM server unreachable: {e}")
+
+        if response.status_code == 429:
+            raise QuotaExceededError(f"429 quota exceeded for {model_name}")
+        if response.status_code != 200:
+            raise BackendError(f"Mock LLM server returned {response.status_code}: {response.text[:200]}")
+
+        text = response.json()['text']
+        record_usage(model_name, estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+
+class CassetteBackend(LLMBackend):
+    name = 'cassette'
+
+    def __init__(self, backend, cassette):
+        """
+        Record/replay wrapper around another backend (see utils.cassettes)
+
+        Args:
+            backend: LLMBackend making real calls (None for replay-only)
+            cassette: Cassette storing responses by model, prompt and config
+        """
+        self.backend = backend
+        self.cassette = cassette
+
+    def generate(self, model_name, prompt, generation_config=None):
+        key = Cassette.key(model_name, prompt, json.dumps(generation_config or {}, sort_keys=True))
+        recorded = []
+
+        def record():
+            recorded.append(key)
+            return {"model": model_name, "text": self.backend.generate(model_name, prompt, generation_config)}
+
+        try:
+            entry = self.cassette.play(key, record, description=f"{model_name} prompt {key}")
+        except CassetteMiss as e:
+            raise BackendError(str(e))
+
+        # Recorded calls were already counted by the wrapped backend
+        if not recorded:
+            record_usage(model_name, estimate_tokens(prompt), estimate_tokens(entry['text']))
+        return entry['text']
+
+
+def get_backend(api_key=None, kind=None):
+    """
+    Build the backend selected by LLM_BACKEND
+
+    With CASSETTE_MODE set, the backend is wrapped to record or replay
+    responses; in replay mode no real backend (or API key) is needed.
+
+    Args:
+        api_key: Gemini API key, used by the gemini backend
+        kind: 'gemini' (default), 'mock' (in-process) or 'http' (mock server)
+
+    Returns:
+        LLMBackend
+    """
+    cassette = get_cassette('llm')
+    if cassette is not None and cassette.mode == 'replay':
+        return CassetteBackend(None, cassette)
+
+    backend = _build_backend(api_key, kind)
+    return CassetteBackend(backend, cassette) if cassette is not None else backend
+
+
+def _build_backend(api_key, kind):
+    kind = (kind or os.getenv('LLM_BACKEND', 'gemini')).lower()
+
+    if kind == 'gemini':
+        return GeminiBackend(api_key=api_key)
+    if kind == 'mock':
+        from agents.mock_backend import MockBackend
+        return MockBackend.from_env()
+    if kind == 'http':
+        return HTTPBackend()
+
+    raise ValueError(f"Unknown LLM_BACKEND '{kind}'. Use gemini, mock or http.")
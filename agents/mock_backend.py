@@ -0,0 +1,265 @@
+"""
+Offline mock LLM backend and HTTP server
+
+Replays recorded responses (or synthesizes valid analyses) with configurable
+latency, error rate and 429 rate, so the pipeline can be load-tested without
+burning Gemini quota.
+
+Run as a server:
+    python -m agents.mock_backend --port 8765 --latency lognormal:1.0:0.4 --rate-429 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agents.llm_backends import BackendError, LLMBackend, QuotaExceededError, estimate_tokens, record_usage
+from config.scoring import DIMENSIONS
+from utils.scoring import score_analysis
+
+
+class LatencyDistribution:
+    def __init__(self, spec='constant:0'):
+        """
+        Parse a latency spec (seconds)
+
+        Args:
+            spec: "constant:S", "uniform:LOW:HIGH", "normal:MEAN:STD" or
+                  "lognormal:MEDIAN:SIGMA"
+        """
+        parts = spec.split(':')
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+
+        expected = {'constant': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+
+    def sample(self, rng):
+        if self.kind == 'constant':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.params)
+        if self.kind == 'normal':
+            return max(0.0, rng.gauss(*self.params))
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class MockBackend(LLMBackend):
+    name = 'mock'
+
+    def __init__(self, responses_dir=None, latency='constant:0', error_rate=0.0,
+                 rate_429=0.0, seed=None):
+        """
+        Initialize mock backend
+
+        Args:
+            responses_dir: Directory of recorded response files. A file named
+                <prompt sha256[:16]>.json is replayed for its prompt; other
+                prompts get a recorded response chosen by prompt hash. If
+                empty or None, valid analyses are synthesized from the prompt.
+            latency: LatencyDistribution spec
+            error_rate: Probability of a BackendError
+            rate_429: Probability of a QuotaExceededError
+            seed: Random seed for reproducible runs
+        """
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.responses = {}
+
+        if responses_dir and os.path.isdir(responses_dir):
+            for filename in sorted(os.listdir(responses_dir)):
+                if filename.endswith(('.json', '.txt')):
+                    with open(os.path.join(responses_dir, filename), encoding='utf-8') as f:
+                        self.responses[os.path.splitext(filename)[0]] = f.read()
+
+    @classmethod
+    def from_env(cls):
+        """Build a mock backend from MOCK_LLM_* environment variables"""
+        seed = os.getenv('MOCK_LLM_SEED')
+        return cls(
+            responses_dir=os.getenv('MOCK_LLM_RESPONSES'),
+            latency=os.getenv('MOCK_LLM_LATENCY', 'constant:0'),
+            error_rate=float(os.getenv('MOCK_LLM_ERROR_RATE', '0')),
+            rate_429=float(os.getenv('MOCK_LLM_429_RATE', '0')),
+            seed=int(seed) if seed else None
+        )
+
+    def generate(self, model_name, prompt, generation_config=None):
+        with self._rng_lock:
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+
+        time.sleep(delay)
+
+        if roll < self.rate_429:
+            raise QuotaExceededError(f"429 quota exceeded for {model_name} (mock)")
+        if roll < self.rate_429 + self.error_rate:
+            raise BackendError(f"500 internal error from {model_name} (mock)")
+
+        text = self._response_for(prompt)
+        record_usage(model_name, estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    def _response_for(self, prompt):
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+        if key in self.responses:
+            return self.responses[key]
+        if self.responses:
+            recorded = sorted(self.responses)
+            return self.responses[recorded[int(key, 16) % len(recorded)]]
+
+        return json.dumps(synthesize_analysis(prompt, seed=int(key, 16)))
+
+
+def synthesize_analysis(prompt, seed=0):
+    """
+    Build a well-formed analysis for a prompt from get_analysis_prompt
+
+    Scores are deterministic per prompt, so replays are reproducible.
+    Per-dimension prompts (get_dimension_prompt) get a single dimension.
+    """
+    rng = random.Random(seed)
+    dimension = re.search(
+        r'Evaluate (.+?) for (?:the acquisition of (.+?) by .+?|(.+?) as an acquisition target)\.\n', prompt
+    )
+    if dimension:
+        label, target = dimension.group(1).lower(), dimension.group(2) or dimension.group(3)
+        return {
+            "score": rng.randint(20, 100),
+            "evidence": [f"{target} {label} evidence point {i}" for i in range(1, 4)],
+            "risks": [f"{target} {label} risk {i}" for i in range(1, 3)]
+        }
+
+    match = re.search(r'Evaluate the acquisition of (.+?) by (.+?)\.\n', prompt)
+    target, acquirer = match.groups() if match else ("Target", "Acquirer")
+
+    base = rng.randint(35, 85)
+    dimensions = {}
+    for dim in DIMENSIONS:
+        label = dim.replace('_', ' ')
+        dimensions[dim] = {
+            "score": max(0, min(100, base + rng.randint(-15, 15))),
+            "evidence": [
+                f"{acquirer} and {target} {label} evidence point {i}" for i in range(1, 4)
+            ],
+            "risks": [
+                f"{target} {label} risk {i}" for i in range(1, 3)
+            ]
+        }
+
+    overall, recommendation = score_analysis({"dimensions": dimensions})
+
+    return {
+        "overall_score": overall,
+        "recommendation": recommendation,
+        "recommendation_detail": f"Mock analysis of {acquirer} acquiring {target}.",
+        "dimensions": dimensions,
+        "top_synergies": [f"{acquirer} + {target} synergy {i}" for i in range(1, 4)],
+        "top_risks": [f"{acquirer} + {target} risk {i}" for i in range(1, 4)]
+    }
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, backend, host='127.0.0.1', port=8765):
+        """
+        Tiny HTTP front end for a MockBackend
+
+        POST /v1/generate with {"model", "prompt", "generation_config"}
+        returns {"text": ...}, or 429/500 with {"error": ...}.
+        """
+        self.backend = backend
+        super().__init__((host, port), _MockRequestHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self):
+        """Serve from a daemon thread (for tests and load tests)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != '/v1/generate':
+            self._send(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            text = self.server.backend.generate(
+                payload.get('model', 'models/mock'),
+                payload['prompt'],
+                payload.get('generation_config')
+            )
+        except QuotaExceededError as e:
+            self._send(429, {"error": str(e)})
+        except (BackendError, KeyError, ValueError) as e:
+            self._send(500, {"error": str(e)})
+        else:
+            self._send(200, {"text": text})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline mock LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--responses', default=os.getenv('MOCK_LLM_RESPONSES'),
+                        help="Directory of recorded responses")
+    parser.add_argument('--latency', default=os.getenv('MOCK_LLM_LATENCY', 'constant:0'),
+                        help="constant:S | uniform:LOW:HIGH | normal:MEAN:STD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    backend = MockBackend(
+        responses_dir=args.responses,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        seed=args.seed
+    )
+    server = MockLLMServer(backend, args.host, args.port)
+    print(f"🧪 Mock LLM server listening on {server.url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
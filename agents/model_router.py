@@ -0,0 +1,149 @@
+"""
+Latency-aware router over a pool of Gemini models
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from config.models import get_model_pool
+from utils.histogram import LatencyHistogram
+from utils.rate_limiter import RateLimiter
+
+
+# How long a model is skipped after it reports quota exhaustion
+QUOTA_COOLDOWN_SECONDS = 60
+
+
+def is_quota_error(error):
+    """Check whether an exception means the model's quota is exhausted"""
+    if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+        return True
+    if type(error).__name__ in ('ResourceExhausted', 'TooManyRequests', 'QuotaExceededError'):
+        return True
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'resource exhausted' in message
+
+
+class ModelSlot:
+    def __init__(self, name, max_concurrency, requests_per_minute):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.limiter = RateLimiter(requests_per_minute)
+        self.histogram = LatencyHistogram()
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.in_flight = 0
+        self.successes = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+
+    def is_cooling_down(self):
+        return time.monotonic() < self.cooldown_until
+
+    def headroom(self):
+        """Fraction of capacity free right now (0 = saturated, 1 = idle)"""
+        concurrency_free = (self.max_concurrency - self.in_flight) / self.max_concurrency
+        rate_free = min(1.0, self.limiter.available())
+        return max(0.0, min(concurrency_free, rate_free))
+
+
+class ModelRouter:
+    def __init__(self, pool=None, acquire_timeout=60):
+        """
+        Initialize router
+
+        Args:
+            pool: List of model configs (defaults to config.models.get_model_pool())
+            acquire_timeout: Max seconds to wait for a model's concurrency/rate slot
+        """
+        pool = pool or get_model_pool()
+        self.slots = [
+            ModelSlot(m['name'], m['max_concurrency'], m['requests_per_minute'])
+            for m in pool
+        ]
+        self.acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+
+    @property
+    def model_names(self):
+        return [slot.name for slot in self.slots]
+
+    def candidates(self):
+        """
+        Order models for the next request
+
+        Models with headroom come first, fastest recent p95 first (models
+        with no samples yet are tried before measured ones so they get
+        measured). Saturated models follow, and models cooling down after
+        quota exhaustion go last.
+
+        Returns:
+            list: ModelSlot objects in the order they should be tried
+        """
+        with self._lock:
+            ready, saturated, cooling = [], [], []
+            for position, slot in enumerate(self.slots):
+                p95 = slot.histogram.p95()
+                key = (p95 if p95 is not None else 0.0, -slot.headroom(), position)
+                if slot.is_cooling_down():
+                    cooling.append((slot.cooldown_until, position, slot))
+                elif slot.headroom() > 0:
+                    ready.append((key, slot))
+                else:
+                    saturated.append((key, slot))
+
+        ready.sort(key=lambda item: item[0])
+        saturated.sort(key=lambda item: item[0])
+        cooling.sort(key=lambda item: item[:2])
+
+        return [s for _, s in ready] + [s for _, s in saturated] + [s for _, _, s in cooling]
+
+    @contextmanager
+    def acquire(self, slot):
+        """Hold one of the slot's concurrency and rate-limit permits"""
+        if not slot.semaphore.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"Timed out waiting for a free {slot.name} slot")
+
+        try:
+            if not slot.limiter.acquire(timeout=self.acquire_timeout):
+                raise TimeoutError(f"Timed out waiting for {slot.name} rate limit")
+
+            with self._lock:
+                slot.in_flight += 1
+            try:
+                yield slot
+            finally:
+                with self._lock:
+                    slot.in_flight -= 1
+        finally:
+            slot.semaphore.release()
+
+    def record_success(self, slot, latency):
+        slot.histogram.observe(latency)
+        with self._lock:
+            slot.successes += 1
+
+    def record_failure(self, slot, error):
+        with self._lock:
+            slot.errors += 1
+            if is_quota_error(error):
+                slot.cooldown_until = time.monotonic() + QUOTA_COOLDOWN_SECONDS
+
+    def latency_histograms(self):
+        """
+        Get per-model latency histograms and counters
+
+        Returns:
+            dict: Model name -> histogram snapshot with success/error counts
+        """
+        stats = {}
+        for slot in self.slots:
+            snapshot = slot.histogram.snapshot()
+            snapshot.update({
+                "successes": slot.successes,
+                "errors": slot.errors,
+                "in_flight": slot.in_flight,
+                "cooling_down": slot.is_cooling_down()
+            })
+            stats[slot.name] = snapshot
+        return stats
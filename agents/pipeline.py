@@ -0,0 +1,199 @@
+"""
+End-to-end analysis pipeline: collect company data, then analyze strategic fit
+"""
+
+import copy
+import time
+
+from agents.llm_backends import estimate_tokens
+from utils import metrics
+from utils.profiling import profile_run
+from utils.scoring import score_analysis
+
+
+# Pipeline stages in order, with the status text shown for each
+STAGES = [
+    ('queued', "⏳ Waiting for a free worker..."),
+    ('scrape_acquirer', "🔍 Scraping acquirer data..."),
+    ('scrape_target', "🔍 Scraping target data..."),
+    ('build_prompt', "📝 Building analysis prompt..."),
+    ('model', "🤖 Running AI strategic analysis..."),
+    ('parse', "📊 Parsing analysis..."),
+    ('complete', "✅ Analysis complete!")
+]
+
+STAGE_LABELS = dict(STAGES)
+
+STAGE_PROGRESS = {
+    stage: index / (len(STAGES) - 1)
+    for index, (stage, _) in enumerate(STAGES)
+}
+
+# Analysis fields that describe the run that produced it rather than the
+# analysis itself; a carried-forward analysis drops them
+RUN_FIELDS = ('dimension_cache',)
+
+
+def deal_from_fields(acquirer_name, acquirer_industry, acquirer_focus, acquirer_website,
+                     target_name, target_industry, target_website):
+    """Build a deal dict in the EXAMPLE_DEALS format from form fields"""
+    return {
+        "acquirer": {
+            "name": acquirer_name,
+            "industry": acquirer_industry,
+            "focus": acquirer_focus,
+            "website": acquirer_website
+        },
+        "target": {
+            "name": target_name,
+            "industry": target_industry,
+            "website": target_website
+        }
+    }
+
+
+def changed_inputs(inputs, previous_inputs):
+    """
+    Names of the analysis inputs that differ from a previous run's
+
+    Returns:
+        list: Changed prompt sections, then mode, prompt_version, models,
+        config or weights; ['new'] when there is no previous run to compare with
+    """
+    if not previous_inputs:
+        return ['new']
+    previous_sections = previous_inputs.get('sections') or {}
+    changed = [
+        name for name, digest in inputs['sections'].items() if previous_sections.get(name) != digest
+    ]
+    changed += [
+        name for name in ('mode', 'prompt_version', 'models', 'config', 'weights')
+        # Records from before analysis modes existed were single-prompt
+        if previous_inputs.get(name, 'single' if name == 'mode' else None) != inputs[name]
+    ]
+    return changed
+
+
+def run_analysis(deal, collector, analyzer, progress_callback=None, profile=None, previous=None):
+    """
+    Run the complete M&A analysis for one deal
+
+    Args:
+        deal: Dict in the EXAMPLE_DEALS format (acquirer/target sub-dicts)
+        collector: DataCollector
+        analyzer: GeminiAnalyzer
+        progress_callback: Optional callable(stage, detail) for stage events
+        profile: True to profile this run, False never to; None follows
+            PROFILE_MODE (see utils/profiling.py)
+        previous: Optional earlier screening record of the same deal; its
+            analysis is reused when none of the inputs changed
+
+    Returns:
+        dict: analysis, collected_data, acquirer_data, target_data, inputs,
+        changed and carried_forward (see analyze_collected), plus 'profile'
+        (artifact paths) when the run was profiled
+    """
+    acquirer = deal['acquirer']
+    target = deal['target']
+    started = time.perf_counter()
+
+    with profile_run(f"{acquirer['name']}-{target['name']}", enabled=profile) as profiler:
+        # Stage events also split the profile's allocations by stage
+        on_event = profiler.wrap_callback(progress_callback) if profiler else progress_callback
+
+        collected_data = collector.collect_deal_data(
+            acquirer_name=acquirer['name'],
+            acquirer_website=acquirer.get('website'),
+            acquirer_industry=acquirer['industry'],
+            target_name=target['name'],
+            target_website=target.get('website'),
+            target_industry=target['industry'],
+            progress_callback=on_event
+        )
+
+        result = analyze_collected(deal, collected_data, analyzer, on_event, previous=previous)
+    metrics.observe('ma_stage_seconds', time.perf_counter() - started, stage='total')
+
+    if profiler:
+        result['profile'] = profiler.artifacts
+
+    if progress_callback:
+        progress_callback('complete', None)
+
+    return result
+
+
+def analyze_collected(deal, collected_data, analyzer, progress_callback=None, previous=None):
+    """
+    Analyze a deal whose company data has already been collected
+
+    When previous (an earlier screening record of the deal) was analyzed
+    from the same prompt sections, prompt version, models and generation
+    config, its analysis is carried forward without a model call, minus
+    its RUN_FIELDS. A change of weights alone only re-scores the carried
+    analysis.
+
+    Returns:
+        dict: analysis, collected_data, acquirer_data, target_data, inputs
+        (GeminiAnalyzer.input_fingerprints), changed (changed_inputs against
+        previous), carried_forward, and skipped_model_calls and
+        skipped_prompt_tokens when carried
+    """
+    acquirer = deal['acquirer']
+    target = deal['target']
+
+    acquirer_data = {
+        'name': acquirer['name'],
+        'industry': acquirer['industry'],
+        'focus': acquirer.get('focus'),
+        'description': collected_data['acquirer'].get('description', '')
+    }
+
+    target_data = {
+        'name': target['name'],
+        'industry': target['industry'],
+        'description': collected_data['target'].get('description', '')
+    }
+
+    inputs = analyzer.input_fingerprints(acquirer_data, target_data, collected_data)
+    previous_analysis = (previous or {}).get('analysis')
+    changed = changed_inputs(inputs, (previous or {}).get('inputs'))
+
+    # Fallback analyses are never reused: their model call failed
+    if previous_analysis and not previous_analysis.get('note') and set(changed) <= {'weights'}:
+        analysis = copy.deepcopy(previous_analysis)
+        for field in RUN_FIELDS:
+            analysis.pop(field, None)
+        if changed:
+            analysis['overall_score'], analysis['recommendation'] = score_analysis(analysis)
+        metrics.inc('ma_reanalysis_total', outcome='carried')
+        prompts = analyzer.build_prompts(acquirer_data, target_data, collected_data)
+        return {
+            'analysis': analysis,
+            'collected_data': collected_data,
+            'acquirer_data': acquirer_data,
+            'target_data': target_data,
+            'inputs': inputs,
+            'changed': changed,
+            'carried_forward': True,
+            'skipped_model_calls': len(prompts),
+            'skipped_prompt_tokens': sum(estimate_tokens(prompt) for prompt in prompts.values())
+        }
+
+    analysis = analyzer.analyze_strategic_fit(
+        acquirer_data=acquirer_data,
+        target_data=target_data,
+        collected_data=collected_data,
+        progress_callback=progress_callback
+    )
+    metrics.inc('ma_reanalysis_total', outcome='analyzed')
+
+    return {
+        'analysis': analysis,
+        'collected_data': collected_data,
+        'acquirer_data': acquirer_data,
+        'target_data': target_data,
+        'inputs': inputs,
+        'changed': changed,
+        'carried_forward': False
+    }
@@ -0,0 +1,202 @@
+"""
+Portfolio queries over the result store
+
+The portfolio dashboard ranks every stored deal, but the browser only ever
+receives one page of rows and the chart data: filtering, sorting, paging
+and aggregation run here, against the store's score columns held in
+memory once per store version.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from agents.results import SCORE_COLUMNS
+from config.scoring import DIMENSIONS, RECOMMENDATION_BANDS
+
+# Columns the table can be sorted by
+SORT_COLUMNS = ['overall_score', *DIMENSIONS, 'completed_at', 'acquirer', 'target']
+
+# Score distribution bins: ten 10-point buckets, 100 falling in the last
+HISTOGRAM_BINS = np.arange(0, 101, 10)
+
+# Filtered and sorted row orders kept per Portfolio
+MAX_CACHED_QUERIES = 32
+
+
+def _query_key(filters):
+    return tuple(sorted(
+        (name, tuple(value) if isinstance(value, (list, tuple, set)) else value)
+        for name, value in (filters or {}).items()
+    ))
+
+
+class Portfolio:
+    def __init__(self, store, max_cached=MAX_CACHED_QUERIES):
+        """
+        Filter, sort, page and aggregate stored results on the server
+
+        Filters are a dict with any of: min_score, max_score (overall score
+        range), recommendations, acquirer_industries, target_industries (lists
+        of accepted values) and search (case-insensitive substring of the
+        acquirer or target name). Empty values don't filter.
+
+        Args:
+            store: ResultStore to read
+            max_cached: Filtered row orders to keep for paging
+        """
+        self.store = store
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._version = None
+        self._table = None
+        self._scores = None
+        self._orders = OrderedDict()
+        self._movers = None
+
+    def _load(self):
+        version = self.store.version()
+        with self._lock:
+            if version != self._version:
+                table = self.store.load(columns=SCORE_COLUMNS).combine_chunks().unify_dictionaries()
+                self._scores = np.column_stack([
+                    table[column].to_numpy() for column in ['overall_score', *DIMENSIONS]
+                ]) if len(table) else np.empty((0, len(DIMENSIONS) + 1), dtype=np.float32)
+                self._table = table
+                self._version = version
+                self._orders.clear()
+            return self._table, self._scores
+
+    def __len__(self):
+        return len(self._load()[0])
+
+    def options(self):
+        """Distinct values for the list filters, sorted"""
+        table, _ = self._load()
+        return {
+            name: sorted(value for value in pc.unique(table[column].cast(pa.string())).to_pylist() if value)
+            for name, column in (
+                ('recommendations', 'recommendation'),
+                ('acquirer_industries', 'acquirer_industry'),
+                ('target_industries', 'target_industry')
+            )
+        }
+
+    def _mask(self, table, scores, filters):
+        mask = np.ones(len(table), dtype=bool)
+        if filters.get('min_score') is not None:
+            mask &= scores[:, 0] >= filters['min_score']
+        if filters.get('max_score') is not None:
+            mask &= scores[:, 0] <= filters['max_score']
+
+        for name, column in (
+            ('recommendations', 'recommendation'),
+            ('acquirer_industries', 'acquirer_industry'),
+            ('target_industries', 'target_industry')
+        ):
+            if filters.get(name):
+                accepted = pc.is_in(table[column].cast(pa.string()), value_set=pa.array(list(filters[name])))
+                mask &= accepted.to_numpy(zero_copy_only=False)
+
+        search = (filters.get('search') or '').strip()
+        if search:
+            found = pc.or_(*[
+                pc.match_substring(table[column].cast(pa.string()), search, ignore_case=True)
+                for column in ('acquirer', 'target')
+            ])
+            mask &= pc.fill_null(found, False).to_numpy(zero_copy_only=False)
+        return mask
+
+    def _order(self, filters, sort_by, descending):
+        """Row indices matching filters in sort order, cached per query"""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Can't sort by '{sort_by}'. Use one of: {', '.join(SORT_COLUMNS)}")
+        table, scores = self._load()
+        key = (self._version, _query_key(filters), sort_by, descending)
+        with self._lock:
+            if key in self._orders:
+                self._orders.move_to_end(key)
+                return table, self._orders[key]
+
+        rows = np.flatnonzero(self._mask(table, scores, filters or {}))
+        if len(rows):
+            # Ties break on deal key so pages are stable across reruns
+            values = table[sort_by].take(rows)
+            if pa.types.is_dictionary(values.type):
+                values = values.cast(pa.string())
+            subset = pa.table({'value': values, 'key': table['key'].take(rows)})
+            order = pc.sort_indices(subset, sort_keys=[
+                ('value', 'descending' if descending else 'ascending'), ('key', 'ascending')
+            ])
+            rows = rows[order.to_numpy()]
+
+        with self._lock:
+            if key[0] == self._version:
+                self._orders[key] = rows
+                while len(self._orders) > self.max_cached:
+                    self._orders.popitem(last=False)
+        return table, rows
+
+    def page(self, filters=None, sort_by='overall_score', descending=True, page=1, page_size=50):
+        """
+        One page of the filtered, sorted portfolio
+
+        Returns:
+            dict: total (matching deals), page (clamped to the valid range),
+            pages and rows (pyarrow.Table of that page's score columns)
+        """
+        table, rows = self._order(filters, sort_by, descending)
+        pages = max(1, -(-len(rows) // page_size))
+        page = min(max(1, int(page)), pages)
+        start = (page - 1) * page_size
+        return {
+            "total": len(rows),
+            "page": page,
+            "pages": pages,
+            "rows": table.take(rows[start:start + page_size])
+        }
+
+    def movers(self, limit=20):
+        """Biggest score movers from the store's history, recomputed only when it changes"""
+        key = (self.store.history.version(), limit)
+        with self._lock:
+            if self._movers and self._movers[0] == key:
+                return self._movers[1]
+        movers = self.store.history.movers(limit=limit)
+        with self._lock:
+            self._movers = (key, movers)
+        return movers
+
+    def aggregates(self, filters=None):
+        """
+        Chart-ready summaries of the deals matching filters
+
+        Returns:
+            dict: count, recommendations (count per band, best first),
+            bins (HISTOGRAM_BINS), histograms (count per bin for 'overall'
+            and each dimension) and means (same keys)
+        """
+        table, scores = self._load()
+        mask = self._mask(table, scores, filters or {})
+        selected = scores[mask]
+        counts = {
+            row['values']: row['counts']
+            for row in pc.value_counts(table['recommendation'].cast(pa.string()).filter(mask)).to_pylist()
+        }
+
+        names = ['overall', *DIMENSIONS]
+        return {
+            "count": len(selected),
+            "recommendations": {label: counts.get(label, 0) for _, label in RECOMMENDATION_BANDS},
+            "bins": HISTOGRAM_BINS.tolist(),
+            "histograms": {
+                name: np.histogram(selected[:, i], bins=HISTOGRAM_BINS)[0].tolist() for i, name in enumerate(names)
+            },
+            "means": {
+                name: round(float(selected[:, i].mean()), 1) if len(selected) else None
+                for i, name in enumerate(names)
+            }
+        }
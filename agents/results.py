@@ -0,0 +1,408 @@
+"""
+Typed analysis results and a columnar result store
+
+AnalysisResult replaces the nested analysis dict for storage: fixed slots,
+float scores in DIMENSIONS order and tuples for the free-text lists.
+ResultStore keeps results in Parquet under RESULTS_STORE_DIR (default
+"results_store"). Scores, recommendation and metadata are dense columns.
+The free text (details, evidence, risks, synergies) lives in separate
+dictionary-encoded columns that are only read when asked for, so loading
+and filtering a large history touches only a few compact columns. Every
+append is also recorded in the store's ScoreHistory (agents/history.py).
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from agents.history import ScoreHistory, compacted_path, read_parts, remove_parts
+from config.scoring import DIMENSIONS
+from utils.scoring import dimension_row
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+
+# Dense columns: everything needed to rank, filter and chart results
+SCORE_FIELDS = [
+    pa.field('key', pa.string()),
+    pa.field('status', _TEXT),
+    pa.field('acquirer', _TEXT),
+    pa.field('acquirer_industry', _TEXT),
+    pa.field('target', pa.string()),
+    pa.field('target_industry', _TEXT),
+    pa.field('overall_score', pa.float32()),
+    pa.field('recommendation', _TEXT),
+    *[pa.field(dim, pa.float32()) for dim in DIMENSIONS],
+    pa.field('completed_at', pa.timestamp('s')),
+    # Provenance: which model and prompt scored the deal, from what data
+    pa.field('model', _TEXT),
+    pa.field('prompt_version', _TEXT),
+    pa.field('acquirer_fingerprint', _TEXT),
+    pa.field('target_fingerprint', _TEXT)
+]
+
+# Free text, read only when full results are materialized
+TEXT_FIELDS = [
+    pa.field('recommendation_detail', pa.string()),
+    pa.field('note', pa.string()),
+    pa.field('top_synergies', pa.list_(pa.string())),
+    pa.field('top_risks', pa.list_(pa.string())),
+    *[pa.field(f"{dim}_evidence", pa.list_(pa.string())) for dim in DIMENSIONS],
+    *[pa.field(f"{dim}_risks", pa.list_(pa.string())) for dim in DIMENSIONS]
+]
+
+SCHEMA = pa.schema(SCORE_FIELDS + TEXT_FIELDS)
+SCORE_COLUMNS = [field.name for field in SCORE_FIELDS]
+TEXT_COLUMNS = [field.name for field in TEXT_FIELDS]
+
+
+def _strings(values):
+    return tuple(str(value) for value in values or ())
+
+
+class Dimension:
+    __slots__ = ('score', 'evidence', 'risks')
+
+    def __init__(self, score, evidence=(), risks=()):
+        self.score = round(float(score), 1)
+        self.evidence = _strings(evidence)
+        self.risks = _strings(risks)
+
+    def to_dict(self):
+        score = int(self.score) if self.score.is_integer() else self.score
+        return {"score": score, "evidence": list(self.evidence), "risks": list(self.risks)}
+
+
+class AnalysisResult:
+    __slots__ = (
+        'key', 'status', 'acquirer', 'acquirer_industry', 'target', 'target_industry',
+        'overall_score', 'recommendation', 'recommendation_detail', 'note',
+        'dimensions', 'top_synergies', 'top_risks', 'completed_at',
+        'model', 'prompt_version', 'acquirer_fingerprint', 'target_fingerprint'
+    )
+
+    def __init__(self, key, acquirer, acquirer_industry, target, target_industry,
+                 overall_score, recommendation, dimensions, recommendation_detail='',
+                 top_synergies=(), top_risks=(), status='ok', note=None, completed_at=None,
+                 model=None, prompt_version=None, acquirer_fingerprint=None, target_fingerprint=None):
+        """
+        One analysis with fixed fields
+
+        Args:
+            dimensions: Dimension per entry of DIMENSIONS, in that order
+            status: 'ok', or 'fallback' when the model call failed
+            completed_at: datetime (defaults to now)
+            model, prompt_version: What produced the scores, where known
+            acquirer_fingerprint, target_fingerprint: Content hashes of the
+                company profiles the analysis was based on
+        """
+        self.key = key
+        self.status = status
+        self.acquirer = acquirer
+        self.acquirer_industry = acquirer_industry
+        self.target = target
+        self.target_industry = target_industry
+        self.overall_score = round(float(overall_score), 1)
+        self.recommendation = recommendation
+        self.recommendation_detail = recommendation_detail or ''
+        self.note = note
+        self.dimensions = tuple(dimensions)
+        self.top_synergies = _strings(top_synergies)
+        self.top_risks = _strings(top_risks)
+        self.completed_at = (completed_at or datetime.now()).replace(microsecond=0)
+        self.model = model
+        self.prompt_version = prompt_version
+        self.acquirer_fingerprint = acquirer_fingerprint
+        self.target_fingerprint = target_fingerprint
+
+    @classmethod
+    def from_analysis(cls, key, analysis, acquirer_data, target_data, completed_at=None, collected_data=None):
+        """Build from an analyzer output plus the deal's company data (and collected profiles)"""
+        raw = analysis.get('dimensions') or {}
+        collected_data = collected_data or {}
+        scores = dimension_row(raw)
+        dimensions = [
+            Dimension(score, (raw.get(dim) or {}).get('evidence'), (raw.get(dim) or {}).get('risks'))
+            for dim, score in zip(DIMENSIONS, scores)
+        ]
+        return cls(
+            key=key,
+            acquirer=acquirer_data['name'],
+            acquirer_industry=acquirer_data['industry'],
+            target=target_data['name'],
+            target_industry=target_data['industry'],
+            overall_score=analysis['overall_score'],
+            recommendation=analysis['recommendation'],
+            dimensions=dimensions,
+            recommendation_detail=analysis.get('recommendation_detail'),
+            top_synergies=analysis.get('top_synergies'),
+            top_risks=analysis.get('top_risks'),
+            # Fallback analyses carry a note explaining the model call failed
+            status='fallback' if analysis.get('note') else 'ok',
+            note=analysis.get('note'),
+            completed_at=completed_at,
+            model=analysis.get('model'),
+            prompt_version=analysis.get('prompt_version'),
+            acquirer_fingerprint=(collected_data.get('acquirer') or {}).get('fingerprint'),
+            target_fingerprint=(collected_data.get('target') or {}).get('fingerprint')
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        """Build from a screening record with an analysis"""
+        deal = record['deal']
+        return cls.from_analysis(
+            record['key'], record['analysis'], deal['acquirer'], deal['target'],
+            completed_at=datetime.strptime(record['completed_at'], "%Y-%m-%d %H:%M:%S"),
+            collected_data=record.get('collected_data')
+        )
+
+    @property
+    def scores(self):
+        return tuple(dimension.score for dimension in self.dimensions)
+
+    def to_analysis(self):
+        """The analysis dict shape the app and visualizations expect"""
+        analysis = {
+            "overall_score": self.overall_score,
+            "recommendation": self.recommendation,
+            "recommendation_detail": self.recommendation_detail,
+            "dimensions": {dim: d.to_dict() for dim, d in zip(DIMENSIONS, self.dimensions)},
+            "top_synergies": list(self.top_synergies),
+            "top_risks": list(self.top_risks)
+        }
+        if self.note:
+            analysis['note'] = self.note
+        for name in ('model', 'prompt_version'):
+            if getattr(self, name):
+                analysis[name] = getattr(self, name)
+        return analysis
+
+
+def to_table(results):
+    """Convert AnalysisResults to an Arrow table with SCHEMA"""
+    results = list(results)
+    columns = {
+        'key': [r.key for r in results],
+        'status': [r.status for r in results],
+        'acquirer': [r.acquirer for r in results],
+        'acquirer_industry': [r.acquirer_industry for r in results],
+        'target': [r.target for r in results],
+        'target_industry': [r.target_industry for r in results],
+        'overall_score': [r.overall_score for r in results],
+        'recommendation': [r.recommendation for r in results],
+        'completed_at': [r.completed_at for r in results],
+        'model': [r.model for r in results],
+        'prompt_version': [r.prompt_version for r in results],
+        'acquirer_fingerprint': [r.acquirer_fingerprint for r in results],
+        'target_fingerprint': [r.target_fingerprint for r in results],
+        'recommendation_detail': [r.recommendation_detail for r in results],
+        'note': [r.note for r in results],
+        'top_synergies': [list(r.top_synergies) for r in results],
+        'top_risks': [list(r.top_risks) for r in results]
+    }
+    scores = np.array([r.scores for r in results], dtype=np.float32).reshape(len(results), len(DIMENSIONS))
+    for i, dim in enumerate(DIMENSIONS):
+        columns[dim] = scores[:, i]
+        columns[f"{dim}_evidence"] = [list(r.dimensions[i].evidence) for r in results]
+        columns[f"{dim}_risks"] = [list(r.dimensions[i].risks) for r in results]
+
+    return pa.table({field.name: pa.array(columns[field.name], type=field.type) for field in SCHEMA}, schema=SCHEMA)
+
+
+def from_table(table):
+    """Materialize AnalysisResults from a table holding every SCHEMA column"""
+    rows = table.select(SCHEMA.names).to_pylist()
+    return [
+        AnalysisResult(
+            key=row['key'],
+            acquirer=row['acquirer'],
+            acquirer_industry=row['acquirer_industry'],
+            target=row['target'],
+            target_industry=row['target_industry'],
+            overall_score=row['overall_score'],
+            recommendation=row['recommendation'],
+            dimensions=[
+                Dimension(row[dim], row[f"{dim}_evidence"], row[f"{dim}_risks"]) for dim in DIMENSIONS
+            ],
+            recommendation_detail=row['recommendation_detail'],
+            top_synergies=row['top_synergies'],
+            top_risks=row['top_risks'],
+            status=row['status'],
+            note=row['note'],
+            completed_at=row['completed_at'],
+            model=row['model'],
+            prompt_version=row['prompt_version'],
+            acquirer_fingerprint=row['acquirer_fingerprint'],
+            target_fingerprint=row['target_fingerprint']
+        )
+        for row in rows
+    ]
+
+
+def write_parquet(results, path):
+    """Write AnalysisResults to one Parquet file, atomically"""
+    _write_table(to_table(results), path)
+
+
+def _write_table(table, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+# Seconds after which a compaction lock is taken to be left by a crashed process
+COMPACT_LOCK_TIMEOUT = 600
+
+
+class ResultStore:
+    def __init__(self, root=None, compact_parts=None):
+        """
+        Append-only Parquet store of analysis results
+
+        Each append writes one part file, so concurrent writers never share
+        a file. A key appended more than once resolves to its latest 'ok'
+        row (its latest row if it has none), so a fallback analysis never
+        hides a good one. Once more than compact_parts parts pile up, an
+        append merges them and drops superseded rows; every row stays in
+        self.history.
+
+        Args:
+            root: Store directory (or set RESULTS_STORE_DIR, default results_store)
+            compact_parts: Parts kept before appends compact the store (or set
+                RESULTS_COMPACT_PARTS, default 32; 0 never compacts automatically)
+        """
+        self.root = root or os.getenv('RESULTS_STORE_DIR', 'results_store')
+        if compact_parts is None:
+            compact_parts = int(os.getenv('RESULTS_COMPACT_PARTS', '32'))
+        self.compact_parts = compact_parts
+        os.makedirs(self.root, exist_ok=True)
+        self.history = ScoreHistory(os.path.join(self.root, 'history'))
+
+    def _parts(self):
+        # Part names start with a nanosecond timestamp, so name order is append order
+        return sorted(
+            os.path.join(self.root, name) for name in os.listdir(self.root) if name.endswith('.parquet')
+        )
+
+    def version(self):
+        """Names of the current part files; changes whenever the store does"""
+        return tuple(os.path.basename(part) for part in self._parts())
+
+    def append(self, results):
+        """Persist results, the last one per key (preferring 'ok' ones); returns the number written"""
+        latest = {}
+        for result in results:
+            if result.status == 'ok' or latest.get(result.key, result).status != 'ok':
+                latest[result.key] = result
+        results = list(latest.values())
+        if results:
+            table = to_table(results)
+            _write_table(table, os.path.join(self.root, f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"))
+            self.history.append(table)
+            if self.compact_parts and len(self._parts()) > self.compact_parts:
+                self.compact()
+        return len(results)
+
+    def load(self, columns=None, where=None, latest=True):
+        """
+        Read results as an Arrow table
+
+        Args:
+            columns: Columns to read (default SCORE_COLUMNS; TEXT_COLUMNS are
+                only read when listed)
+            where: pyarrow.compute expression, e.g.
+                pc.field('overall_score') >= 70, pushed down to the row groups
+            latest: Keep only the latest row per key
+
+        Returns:
+            pyarrow.Table
+        """
+        columns = list(columns or SCORE_COLUMNS)
+        return read_parts(self._parts, lambda parts: self._load(parts, columns, where, latest))
+
+    def _load(self, parts, columns, where, latest):
+        if not parts:
+            return SCHEMA.empty_table().select(columns)
+
+        if len(parts) == 1 or not latest:
+            # Keys are unique within a part, so the filter can skip row groups on read
+            return pq.read_table(parts, columns=columns, filters=where, schema=SCHEMA).select(columns)
+
+        # Older rows of a key must be dropped before filtering, not after
+        read = list(dict.fromkeys(['key', 'status', *columns]))
+        table = _latest_per_key(pq.read_table(parts, columns=read, schema=SCHEMA))
+        if where is not None:
+            table = table.filter(where)
+        return table.select(columns)
+
+    def results(self, keys=None, where=None):
+        """Materialize full AnalysisResults, for keys and/or rows matching where"""
+        if keys is None:
+            return from_table(self.load(columns=SCHEMA.names, where=where))
+
+        # Filtering on key keeps every row of those keys, so it can run before
+        # picking the latest one and the text columns of other deals are never read
+        table = _latest_per_key(self.load(
+            columns=SCHEMA.names, where=pc.field('key').isin(list(keys)), latest=False
+        ))
+        return from_table(table if where is None else table.filter(where))
+
+    def compact(self):
+        """
+        Merge every part into one file holding only the latest row per key
+
+        Returns:
+            bool: False if another writer is already compacting the store
+        """
+        lock_path = os.path.join(self.root, 'compact.lock')
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < COMPACT_LOCK_TIMEOUT:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            return self.compact()
+        os.close(fd)
+
+        try:
+            self.history.compact()
+            parts = self._parts()
+            if len(parts) < 2:
+                return True
+            table = _latest_per_key(pq.read_table(parts, schema=SCHEMA))
+            path = compacted_path(parts)
+            tmp_path = f"{path}.tmp"
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+            remove_parts(part for part in parts if part != path)
+            return True
+        finally:
+            os.remove(lock_path)
+
+
+def _latest_per_key(table):
+    """
+    Rows of table, in append order, keeping one per key: the last 'ok' row,
+    or the last row of a key that has no 'ok' row
+    """
+    rows = np.arange(len(table))
+    if 'status' in table.column_names:
+        # Any 'ok' row outranks every fallback row
+        rows = rows + len(table) * pc.equal(table['status'].cast(pa.string()), 'ok').to_numpy(zero_copy_only=False)
+    best = (
+        pa.table({'key': table['key'], 'row': pa.array(rows)})
+        .group_by('key')
+        .aggregate([('row', 'max')])
+        .column('row_max')
+        .to_numpy()
+    )
+    return table.take(np.sort(best % max(len(table), 1)))
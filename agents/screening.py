@@ -0,0 +1,276 @@
+"""
+Bulk screening of many deals with resumable JSONL checkpoints
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agents.pipeline import run_analysis
+from agents.results import AnalysisResult, write_parquet
+from utils.scheduler import use_lane
+
+
+def deal_from_row(row):
+    """Accept EXAMPLE_DEALS-style nested rows or flat acquirer_*/target_* rows"""
+    if 'acquirer' in row and 'target' in row:
+        deal = {"acquirer": dict(row['acquirer']), "target": dict(row['target'])}
+    else:
+        deal = {
+            "acquirer": {
+                "name": row.get('acquirer_name'),
+                "industry": row.get('acquirer_industry'),
+                "focus": row.get('acquirer_focus'),
+                "website": row.get('acquirer_website') or None
+            },
+            "target": {
+                "name": row.get('target_name'),
+                "industry": row.get('target_industry'),
+                "website": row.get('target_website') or None
+            }
+        }
+
+    for side in ('acquirer', 'target'):
+        if not deal[side].get('name') or not deal[side].get('industry'):
+            raise ValueError(f"Deal is missing {side} name or industry: {row}")
+
+    deal['key'] = row.get('id') or row.get('key') or deal_key(deal)
+    return deal
+
+
+def deal_key(deal):
+    """Stable key for a deal, used to checkpoint and resume"""
+    payload = json.dumps(
+        {"acquirer": deal['acquirer'], "target": deal['target']},
+        sort_keys=True
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_deals(path):
+    """
+    Load deals from CSV or JSONL
+
+    CSV columns: acquirer_name, acquirer_industry, acquirer_focus,
+    acquirer_website, target_name, target_industry, target_website and an
+    optional id. JSONL lines may use the same flat fields or the nested
+    EXAMPLE_DEALS format ({"acquirer": {...}, "target": {...}}).
+
+    Returns:
+        list: Deals in EXAMPLE_DEALS format, each with a unique 'key'
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    deals = [deal_from_row(row) for row in rows]
+
+    keys = [deal['key'] for deal in deals]
+    if len(set(keys)) != len(keys):
+        raise ValueError("Duplicate deals in input - give each row a unique id")
+
+    return deals
+
+
+class JsonlCheckpoint:
+    def __init__(self, path):
+        """
+        Append-only JSONL results file that doubles as the checkpoint
+
+        Every completed deal is written as one line and fsynced, so a run
+        killed at any point resumes from the last completed deal. A torn
+        final line from a crash mid-write is dropped on open.
+        """
+        self.path = path
+        self.completed = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._recover()
+
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self):
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                valid_bytes += len(line)
+                if record.get('status') == 'ok':
+                    self.completed.add(record['key'])
+
+        if valid_bytes != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if record.get('status') == 'ok':
+                self.completed.add(record['key'])
+
+    def close(self):
+        self._file.close()
+
+
+def _screen_one(deal, collector, analyzer, previous=None):
+    started = time.time()
+    try:
+        # Bulk screens yield to interactive analyses (in other processes too, with SCHEDULER_DB)
+        with use_lane('bulk'):
+            result = run_analysis(deal, collector, analyzer, previous=previous)
+    except Exception as e:
+        return {
+            "key": deal['key'],
+            "status": "error",
+            "error": str(e),
+            "deal": {"acquirer": deal['acquirer'], "target": deal['target']},
+            "completed_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    analysis = result['analysis']
+    record = {
+        "key": deal['key'],
+        # Fallback analyses mean the model call failed; retry them on resume
+        "status": "fallback" if analysis.get('note') else "ok",
+        "deal": {"acquirer": deal['acquirer'], "target": deal['target']},
+        "analysis": analysis,
+        "collected_data": result['collected_data'],
+        "inputs": result['inputs'],
+        "changed": result['changed'],
+        "carried_forward": result['carried_forward'],
+        "seconds": round(time.time() - started, 2),
+        "completed_at": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+    if result['carried_forward']:
+        record['carried_from'] = previous.get('completed_at')
+        record['skipped_model_calls'] = result['skipped_model_calls']
+        record['skipped_prompt_tokens'] = result['skipped_prompt_tokens']
+    if 'profile' in result:
+        record['profile'] = result['profile']
+    return record
+
+
+def screen_deals(deals, collector, analyzer, output_path, concurrency=4, previous_path=None):
+    """
+    Screen deals concurrently, skipping deals already completed in output_path
+
+    Args:
+        previous_path: Optional results JSONL of an earlier screen. Deals
+            whose analysis inputs are unchanged since it (same prompt
+            sections, prompt version, models and config) carry their
+            analysis forward instead of calling the model again.
+
+    Returns:
+        dict: Counts of skipped, ok, fallback and error deals, plus carried
+        (deals carried forward), rescored (those of them re-scored for changed
+        weights), skipped_model_calls and skipped_prompt_tokens (model calls
+        and prompt tokens saved by them) and changed (re-analyzed deals per changed
+        input, 'new' for deals not in previous_path)
+    """
+    checkpoint = JsonlCheckpoint(output_path)
+    pending = [deal for deal in deals if deal['key'] not in checkpoint.completed]
+    counts = {
+        "skipped": len(deals) - len(pending), "ok": 0, "fallback": 0, "error": 0,
+        "carried": 0, "rescored": 0, "skipped_model_calls": 0, "skipped_prompt_tokens": 0, "changed": {}
+    }
+    previous = {record['key']: record for record in iter_latest_records(previous_path)} if previous_path else {}
+
+    print(f"📋 {len(deals)} deals: {counts['skipped']} already done, {len(pending)} to screen")
+
+    done = counts['skipped']
+    queue = iter(pending)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            while True:
+                # Keep a bounded number of deals in flight
+                while len(in_flight) < concurrency * 2:
+                    deal = next(queue, None)
+                    if deal is None:
+                        break
+                    in_flight[executor.submit(
+                        _screen_one, deal, collector, analyzer, previous.get(deal['key'])
+                    )] = deal
+
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    deal = in_flight.pop(future)
+                    record = future.result()
+                    checkpoint.write(record)
+                    counts[record['status']] += 1
+                    done += 1
+                    if record.get('carried_forward'):
+                        counts['carried'] += 1
+                        if record.get('changed'):
+                            counts['rescored'] += 1
+                        counts['skipped_model_calls'] += record['skipped_model_calls']
+                        counts['skipped_prompt_tokens'] += record['skipped_prompt_tokens']
+                    else:
+                        for name in record.get('changed', []):
+                            counts['changed'][name] = counts['changed'].get(name, 0) + 1
+
+                    label = f"{deal['acquirer']['name']} → {deal['target']['name']}"
+                    if record['status'] == 'error':
+                        print(f"[{done}/{len(deals)}] ❌ {label}: {record['error']}")
+                    else:
+                        analysis = record['analysis']
+                        icon = "♻️" if record['carried_forward'] else "✅"
+                        print(f"[{done}/{len(deals)}] {icon} {label}: "
+                              f"{analysis.get('overall_score')} ({analysis.get('recommendation')})")
+        except KeyboardInterrupt:
+            print("\n⏹️ Interrupted - waiting for in-flight deals, rerun to resume")
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            checkpoint.close()
+
+    return counts
+
+
+def iter_latest_records(output_path):
+    """Yield the latest record per deal key from a results file"""
+    latest = {}
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                latest[record['key']] = record
+    return iter(latest.values())
+
+
+def analysis_results(output_path):
+    """AnalysisResults for the latest record per deal, skipping deals that errored"""
+    return [
+        AnalysisResult.from_record(record)
+        for record in iter_latest_records(output_path) if record.get('analysis')
+    ]
+
+
+def export_parquet(output_path, parquet_path):
+    """
+    Export the latest analysis per deal to one Parquet file
+
+    Uses the ResultStore schema (agents/results.py): dense score and
+    metadata columns plus dictionary-encoded text columns.
+    """
+    results = analysis_results(output_path)
+    write_parquet(results, parquet_path)
+    return len(results)
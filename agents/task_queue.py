@@ -0,0 +1,289 @@
+"""
+Durable SQLite-backed task queue for collect/analyze work
+
+Workers lease tasks for a visibility timeout and must complete, fail or
+extend them before it expires. Tasks whose lease expires (e.g. the worker
+crashed) become visible again; tasks that fail max_attempts times are moved
+to the dead-letter state for inspection and manual requeue.
+
+The database can live on a filesystem shared by several machines, provided
+it supports POSIX locks (SQLite over NFS without working locks is unsafe).
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL DEFAULT 'ready',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (status, available_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_dedupe ON tasks (dedupe_key) WHERE status IN ('ready', 'leased');
+CREATE INDEX IF NOT EXISTS idx_tasks_dedupe_key ON tasks (dedupe_key);
+"""
+
+
+class Task:
+    __slots__ = ('id', 'kind', 'payload', 'attempts', 'max_attempts', 'lease_owner')
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.payload = json.loads(row['payload'])
+        self.attempts = row['attempts']
+        self.max_attempts = row['max_attempts']
+        self.lease_owner = row['lease_owner']
+
+
+class TaskQueue:
+    def __init__(self, path=None, visibility_timeout=300, max_attempts=3, retry_backoff=5):
+        """
+        Open (and create if needed) a queue database
+
+        Args:
+            path: SQLite file (or set TASK_QUEUE_DB, default task_queue.db)
+            visibility_timeout: Seconds a lease lasts without a heartbeat
+            max_attempts: Default attempts before a task is dead-lettered
+            retry_backoff: Base seconds for exponential backoff between retries
+        """
+        self.path = path or os.getenv('TASK_QUEUE_DB', 'task_queue.db')
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as conn:
+            table = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'").fetchone()
+            if table and 'dedupe_key TEXT UNIQUE' in table['sql']:
+                # Queues created when dedupe keys were unique forever: rebuild the table so
+                # keys only clash with tasks still queued or leased
+                conn.execute("DROP INDEX idx_tasks_ready")
+                conn.execute("DROP INDEX IF EXISTS idx_tasks_dedupe_key")
+                conn.execute("ALTER TABLE tasks RENAME TO tasks_before_dedupe_index")
+                self._create_schema(conn)
+                conn.execute("INSERT INTO tasks SELECT * FROM tasks_before_dedupe_index")
+                conn.execute("DROP TABLE tasks_before_dedupe_index")
+            else:
+                self._create_schema(conn)
+
+    @staticmethod
+    def _create_schema(conn):
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        # A connection per operation keeps the queue safe across threads and forks
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, kind, payload, dedupe_key=None, max_attempts=None, delay=0, once=False):
+        """
+        Add a task
+
+        Args:
+            kind: Task type, e.g. 'collect' or 'analyze'
+            payload: JSON-serializable dict
+            dedupe_key: If set, the task is ignored while another task with
+                the same key is queued or leased; once that one is done or
+                dead-lettered, the key can be enqueued again (e.g. a re-screen)
+            max_attempts: Attempts before dead-lettering (defaults to the queue's)
+            delay: Seconds before the task becomes visible
+            once: Also ignore the task if a task with dedupe_key ever existed,
+                whatever its status (for follow-up tasks that must run once)
+
+        Returns:
+            int: Task ID, or None if dedupe_key is already queued or leased
+            (or, with once, was ever enqueued)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if once and dedupe_key is not None and conn.execute(
+                "SELECT 1 FROM tasks WHERE dedupe_key = ? LIMIT 1", (dedupe_key,)
+            ).fetchone():
+                return None
+            cursor = conn.execute(
+                """INSERT OR IGNORE INTO tasks
+                   (kind, payload, dedupe_key, max_attempts, available_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (kind, json.dumps(payload), dedupe_key, max_attempts or self.max_attempts,
+                 now + delay, now, now)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def lease(self, worker_id, kinds=None):
+        """
+        Lease the oldest visible task
+
+        Expired leases are reclaimed here; a reclaimed task that has already
+        used all its attempts is dead-lettered instead of handed out again.
+
+        Returns:
+            Task or None if nothing is available
+        """
+        now = time.time()
+        kind_filter = ""
+        params = [now, now]
+        if kinds:
+            kind_filter = f"AND kind IN ({','.join('?' for _ in kinds)})"
+            params.extend(kinds)
+
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    f"""SELECT * FROM tasks
+                        WHERE ((status = 'ready' AND available_at <= ?)
+                               OR (status = 'leased' AND lease_expires < ?))
+                        {kind_filter}
+                        ORDER BY available_at, id LIMIT 1""",
+                    params
+                ).fetchone()
+
+                if row is None:
+                    return None
+
+                if row['status'] == 'leased' and row['attempts'] >= row['max_attempts']:
+                    conn.execute(
+                        """UPDATE tasks SET status = 'dead', lease_owner = NULL, updated_at = ?,
+                           error = COALESCE(error, 'Lease expired on final attempt') WHERE id = ?""",
+                        (now, row['id'])
+                    )
+                    continue
+
+                conn.execute(
+                    """UPDATE tasks SET status = 'leased', attempts = attempts + 1,
+                       lease_owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?""",
+                    (worker_id, now + self.visibility_timeout, now, row['id'])
+                )
+                task = Task(row)
+                task.attempts += 1
+                task.lease_owner = worker_id
+                return task
+
+    def heartbeat(self, task, worker_id):
+        """
+        Extend a lease
+
+        Returns:
+            bool: False if the lease was lost (expired and taken by another worker)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE tasks SET lease_expires = ?, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (now + self.visibility_timeout, now, task.id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task, worker_id, result=None):
+        """Mark a leased task done; returns False if the lease was lost"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE tasks SET status = 'done', result = ?, error = NULL,
+                   lease_owner = NULL, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (json.dumps(result), now, task.id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task, worker_id, error):
+        """Retry a failed task with backoff, or dead-letter it after max_attempts"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM tasks WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (task.id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+
+            if row['attempts'] >= row['max_attempts']:
+                conn.execute(
+                    """UPDATE tasks SET status = 'dead', error = ?, lease_owner = NULL,
+                       updated_at = ? WHERE id = ?""",
+                    (str(error), now, task.id)
+                )
+            else:
+                conn.execute(
+                    """UPDATE tasks SET status = 'ready', error = ?, lease_owner = NULL,
+                       available_at = ?, updated_at = ? WHERE id = ?""",
+                    (str(error), now + self.retry_backoff * 2 ** (row['attempts'] - 1), now, task.id)
+                )
+            return True
+
+    def requeue_dead(self, task_ids=None):
+        """
+        Give dead-lettered tasks (all, or the given IDs) a fresh set of attempts
+
+        Dead tasks whose dedupe key has since been enqueued again stay dead.
+        """
+        now = time.time()
+        query = "UPDATE OR IGNORE tasks SET status = 'ready', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'dead'"
+        params = [now, now]
+        if task_ids:
+            query += f" AND id IN ({','.join('?' for _ in task_ids)})"
+            params.extend(task_ids)
+
+        with self._transaction() as conn:
+            return conn.execute(query, params).rowcount
+
+    def stats(self):
+        """Return task counts by kind and status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status").fetchall()
+        stats = {}
+        for row in rows:
+            stats.setdefault(row['kind'], {})[row['status']] = row['n']
+        return stats
+
+    def dead_letters(self, limit=100):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, attempts, error, updated_at FROM tasks WHERE status = 'dead' ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_results(self, kind):
+        """Yield (payload, result, completed_at) for completed tasks of a kind, completed_at in epoch seconds"""
+        with self._connect() as conn:
+            for row in conn.execute(
+                "SELECT payload, result, updated_at FROM tasks WHERE kind = ? AND status = 'done' ORDER BY id", (kind,)
+            ):
+                yield json.loads(row['payload']), json.loads(row['result']), row['updated_at']
@@ -4,16 +4,28 @@ M&A Strategic Fit Analyzer - Main Streamlit Application
 
 import streamlit as st
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
-import time
 
 # Import modules
 from config.examples import EXAMPLE_DEALS, INDUSTRIES
+from config.scoring import DIMENSION_LABELS, DIMENSIONS
 from agents import DataCollector, GeminiAnalyzer
+from agents.job_manager import JobManager
+from agents.pipeline import deal_from_fields, run_analysis
+from agents.portfolio import SORT_COLUMNS, Portfolio
+from agents.results import AnalysisResult, ResultStore
+from agents.screening import deal_key
+from scrapers import WebsiteScraper
+from utils import metrics
 from utils import (
     create_radar_chart,
     create_gauge_chart,
     create_dimension_bar_chart,
+    create_recommendation_chart,
+    create_distribution_heatmap,
+    thumbnail_data_uri,
     get_recommendation_color,
     get_recommendation_emoji
 )
@@ -88,6 +100,59 @@ if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
+if 'job_ids' not in st.session_state:
+    # Restore the job queue after a browser refresh
+    st.session_state.job_ids = [job_id for job_id in st.query_params.get('jobs', '').split(',') if job_id]
+
+
+@st.cache_resource
+def get_scraper():
+    """Process-wide scraper shared by every session (pooled connections, cache, rate limits)"""
+    return WebsiteScraper()
+
+
+@st.cache_resource
+def get_collector(analysis_mode):
+    """Process-wide data collector per analysis mode, sharing one scraper"""
+    return DataCollector(mode=analysis_mode, scraper=get_scraper())
+
+
+@st.cache_resource
+def get_analyzer():
+    """Process-wide analyzer shared by every session (one backend, router and rate limiters)"""
+    return GeminiAnalyzer()
+
+
+@st.cache_resource
+def get_job_manager():
+    """Process-wide background worker pool; jobs outlive reruns and refreshes"""
+    return JobManager(max_workers=int(os.getenv('ANALYSIS_WORKERS', '4')))
+
+
+@st.cache_resource
+def get_result_store():
+    """Process-wide columnar store of finished analyses (RESULTS_STORE_DIR)"""
+    return ResultStore()
+
+
+@st.cache_resource
+def get_portfolio():
+    """Process-wide portfolio index over the result store, reloaded when the store changes"""
+    return Portfolio(get_result_store())
+
+
+def run_and_store(deal, collector, analyzer, **kwargs):
+    """Run an analysis on a worker and persist it to the result store"""
+    result = run_analysis(deal, collector, analyzer, **kwargs)
+    try:
+        get_result_store().append([AnalysisResult.from_analysis(
+            deal_key(deal), result['analysis'], result['acquirer_data'], result['target_data'],
+            collected_data=result['collected_data']
+        )])
+    except Exception as e:
+        # Losing history shouldn't lose the analysis the user is waiting for
+        print(f"⚠️ Could not persist analysis: {e}")
+    return result
 
 
 def load_example(example_name):
@@ -104,87 +169,267 @@ def load_example(example_name):
     st.session_state.target_website = example['target']['website']
 
 
-def run_analysis(acquirer_name, acquirer_industry, acquirer_focus, acquirer_website,
-                target_name, target_industry, target_website, analysis_mode):
-    """Run the complete M&A analysis"""
-    
-    # Progress container
-    progress_container = st.empty()
-    status_text = st.empty()
-    progress_bar = st.progress(0)
+def submit_analysis(acquirer_name, acquirer_industry, acquirer_focus, acquirer_website,
+                    target_name, target_industry, target_website, analysis_mode, profile=False):
+    """Queue an M&A analysis on the background worker pool"""
     
     try:
-        # Step 1: Initialize collectors
-        status_text.text("🔧 Initializing analysis engine...")
-        progress_bar.progress(10)
-        time.sleep(0.5)
-        
-        collector = DataCollector(mode=analysis_mode)
-        analyzer = GeminiAnalyzer()
-        
-        # Step 2: Collect data
-        status_text.text(f"🔍 Scraping company data ({analysis_mode} mode)...")
-        progress_bar.progress(30)
-        
-        collected_data = collector.collect_deal_data(
-            acquirer_name=acquirer_name,
-            acquirer_website=acquirer_website,
-            acquirer_industry=acquirer_industry,
-            target_name=target_name,
-            target_website=target_website,
-            target_industry=target_industry
-        )
-        
-        progress_bar.progress(50)
-        time.sleep(0.5)
-        
-        # Step 3: Analyze with Gemini
-        status_text.text("🤖 Running AI strategic analysis...")
-        progress_bar.progress(70)
-        
-        acquirer_data = {
-            'name': acquirer_name,
-            'industry': acquirer_industry,
-            'focus': acquirer_focus,
-            'description': collected_data['acquirer'].get('description', '')
-        }
-        
-        target_data = {
-            'name': target_name,
-            'industry': target_industry,
-            'description': collected_data['target'].get('description', '')
-        }
-        
-        analysis = analyzer.analyze_strategic_fit(
-            acquirer_data=acquirer_data,
-            target_data=target_data,
-            collected_data=collected_data
-        )
-        
-        progress_bar.progress(90)
-        time.sleep(0.5)
-        
-        # Step 4: Complete
-        status_text.text("✅ Analysis complete!")
-        progress_bar.progress(100)
-        time.sleep(0.5)
-        
-        # Clear progress indicators
-        progress_container.empty()
-        status_text.empty()
-        progress_bar.empty()
-        
-        return {
-            'analysis': analysis,
-            'collected_data': collected_data,
-            'acquirer_data': acquirer_data,
-            'target_data': target_data
-        }
-    
+        collector = get_collector(analysis_mode)
+        analyzer = get_analyzer()
     except Exception as e:
         st.error(f"❌ Analysis failed: {str(e)}")
         st.error("Please check your Gemini API key and try again.")
         return None
+    
+    deal = deal_from_fields(
+        acquirer_name, acquirer_industry, acquirer_focus, acquirer_website,
+        target_name, target_industry, target_website
+    )
+    
+    job = get_job_manager().submit(
+        f"{acquirer_name} → {target_name}",
+        run_and_store, deal, collector, analyzer,
+        profile=profile or None
+    )
+    
+    # Keep job IDs in the URL so the queue survives a browser refresh
+    st.session_state.job_ids.append(job.id)
+    st.query_params['jobs'] = ','.join(st.session_state.job_ids)
+    
+    return job
+
+
+# Seconds between refreshes of the job queue while jobs are queued or running
+JOB_POLL_SECONDS = 1.0
+
+
+def display_job_queue():
+    """
+    Display queued, running and finished analyses for this session
+    
+    While jobs are queued or running the panel is a fragment that refreshes
+    itself every JOB_POLL_SECONDS, so polling redraws only the queue rather
+    than the whole page.
+    """
+    active = any(not job.is_finished for job in get_job_manager().jobs(st.session_state.job_ids))
+    st.fragment(run_every=JOB_POLL_SECONDS if active else None)(job_queue_panel)(active)
+
+
+def job_queue_panel(polling):
+    """Body of the job queue; a full rerun once the last job finishes stops the polling"""
+    jobs = get_job_manager().jobs(st.session_state.job_ids)
+    
+    # Drop jobs the server no longer knows about (e.g. after a restart)
+    known_ids = [job.id for job in jobs]
+    if known_ids != st.session_state.job_ids:
+        st.session_state.job_ids = known_ids
+        st.query_params['jobs'] = ','.join(known_ids)
+    
+    if not jobs:
+        if polling:
+            st.rerun()
+        return
+    
+    st.markdown("### 📋 Analysis Queue")
+    
+    for job in reversed(jobs):
+        col1, col2 = st.columns([4, 1])
+        
+        with col1:
+            st.markdown(f"**{job.label}**")
+            if job.status == 'failed':
+                st.error(f"❌ Analysis failed: {job.error}")
+            else:
+                event = job.latest_event
+                detail = f" ({event['detail']})" if event['detail'] else ""
+                st.progress(job.progress, text=f"{event['label']}{detail} · {job.elapsed:.0f}s")
+        
+        with col2:
+            if job.status == 'done':
+                if st.button("📊 View Results", key=f"view_{job.id}", use_container_width=True):
+                    st.session_state.analysis_complete = True
+                    st.session_state.analysis_results = job.result
+                    st.rerun()
+    
+    st.markdown("---")
+    
+    if polling and all(job.is_finished for job in jobs):
+        st.rerun()
+
+
+def display_metrics_panel():
+    """Show per-stage timings and counters collected in this process"""
+    rows = metrics.REGISTRY.summary()
+    if not rows:
+        st.caption("No analyses timed yet")
+        return
+    
+    table = pd.DataFrame(rows)
+    for column in ('mean', 'p50', 'p95'):
+        table[column] = table[column].map(lambda v: f"{v:.3f}s" if v is not None else "-")
+    st.dataframe(table, hide_index=True, use_container_width=True)
+    
+    for name, values in metrics.REGISTRY.counters().items():
+        st.caption(f"**{name}**: " + " · ".join(f"{labels}: {value}" for labels, value in values.items()))
+
+
+def chart_theme():
+    """Chart theme matching the viewer's Streamlit theme (dark until it's known)"""
+    return st.context.theme.type or 'dark'
+
+
+PORTFOLIO_COLUMNS = {
+    'overall_score': 'Overall Score',
+    **DIMENSION_LABELS,
+    'completed_at': 'Completed',
+    'acquirer': 'Acquirer',
+    'target': 'Target'
+}
+
+
+def stored_results(result):
+    """Results dict for display_results from a stored AnalysisResult"""
+    return {
+        'analysis': result.to_analysis(),
+        'acquirer_data': {'name': result.acquirer, 'industry': result.acquirer_industry},
+        'target_data': {'name': result.target, 'industry': result.target_industry},
+        'collected_data': {
+            'acquirer': {'data_sources': ['result store']},
+            'target': {'data_sources': ['result store']},
+            'timestamp': result.completed_at.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    }
+
+
+def portfolio_filters():
+    """Filter widgets for the portfolio; returns the filters dict for Portfolio"""
+    options = get_portfolio().options()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        search = st.text_input("Search companies", key='portfolio_search', placeholder="Acquirer or target name")
+        min_score, max_score = st.slider("Overall score", 0, 100, (0, 100), key='portfolio_scores')
+    
+    with col2:
+        recommendations = st.multiselect("Recommendation", options['recommendations'], key='portfolio_recommendations')
+        acquirer_industries = st.multiselect("Acquirer industry", options['acquirer_industries'],
+                                             key='portfolio_acquirer_industries')
+    
+    with col3:
+        target_industries = st.multiselect("Target industry", options['target_industries'],
+                                           key='portfolio_target_industries')
+    
+    return {
+        'search': search,
+        'min_score': min_score if min_score > 0 else None,
+        'max_score': max_score if max_score < 100 else None,
+        'recommendations': recommendations,
+        'acquirer_industries': acquirer_industries,
+        'target_industries': target_industries
+    }
+
+
+def display_portfolio():
+    """
+    Rank every stored analysis
+    
+    Filtering, sorting, paging and chart aggregation run on the server, so
+    the browser only receives the current page and the chart data.
+    """
+    portfolio = get_portfolio()
+    
+    st.markdown("### 🗂️ Portfolio")
+    
+    if not len(portfolio):
+        st.info("No stored analyses yet. Finished analyses and `cli.py --store` screens show up here.")
+        return
+    
+    filters = portfolio_filters()
+    aggregates = portfolio.aggregates(filters)
+    
+    col1, col2 = st.columns([2, 3])
+    
+    with col1:
+        st.markdown("**Deals per recommendation**")
+        st.plotly_chart(create_recommendation_chart(aggregates['recommendations']), use_container_width=True)
+    
+    with col2:
+        st.markdown("**Score distributions**")
+        st.plotly_chart(create_distribution_heatmap(aggregates['histograms'], aggregates['bins']),
+                        use_container_width=True)
+    
+    if not aggregates['count']:
+        st.warning("No deals match these filters")
+        return
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    
+    with col1:
+        sort_by = st.selectbox("Sort by", SORT_COLUMNS, format_func=PORTFOLIO_COLUMNS.get, key='portfolio_sort')
+    with col2:
+        descending = st.toggle("Highest first", value=True, key='portfolio_descending')
+    with col3:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 200], index=1, key='portfolio_page_size')
+    with col4:
+        pages = max(1, -(-aggregates['count'] // page_size))
+        # Filters can shrink the result below the page the user was on
+        if st.session_state.get('portfolio_page', 1) > pages:
+            st.session_state.portfolio_page = pages
+        page_number = st.number_input("Page", min_value=1, max_value=pages, step=1, key='portfolio_page')
+    
+    page = portfolio.page(filters, sort_by, descending, page_number, page_size)
+    rows = page['rows']
+    
+    scores = np.column_stack([rows[dim].to_numpy() for dim in DIMENSIONS])
+    theme = chart_theme()
+    
+    table = pd.DataFrame({
+        'Profile': [thumbnail_data_uri(row, theme=theme) for row in scores],
+        'Acquirer': rows['acquirer'].to_pylist(),
+        'Target': rows['target'].to_pylist(),
+        'Target Industry': rows['target_industry'].to_pylist(),
+        'Overall Score': rows['overall_score'].to_numpy().round(1),
+        'Recommendation': rows['recommendation'].to_pylist(),
+        **{DIMENSION_LABELS[dim]: scores[:, i].round(1) for i, dim in enumerate(DIMENSIONS)},
+        'Completed': rows['completed_at'].to_pylist()
+    })
+    
+    event = st.dataframe(
+        table, hide_index=True, use_container_width=True,
+        on_select='rerun', selection_mode='single-row', key='portfolio_table',
+        column_config={'Profile': st.column_config.ImageColumn("Profile", width='small')}
+    )
+    st.caption(f"Page {page['page']} of {page['pages']} · {page['total']:,} matching deals "
+               f"· mean overall score {aggregates['means']['overall']}")
+    
+    selected = event.selection.rows
+    view_clicked = selected and st.button("📊 View Results", key='portfolio_view', type="primary")
+    
+    with st.expander("📈 Biggest movers since each pair's previous run"):
+        movers = portfolio.movers()
+        if movers:
+            st.dataframe(pd.DataFrame([{
+                'Acquirer': mover['acquirer'],
+                'Target': mover['target'],
+                'Before': mover['previous'],
+                'After': mover['current'],
+                'Change': mover['delta'],
+                'Previous Run': mover['previous_at'],
+                'Latest Run': mover['current_at'],
+                'Inputs Changed': ", ".join(mover['changed']) or "-"
+            } for mover in movers]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No pair's score has moved between successful runs yet")
+    
+    if view_clicked:
+        key = rows['key'][selected[0]].as_py()
+        stored = get_result_store().results(keys=[key])
+        if stored:
+            st.session_state.analysis_complete = True
+            st.session_state.analysis_results = stored_results(stored[0])
+            st.rerun()
+        st.error("❌ This analysis is no longer in the result store")
 
 
 def display_results(results):
@@ -215,6 +460,33 @@ def display_results(results):
     
     with tab3:
         display_key_insights(analysis, results['collected_data'])
+    
+    display_score_history(acquirer_data, target_data)
+    
+    if results.get('profile'):
+        profile = results['profile']
+        st.caption(f"🔬 Profiled in {profile['seconds']:.1f}s - flamegraph stacks, cProfile stats "
+                   f"and allocations saved to `{profile['dir']}`")
+
+
+def display_score_history(acquirer_data, target_data):
+    """Chart a pair's stored scores over time, once it has been scored more than once"""
+    history = get_result_store().history.series(acquirer_data['name'], target_data['name'])
+    if len(history) < 2:
+        return
+    
+    with st.expander(f"📈 Score history ({len(history)} runs)"):
+        frame = pd.DataFrame({
+            'Overall Score': history['overall_score'].to_numpy(),
+            **{DIMENSION_LABELS[dim]: history[dim].to_numpy() for dim in DIMENSIONS}
+        }, index=pd.Index(history['completed_at'].to_pylist(), name='Completed'))
+        st.line_chart(frame.round(1))
+        
+        models = [m for m in history['model'].to_pylist() if m]
+        versions = [v for v in history['prompt_version'].to_pylist() if v]
+        if len(set(models)) > 1 or len(set(versions)) > 1:
+            st.caption(f"Runs used models {', '.join(dict.fromkeys(models))} and prompt versions "
+                       f"{', '.join(dict.fromkeys(versions))}; part of the drift may come from them")
 
 
 def display_executive_summary(analysis, acquirer_data, target_data):
@@ -227,7 +499,8 @@ def display_executive_summary(analysis, acquirer_data, target_data):
         st.plotly_chart(
             create_gauge_chart(
                 analysis['overall_score'],
-                analysis['recommendation']
+                analysis['recommendation'],
+                chart_theme()
             ),
             use_container_width=True
         )
@@ -248,7 +521,7 @@ def display_executive_summary(analysis, acquirer_data, target_data):
     with col2:
         # Radar chart
         st.plotly_chart(
-            create_radar_chart(analysis['dimensions']),
+            create_radar_chart(analysis['dimensions'], chart_theme()),
             use_container_width=True
         )
     
@@ -299,7 +572,7 @@ def display_dimension_breakdown(analysis):
     
     # Bar chart overview
     st.plotly_chart(
-        create_dimension_bar_chart(analysis['dimensions']),
+        create_dimension_bar_chart(analysis['dimensions'], chart_theme()),
         use_container_width=True
     )
     
@@ -402,6 +675,16 @@ def main():
         
         return
     
+    with st.sidebar:
+        view = st.radio("View", ["🎯 Analyze a Deal", "🗂️ Portfolio"], key='view', horizontal=True)
+    
+    if view == "🗂️ Portfolio":
+        display_portfolio()
+        return
+    
+    # Job queue is filled in after the form so newly submitted jobs show up immediately
+    queue_container = st.container()
+    
     # Pre-configured examples
     st.markdown("### 🚀 Try an Example")
     cols = st.columns(3)
@@ -479,6 +762,11 @@ def main():
             horizontal=True
         )
         
+        profile = st.checkbox(
+            "🔬 Profile this analysis",
+            help="Record CPU and memory profiles of this run (written under PROFILE_DIR)"
+        )
+        
         # Submit button
         submitted = st.form_submit_button("🚀 Analyze Strategic Fit", type="primary", use_container_width=True)
         
@@ -487,16 +775,17 @@ def main():
             if not acquirer_name or not acquirer_industry or not acquirer_focus or not target_name or not target_industry:
                 st.error("❌ Please fill in all required fields (marked with *)")
             else:
-                # Run analysis
-                results = run_analysis(
+                # Queue analysis on the background worker pool
+                job = submit_analysis(
                     acquirer_name, acquirer_industry, acquirer_focus, acquirer_website,
-                    target_name, target_industry, target_website, analysis_mode
+                    target_name, target_industry, target_website, analysis_mode, profile
                 )
                 
-                if results:
-                    st.session_state.analysis_complete = True
-                    st.session_state.analysis_results = results
-                    st.rerun()
+                if job:
+                    st.success(f"✅ Queued {job.label} - you can queue more deals while it runs")
+    
+    with queue_container:
+        display_job_queue()
     
     # Sidebar info
     with st.sidebar:
@@ -517,8 +806,11 @@ def main():
         
         st.markdown("### 🔧 Setup")
         api_key_set = bool(os.getenv('GEMINI_API_KEY'))
+        llm_backend = os.getenv('LLM_BACKEND', 'gemini').lower()
         
-        if api_key_set:
+        if llm_backend != 'gemini':
+            st.info(f"🧪 Using offline `{llm_backend}` LLM backend")
+        elif api_key_set:
             st.success("✅ Gemini API key configured")
         else:
             st.error("❌ Gemini API key not found")
@@ -532,6 +824,9 @@ def main():
         
         **Deep Mode**: Enhanced data collection with news + sentiment (~2 min)
         """)
+        
+        if st.checkbox("📈 Show pipeline metrics"):
+            display_metrics_panel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+"""
+Local web server that serves recorded company websites with simulated latency
+
+Each site in fixtures/sites/<slug>/ is served on its own port (the scraper
+resolves /about against the site root, so sites can't share a host):
+index.html answers "/", about.html answers "/about"; anything else is a 404.
+Pages can be padded with navigation, script and footer boilerplate to
+reach the sizes of real marketing sites.
+"""
+
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agents.mock_backend import LatencyDistribution
+
+SITES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'sites')
+
+_PADDING_BLOCK = (
+    '<nav class="mega-menu"><ul>'
+    + ''.join(f'<li><a href="/products/item-{i}">Product line {i}</a></li>' for i in range(12))
+    + '</ul></nav>'
+    '<script>window.__analytics = window.__analytics || [];'
+    'window.__analytics.push({"event": "pageview", "experiments": ["hero-b", "pricing-c"]});</script>'
+    '<footer><p>Copyright. All rights reserved. Terms of service, privacy policy, cookie settings.</p></footer>'
+)
+
+
+def pad_page(page, size):
+    """Grow page to at least size bytes with boilerplate inserted before </body>"""
+    missing = size - len(page)
+    if missing <= 0:
+        return page
+    block = _PADDING_BLOCK.encode('utf-8')
+    padding = block * (missing // len(block) + 1)
+    head, body_end, tail = page.rpartition(b'</body>')
+    if not body_end:
+        return page + padding
+    return head + padding + body_end + tail
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/') or '/'
+        page = self.server.pages.get(path)
+
+        delay = self.server.sample_latency()
+        if delay:
+            self.server.sleep(delay)
+
+        if page is None:
+            body, status = b'<html><body><h1>Not found</h1></body></html>', 404
+        else:
+            body, status = page, 200
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureSite(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, site_dir, latency='constant:0', seed=None, host='127.0.0.1', port=0, page_kb=0):
+        """
+        Serve one recorded site
+
+        Args:
+            site_dir: Directory with index.html and optionally about.html
+            latency: LatencyDistribution spec applied to every response
+            seed: Random seed for the latency samples
+            page_kb: Pad every page to at least this many KB (0 serves them as recorded)
+        """
+        self.pages = {}
+        for filename, path in (('index.html', '/'), ('about.html', '/about')):
+            file_path = os.path.join(site_dir, filename)
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    self.pages[path] = pad_page(f.read(), int(page_kb * 1024))
+
+        self.latency = LatencyDistribution(latency)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stop = threading.Event()
+        super().__init__((host, port), _SiteHandler)
+
+    def sample_latency(self):
+        with self._rng_lock:
+            return self.latency.sample(self._rng)
+
+    def sleep(self, seconds):
+        self._stop.wait(seconds)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+        self.shutdown()
+        self.server_close()
+
+
+class FixtureWeb:
+    def __init__(self, latency='constant:0', seed=None, sites_dir=SITES_DIR, page_kb=0):
+        """
+        Serve every recorded site, one port each
+
+        Use as a context manager; urls maps site slug to its base URL.
+        """
+        self.sites = {}
+        for i, slug in enumerate(sorted(os.listdir(sites_dir))):
+            site_dir = os.path.join(sites_dir, slug)
+            if os.path.isdir(site_dir):
+                self.sites[slug] = FixtureSite(
+                    site_dir, latency, None if seed is None else seed + i, page_kb=page_kb
+                )
+
+    @property
+    def urls(self):
+        return {slug: site.url for slug, site in self.sites.items()}
+
+    def __enter__(self):
+        for site in self.sites.values():
+            site.start_background()
+        return self
+
+    def __exit__(self, *exc):
+        for site in self.sites.values():
+            site.stop()
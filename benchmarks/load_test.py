@@ -0,0 +1,267 @@
+"""
+Load test simulating concurrent analysts in one Streamlit process
+
+Each simulated user submits analyses to a shared JobManager the way the
+app does, waits for each to finish and thinks before the next. Websites
+come from the fixture server, padded to realistic page sizes and delayed
+by simulated network latency; the model is the mock backend. Every
+session's deals are distinct, so scrape and analysis coalescing doesn't
+flatter the numbers.
+
+Usage:
+    python -m benchmarks.load_test [--users 1,2,4,8,16,32] [--analyses 3]
+
+Each concurrency level reports throughput, p50/p95/p99 latency per stage
+(queue wait through parse, plus the end-to-end session latency) and memory
+per session. The run reports where throughput stops scaling and where the
+p95 session latency breaks the SLO or errors appear - the point where
+the single process falls over.
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+from agents import DataCollector, GeminiAnalyzer
+from agents.job_manager import JobManager
+from agents.mock_backend import MockBackend
+from agents.model_router import ModelRouter
+from agents.pipeline import run_analysis
+from benchmarks.fixture_server import FixtureWeb
+from benchmarks.run import RESULTS_DIR, _git_commit, _percentile, fixture_deals
+from scrapers import WebsiteScraper
+
+# Stage spans measured from job events: each runs from its event to the next one
+STAGE_SPANS = [
+    ('queue_wait', 'queued'),
+    ('scrape_acquirer', 'scrape_acquirer'),
+    ('scrape_target', 'scrape_target'),
+    ('build_prompt', 'build_prompt'),
+    ('model', 'model'),
+    ('parse', 'parse')
+]
+
+
+def _rss_mb():
+    """Current resident set size, falling back to the peak where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def session_deal(deal, user, index):
+    """Copy of deal unique to one session's analysis"""
+    tag = f"{user}-{index}"
+    deal = {side: dict(deal[side]) for side in ('acquirer', 'target')}
+    for side in ('acquirer', 'target'):
+        deal[side]['website'] = f"{deal[side]['website']}/?session={tag}"
+    deal['acquirer']['focus'] = f"{deal['acquirer']['focus']} (session {tag})"
+    return deal
+
+
+def stage_timings(job):
+    """Seconds spent in each stage of a finished job, from its event timestamps"""
+    times = {}
+    for event in job.events:
+        times.setdefault(event['stage'], event['time'])
+    end = times.get('complete') or job.finished_at
+
+    timings = {}
+    for i, (name, stage) in enumerate(STAGE_SPANS):
+        if stage not in times:
+            continue
+        following = [times[s] for _, s in STAGE_SPANS[i + 1:] if s in times]
+        timings[name] = (following[0] if following else end) - times[stage]
+    timings['session'] = job.finished_at - job.submitted_at
+    return timings
+
+
+def simulate_user(user, deals, jobs, collector, analyzer, analyses, think, poll, out):
+    for index in range(analyses):
+        deal = session_deal(deals[(user + index) % len(deals)], user, index)
+        job = jobs.submit(
+            f"{deal['acquirer']['name']} → {deal['target']['name']}",
+            run_analysis, deal, collector, analyzer
+        )
+        # The app reruns and polls every session's jobs until they finish
+        while not job.is_finished:
+            time.sleep(poll)
+        out.append(job)
+        if think:
+            time.sleep(think)
+
+
+def run_level(users, args, urls):
+    """Run one concurrency level against fresh pipeline objects"""
+    scraper = WebsiteScraper(cache_ttl=0, requests_per_host_per_minute=1000000)
+    collector = DataCollector(scraper=scraper)
+    analyzer = GeminiAnalyzer(
+        backend=MockBackend(latency=args.model_latency, error_rate=args.error_rate, seed=users),
+        router=ModelRouter(pool=[{
+            "name": "models/mock",
+            "max_concurrency": args.model_concurrency,
+            "requests_per_minute": 100000
+        }])
+    )
+    jobs = JobManager(max_workers=args.workers)
+    deals = fixture_deals(urls, 3)
+
+    gc.collect()
+    rss_before = _rss_mb()
+    finished = []
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(user, deals, jobs, collector, analyzer, args.analyses, args.think, args.poll, finished)
+        )
+        for user in range(users)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    # Sessions keep their results, as Streamlit session state would
+    rss_after = _rss_mb()
+    result_bytes = [
+        len(json.dumps(job.result, default=str)) for job in finished if job.result is not None
+    ]
+
+    samples = {}
+    for job in finished:
+        if job.status == 'done':
+            for name, seconds in stage_timings(job).items():
+                samples.setdefault(name, []).append(seconds)
+
+    failed = sum(1 for job in finished if job.status == 'failed')
+    fallback = sum(1 for job in finished if job.result and job.result['analysis'].get('note'))
+    return {
+        "users": users,
+        "analyses": len(finished),
+        "failed": failed,
+        "fallback": fallback,
+        "error_rate": (failed + fallback) / len(finished) if finished else 0.0,
+        "wall_seconds": wall,
+        "throughput_per_min": 60.0 * (len(finished) - failed) / wall if wall else None,
+        "latency": {
+            name: {
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99)
+            }
+            for name, values in samples.items()
+        },
+        "memory": {
+            "rss_before_mb": round(rss_before, 1),
+            "rss_after_mb": round(rss_after, 1),
+            "per_session_mb": round(max(0.0, rss_after - rss_before) / users, 2),
+            "result_kb_per_session": round(sum(result_bytes) / 1024 / users, 1)
+        }
+    }
+
+
+def find_knee(levels, slo, max_error_rate, min_gain):
+    """
+    Locate where the process stops scaling and where it breaks
+
+    Returns:
+        dict: saturated_at (first level adding less than min_gain throughput
+        over the previous one) and breaks_at (first level over the p95
+        session SLO or max_error_rate), each None if never reached
+    """
+    saturated_at = breaks_at = None
+    for previous, level in zip([None] + levels, levels):
+        if saturated_at is None and previous and previous['throughput_per_min']:
+            if level['throughput_per_min'] < previous['throughput_per_min'] * (1 + min_gain):
+                saturated_at = level['users']
+        p95 = level['latency'].get('session', {}).get('p95')
+        if breaks_at is None and (p95 is None or p95 > slo or level['error_rate'] > max_error_rate):
+            breaks_at = level['users']
+    return {"saturated_at": saturated_at, "breaks_at": breaks_at}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent analysts against one process")
+    parser.add_argument('--users', default='1,2,4,8,16,32', help="Comma-separated concurrency levels")
+    parser.add_argument('--analyses', type=int, default=3, help="Analyses each user runs per level")
+    parser.add_argument('--think', type=float, default=1.0, help="Seconds a user waits between analyses")
+    parser.add_argument('--poll', type=float, default=0.25, help="Seconds between a session's job polls")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('ANALYSIS_WORKERS', '4')),
+                        help="JobManager workers, as ANALYSIS_WORKERS sets for the app")
+    parser.add_argument('--model-concurrency', type=int, default=8)
+    parser.add_argument('--page-kb', type=float, default=64, help="Size fixture pages are padded to")
+    parser.add_argument('--net-latency', default='lognormal:0.25:0.5',
+                        help="Simulated website latency (LatencyDistribution spec)")
+    parser.add_argument('--model-latency', default='lognormal:1.5:0.4',
+                        help="Simulated model latency (LatencyDistribution spec)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Mock model error probability")
+    parser.add_argument('--slo', type=float, default=60.0, help="p95 session latency budget in seconds")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--min-gain', type=float, default=0.1,
+                        help="Throughput gain below which a level counts as saturated")
+    parser.add_argument('--output', help="Results JSON path (default benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    user_levels = [int(u) for u in args.users.split(',') if u.strip()]
+    levels = []
+
+    print(f"🧪 Load testing {args.workers} workers at {user_levels} concurrent users...")
+    with FixtureWeb(latency=args.net_latency, seed=7, page_kb=args.page_kb) as web:
+        # Warm imports, regex caches and connection pools so level one isn't charged for them
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            run_level(1, argparse.Namespace(**dict(vars(args), analyses=1, think=0)), web.urls)
+
+        for users in user_levels:
+            # The pipeline logs every step; keep the report readable
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                level = run_level(users, args, web.urls)
+            levels.append(level)
+
+            session = level['latency'].get('session', {})
+            print(
+                f"  {users:>4} users  {level['throughput_per_min']:>7.1f}/min"
+                f"  session p50 {session.get('p50', 0):>6.2f}s p95 {session.get('p95', 0):>6.2f}s"
+                f" p99 {session.get('p99', 0):>6.2f}s  queue p95"
+                f" {level['latency'].get('queue_wait', {}).get('p95', 0):>6.2f}s"
+                f"  errors {level['error_rate']:.1%}  {level['memory']['per_session_mb']:.2f} MB/session"
+            )
+
+    knee = find_knee(levels, args.slo, args.max_error_rate, args.min_gain)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "settings": vars(args)
+        },
+        "levels": levels,
+        "knee": knee
+    }
+
+    def describe(users):
+        return f"{users} users" if users else "not reached"
+
+    print(f"📈 Throughput stops scaling at: {describe(knee['saturated_at'])}")
+    print(f"💥 p95 over {args.slo:.0f}s or errors over {args.max_error_rate:.0%} at: {describe(knee['breaks_at'])}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
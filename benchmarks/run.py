@@ -0,0 +1,314 @@
+"""
+Offline benchmark suite for the analysis pipeline
+
+Everything runs against recorded fixtures (benchmarks/fixtures): company
+websites served from a local server with simulated latency, a corpus of
+awkward real-world page shapes, and recorded model responses covering each
+JSON parse/repair path. No API key or network access is needed.
+
+Usage:
+    python -m benchmarks.run [--quick] [--output FILE] [--baseline FILE]
+
+Results are written as JSON (default benchmarks/results/<timestamp>.json).
+With --baseline, benchmarks whose median slowed down by more than
+--threshold are reported and the exit code is 1.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import redirect_stdout
+
+from agents import DataCollector, GeminiAnalyzer
+from agents.mock_backend import MockBackend
+from agents.model_router import ModelRouter
+from agents.screening import deal_from_row, screen_deals
+from benchmarks.fixture_server import FixtureWeb
+from config.examples import EXAMPLE_DEALS
+from config.prompts import get_analysis_prompt
+from scrapers import WebsiteScraper
+from utils import metrics
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# One unthrottled mock model, so the router's quota limits don't dominate timings
+BENCH_POOL = [{"name": "models/mock", "max_concurrency": 8, "requests_per_minute": 100000}]
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))]
+
+
+def bench(name, group, fn, repeat):
+    """
+    Time fn, calibrating the number of calls per round like timeit does
+
+    Returns:
+        dict: Per-call min/median/mean/p95 seconds and ops per second
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    median = _percentile(per_call, 50)
+    return {
+        "name": name,
+        "group": group,
+        "calls": number * repeat,
+        "per_call_seconds": {
+            "min": min(per_call),
+            "median": median,
+            "mean": sum(per_call) / len(per_call),
+            "p95": _percentile(per_call, 95)
+        },
+        "ops_per_sec": 1.0 / median if median else None
+    }
+
+
+def load_html_corpus():
+    """Recorded site pages plus the real-world page corpus, by name"""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'sites', '*', '*.html'))):
+        site = os.path.basename(os.path.dirname(path))
+        corpus[f"{site}/{os.path.basename(path)}"] = open(path, encoding='utf-8').read()
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'pages', '*.html'))):
+        corpus[f"pages/{os.path.basename(path)}"] = open(path, encoding='utf-8').read()
+
+    # A bloated page (long nav, hundreds of paragraphs) as the worst case
+    article = corpus['pages/article.html']
+    corpus['pages/article_x20.html'] = article.replace('<article>', '<article>' + article * 19, 1)
+    return corpus
+
+
+def load_responses():
+    responses = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'responses', '*'))):
+        responses[os.path.splitext(os.path.basename(path))[0]] = open(path, encoding='utf-8').read()
+    return responses
+
+
+def fixture_deals(urls, count):
+    """EXAMPLE_DEALS pointed at the fixture sites, repeated to count deals"""
+    base = []
+    for deal in EXAMPLE_DEALS.values():
+        deal = {side: dict(deal[side]) for side in ('acquirer', 'target')}
+        for side in ('acquirer', 'target'):
+            deal[side]['website'] = urls[deal[side]['name'].lower()]
+        base.append(deal)
+
+    return [
+        deal_from_row(dict(base[i % len(base)], id=f"bench-{i:05d}"))
+        for i in range(count)
+    ]
+
+
+def bench_extraction(scraper, corpus, repeat):
+    results = []
+    for page, html in corpus.items():
+        extract = scraper._extract_about_info if 'about' in page else scraper._extract_homepage_info
+        group = 'extract_about_info' if 'about' in page else 'extract_homepage_info'
+        results.append(bench(f"{group}[{page}]", group, lambda: extract(html), repeat))
+
+    # Every page through both extractors, as the scraper's fallbacks do
+    results.append(bench(
+        "extract_all[corpus]", 'extract_all',
+        lambda: [(scraper._extract_about_info(h), scraper._extract_homepage_info(h)) for h in corpus.values()],
+        repeat
+    ))
+    return results
+
+
+def bench_prompts(collected, repeat):
+    results = []
+    for deal_name, (acquirer_data, target_data, collected_data) in collected.items():
+        results.append(bench(
+            f"get_analysis_prompt[{deal_name}]", 'get_analysis_prompt',
+            lambda a=acquirer_data, t=target_data, c=collected_data: get_analysis_prompt(a, t, c, a['industry']),
+            repeat
+        ))
+    return results
+
+
+def bench_parse(analyzer, responses, repeat):
+    results = []
+    for name, text in responses.items():
+        def parse(text=text):
+            try:
+                analyzer._parse_response(text)
+            except ValueError:
+                pass
+        results.append(bench(f"parse_response[{name}]", 'parse_response', parse, repeat))
+    return results
+
+
+def collect_fixture_data(urls):
+    """Scrape each example deal from the fixture sites once, for the prompt benchmarks"""
+    collector = DataCollector(scraper=WebsiteScraper(cache_ttl=0, requests_per_host_per_minute=1000000))
+    collected = {}
+    for deal_name, deal in EXAMPLE_DEALS.items():
+        acquirer, target = deal['acquirer'], deal['target']
+        data = collector.collect_deal_data(
+            acquirer['name'], urls[acquirer['name'].lower()], acquirer['industry'],
+            target['name'], urls[target['name'].lower()], target['industry']
+        )
+        acquirer_data = dict(acquirer, description=data['acquirer'].get('description', ''))
+        target_data = dict(target, description=data['target'].get('description', ''))
+        collected[deal_name] = (acquirer_data, target_data, data)
+    return collected
+
+
+def run_end_to_end(deal_count, concurrency, net_latency, model_latency, seed=7):
+    """
+    Screen deals end to end against fixture sites and the mock model
+
+    Scrape caching is off so every deal fetches its sites, as a screen of
+    distinct companies would.
+    """
+    metrics.REGISTRY.reset()
+
+    with FixtureWeb(latency=net_latency, seed=seed) as web:
+        deals = fixture_deals(web.urls, deal_count)
+        scraper = WebsiteScraper(cache_ttl=0, requests_per_host_per_minute=1000000)
+        collector = DataCollector(scraper=scraper)
+        analyzer = GeminiAnalyzer(
+            backend=MockBackend(latency=model_latency, seed=seed),
+            router=ModelRouter(pool=BENCH_POOL)
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            counts = screen_deals(deals, collector, analyzer, os.path.join(tmp, 'results.jsonl'), concurrency)
+            wall = time.perf_counter() - started
+
+    stages = {
+        row['labels'].split('=', 1)[1]: {"count": row['count'], "p50": row['p50'], "p95": row['p95']}
+        for row in metrics.REGISTRY.summary() if row['metric'] == 'ma_stage_seconds'
+    }
+    return {
+        "name": "end_to_end[screen]",
+        "group": "end_to_end",
+        "deals": deal_count,
+        "concurrency": concurrency,
+        "net_latency": net_latency,
+        "model_latency": model_latency,
+        "counts": counts,
+        "wall_seconds": wall,
+        "deals_per_sec": deal_count / wall if wall else None,
+        "stages": stages
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(FIXTURES_DIR), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare medians (wall time for end-to-end runs) with a baseline run
+
+    Returns:
+        list: (name, baseline seconds, current seconds, change) for regressions
+    """
+    def timings(run):
+        values = {b['name']: b['per_call_seconds']['median'] for b in run['benchmarks']}
+        values.update({e['name']: e['wall_seconds'] for e in run.get('end_to_end', [])})
+        return values
+
+    before, after = timings(baseline), timings(results)
+    regressions = []
+    for name, current in after.items():
+        previous = before.get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((name, previous, current, current / previous - 1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="Fewer rounds and a smaller end-to-end run")
+    parser.add_argument('--output', help="Results JSON path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Median slowdown vs baseline reported as a regression (default 0.2 = 20%%)")
+    parser.add_argument('--deals', type=int, help="Deals in the end-to-end run (default 60, 12 with --quick)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--net-latency', default='lognormal:0.08:0.5',
+                        help="Simulated website latency (LatencyDistribution spec)")
+    parser.add_argument('--model-latency', default='lognormal:0.4:0.4',
+                        help="Simulated model latency (LatencyDistribution spec)")
+    args = parser.parse_args(argv)
+
+    repeat = 3 if args.quick else 7
+    deal_count = args.deals or (12 if args.quick else 60)
+
+    corpus = load_html_corpus()
+    responses = load_responses()
+    analyzer = GeminiAnalyzer(backend=MockBackend(), router=ModelRouter(pool=BENCH_POOL))
+
+    print("⏱️ Running benchmarks...")
+    # The pipeline logs every step; keep the benchmark output readable
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        with FixtureWeb() as web:
+            collected = collect_fixture_data(web.urls)
+
+        benchmarks = (
+            bench_extraction(WebsiteScraper(), corpus, repeat)
+            + bench_prompts(collected, repeat)
+            + bench_parse(analyzer, responses, repeat)
+        )
+        end_to_end = [run_end_to_end(deal_count, args.concurrency, args.net_latency, args.model_latency)]
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick
+        },
+        "benchmarks": benchmarks,
+        "end_to_end": end_to_end
+    }
+
+    for b in benchmarks:
+        timing = b['per_call_seconds']
+        print(f"  {b['name']:<58} median {timing['median'] * 1e6:>10.1f} µs   p95 {timing['p95'] * 1e6:>10.1f} µs")
+    for e in end_to_end:
+        print(f"  {e['name']:<58} {e['deals']} deals in {e['wall_seconds']:.2f}s "
+              f"({e['deals_per_sec']:.1f} deals/s, {e['counts']})")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, previous, current, change in regressions:
+            print(f"  ⚠️ {name}: {previous:.6g}s → {current:.6g}s (+{change:.0%})")
+        if regressions:
+            print(f"❌ {len(regressions)} regressions vs {args.baseline}")
+            return 1
+        print(f"✅ No regressions vs {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+M&A Strategic Fit Analyzer - headless bulk screening
+
+Usage:
+    python cli.py deals.csv --output results.jsonl --concurrency 4
+    python cli.py deals.jsonl --output results.jsonl --parquet results.parquet
+    python cli.py deals.csv --output results.jsonl --store
+    python cli.py deals.csv --output results-2026-03.jsonl --store --movers 20
+    python cli.py deals.csv --output results-2026-04.jsonl --previous results-2026-03.jsonl
+    python cli.py deals.csv --output results.jsonl --sensitivity 2000 --top-k 10
+    python cli.py deals.csv --output results.jsonl --analysis per_dimension
+    python cli.py deals.csv --output results.jsonl --thumbnails thumbs --thumbnail-format png
+
+Results are appended to the output JSONL as each deal completes, so an
+interrupted run picks up where it stopped when re-run with the same output.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from agents import DataCollector, GeminiAnalyzer
+from agents.gemini_analyzer import ANALYSIS_MODES
+from agents.results import ResultStore
+from agents.screening import analysis_results, export_parquet, iter_latest_records, load_deals, screen_deals
+from utils.scoring import ScoreMatrix, weight_sensitivity
+from utils.visualizations import render_thumbnails
+
+
+def print_sensitivity(output_path, samples, top_k):
+    """Report how stable the screen's ranking is under perturbed dimension weights"""
+    records = [record for record in iter_latest_records(output_path) if record['status'] == 'ok']
+    if not records:
+        print("⚖️ No completed deals to run a sensitivity analysis on")
+        return
+
+    labels = {
+        record['key']: f"{record['deal']['acquirer']['name']} → {record['deal']['target']['name']}"
+        for record in records
+    }
+    report = weight_sensitivity(ScoreMatrix.from_records(records), samples=samples, top_k=top_k)
+    deals = report['deals']
+
+    print(f"\n⚖️ Weight sensitivity over {samples} sampled weightings "
+          f"(mean rank correlation {report['mean_spearman']:.3f})")
+    print(f"  {'Deal':<44} {'Score':>6} {'Rank':>5} {'Range':>11} {'P(top ' + str(top_k) + ')':>11} {'Flips':>6}")
+    for deal in deals[:top_k]:
+        print(f"  {labels[deal['key']][:44]:<44} {deal['overall']:>6.1f} {deal['rank']:>5} "
+              f"{str(deal['best_rank']) + '-' + str(deal['worst_rank']):>11} "
+              f"{deal['p_top_k']:>11.0%} {deal['flip_rate']:>6.0%}")
+
+    contenders = [d for d in deals[top_k:] if d['p_top_k'] > 0]
+    if contenders:
+        print(f"  Outside the top {top_k} but sometimes in it: " + ", ".join(
+            f"{labels[d['key']]} ({d['p_top_k']:.0%})" for d in sorted(contenders, key=lambda d: -d['p_top_k'])[:5]
+        ))
+    flips = sorted((d for d in deals if d['flip_rate'] > 0), key=lambda d: -d['flip_rate'])[:5]
+    if flips:
+        print("  Most likely to change recommendation: " + ", ".join(
+            f"{labels[d['key']]} ({d['recommendation']}, {d['flip_rate']:.0%})" for d in flips
+        ))
+
+
+def export_thumbnails(output_path, directory, fmt):
+    """Write a radar thumbnail per completed deal, plus an index.csv mapping deals to files"""
+    records = [record for record in iter_latest_records(output_path) if record['status'] == 'ok']
+    matrix = ScoreMatrix.from_records(records)
+    paths = render_thumbnails(matrix.scores.tolist(), directory, fmt=fmt)
+
+    index_path = os.path.join(directory, 'index.csv')
+    with open(index_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['key', 'acquirer', 'target', 'overall_score', 'thumbnail'])
+        for record, overall, path in zip(records, matrix.overall, paths):
+            writer.writerow([
+                record['key'], record['deal']['acquirer']['name'], record['deal']['target']['name'],
+                round(float(overall), 1), os.path.basename(path)
+            ])
+    print(f"🖼️ Wrote {len(paths)} thumbnails to {directory} (index: {index_path})")
+
+
+def print_movers(store, limit):
+    """Report the pairs whose overall score moved most since their previous run"""
+    movers = store.history.movers(limit=limit)
+    if not movers:
+        print("📈 No pair's score has moved between successful runs yet")
+        return
+
+    print("\n📈 Biggest movers since each pair's previous run")
+    print(f"  {'Deal':<44} {'Before':>7} {'After':>7} {'Change':>7}  Inputs changed")
+    for mover in movers:
+        label = f"{mover['acquirer']} → {mover['target']}"
+        print(f"  {label[:44]:<44} {mover['previous']:>7.1f} {mover['current']:>7.1f} {mover['delta']:>+7.1f}  "
+              f"{', '.join(mover['changed']) or '-'}")
+
+
+def print_carried(counts):
+    """Report how much model work carrying analyses forward saved"""
+    screened = counts['ok'] + counts['fallback'] + counts['error']
+    share = counts['carried'] / screened if screened else 0.0
+    unchanged = counts['carried'] - counts['rescored']
+    print(f"♻️ Carried forward {counts['carried']} of {screened} deals ({share:.0%}): "
+          f"{unchanged} with unchanged inputs, {counts['rescored']} re-scored for new weights; "
+          f"{counts['skipped_model_calls']} model calls and ~{counts['skipped_prompt_tokens']:,} prompt tokens skipped")
+    if counts['changed']:
+        reasons = sorted(counts['changed'].items(), key=lambda item: -item[1])
+        print(f"   Re-analyzed because of: {', '.join(f'{name} ({count})' for name, count in reasons)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen many M&A deals without the Streamlit UI")
+    parser.add_argument('deals', help="CSV or JSONL file of deals (same fields as EXAMPLE_DEALS)")
+    parser.add_argument('--output', '-o', default='results.jsonl',
+                        help="Results JSONL, also used as the resume checkpoint")
+    parser.add_argument('--previous', metavar='PATH',
+                        help="Results JSONL of an earlier screen; reuse analyses whose inputs are unchanged")
+    parser.add_argument('--parquet', help="Also export the results to this Parquet file when done")
+    parser.add_argument('--store', nargs='?', const='', metavar='DIR',
+                        help="Also append the results to the result store (default RESULTS_STORE_DIR)")
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help="Deals screened in parallel")
+    parser.add_argument('--mode', choices=['fast', 'deep'], default='fast', help="Data collection mode")
+    parser.add_argument('--analysis', choices=ANALYSIS_MODES, default=None,
+                        help="One prompt per deal, or one cached prompt per dimension (default ANALYSIS_MODE or single)")
+    parser.add_argument('--sensitivity', type=int, metavar='SAMPLES',
+                        help="Report ranking stability over this many sampled dimension weightings")
+    parser.add_argument('--top-k', type=int, default=10, help="K for the sensitivity report's top-K odds")
+    parser.add_argument('--movers', type=int, metavar='N',
+                        help="Report the N pairs whose score moved most since their previous stored run")
+    parser.add_argument('--thumbnails', metavar='DIR',
+                        help="Write a radar thumbnail per completed deal to this directory")
+    parser.add_argument('--thumbnail-format', choices=['svg', 'png'], default='svg',
+                        help="Thumbnail format; png needs the optional kaleido package")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+
+    deals = load_deals(args.deals)
+    collector = DataCollector(mode=args.mode)
+    analyzer = GeminiAnalyzer(analysis_mode=args.analysis)
+
+    try:
+        counts = screen_deals(
+            deals, collector, analyzer, args.output,
+            concurrency=args.concurrency, previous_path=args.previous
+        )
+    except KeyboardInterrupt:
+        return 130
+
+    print(f"\n🏁 Done: {counts['ok']} ok, {counts['fallback']} fallback, "
+          f"{counts['error']} errors, {counts['skipped']} skipped (already done)")
+    if args.previous:
+        print_carried(counts)
+
+    if args.parquet:
+        rows = export_parquet(args.output, args.parquet)
+        print(f"💾 Wrote {rows} deals to {args.parquet}")
+
+    if args.store is not None:
+        store = ResultStore(args.store or None)
+        rows = store.append(analysis_results(args.output))
+        print(f"💾 Stored {rows} deals in {store.root}")
+
+    if args.movers:
+        print_movers(ResultStore(args.store or None), args.movers)
+
+    if args.sensitivity:
+        print_sensitivity(args.output, args.sensitivity, args.top_k)
+
+    if args.thumbnails:
+        try:
+            export_thumbnails(args.output, args.thumbnails, args.thumbnail_format)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 2
+
+    # Non-zero exit so schedulers retry runs with failed deals
+    return 1 if counts['fallback'] or counts['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Gemini model pool configuration
+"""
+
+import os
+
+# Default pool, ordered by preference. Limits match the free-tier quotas.
+DEFAULT_MODEL_POOL = [
+    {
+        "name": "models/gemini-2.5-flash",
+        "max_concurrency": 4,
+        "requests_per_minute": 10
+    },
+    {
+        "name": "models/gemini-2.0-flash",
+        "max_concurrency": 4,
+        "requests_per_minute": 15
+    },
+    {
+        "name": "models/gemini-2.5-flash-lite",
+        "max_concurrency": 4,
+        "requests_per_minute": 15
+    }
+]
+
+
+def get_model_pool():
+    """
+    Get the model pool used by the analyzer
+
+    Reads GEMINI_MODELS if set, as a comma-separated list of
+    name[:max_concurrency[:requests_per_minute]] entries, e.g.
+    "models/gemini-2.5-flash:4:10,models/gemini-2.0-flash:2:15".
+    Missing limits default to the DEFAULT_MODEL_POOL entry of the same name.
+
+    Returns:
+        list: Model configs with name, max_concurrency and requests_per_minute
+    """
+    spec = os.getenv('GEMINI_MODELS', '').strip()
+    if not spec:
+        return [dict(model) for model in DEFAULT_MODEL_POOL]
+
+    defaults = {model['name']: model for model in DEFAULT_MODEL_POOL}
+    pool = []
+
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        parts = entry.split(':')
+        name = parts[0]
+        if not name.startswith('models/'):
+            name = f"models/{name}"
+
+        base = defaults.get(name, {"max_concurrency": 2, "requests_per_minute": 10})
+        pool.append({
+            "name": name,
+            "max_concurrency": int(parts[1]) if len(parts) > 1 and parts[1] else base['max_concurrency'],
+            "requests_per_minute": float(parts[2]) if len(parts) > 2 and parts[2] else base['requests_per_minute']
+        })
+
+    if not pool:
+        raise ValueError("GEMINI_MODELS is set but lists no models")
+
+    return pool
@@ -2,33 +2,16 @@
 Gemini API prompt templates for M&A strategic analysis
 """
 
-def get_company_context(company_name):
-    """
-    Get known context about well-known companies to improve analysis specificity
-    """
-    company_info = {
-        "Shopify": "Leading e-commerce platform for online stores, serves 2M+ merchants, GMV $200B+, competes with Amazon/BigCommerce",
-        "Deliverr": "Fast fulfillment platform for e-commerce, 2-day delivery network, serves D2C brands, acquired by Shopify 2022 for $2.1B",
-        "Stripe": "Payment infrastructure company, processes $640B+ annually, serves millions of businesses, API-first approach",
-        "Plaid": "Banking infrastructure, connects 11K+ financial institutions, enables account linking, used by Venmo/Robinhood",
-        "Salesforce": "CRM leader, $30B+ revenue, serves 150K+ customers, Customer 360 platform, cloud-based enterprise software",
-        "Slack": "Team collaboration platform, 10M+ daily active users, messaging + channels, acquired by Salesforce 2021 for $27.7B",
-        "Microsoft": "Tech giant, cloud (Azure), productivity (Office 365), gaming (Xbox), enterprise software, $200B+ revenue",
-        "GitHub": "Developer platform, 100M+ developers, code hosting, CI/CD, acquired by Microsoft 2018 for $7.5B",
-        "Adobe": "Creative software leader, Photoshop/Illustrator, $20B revenue, design tools, creative cloud",
-        "Figma": "Collaborative design platform, web-based, 4M users, competes with Adobe XD, acquisition blocked by regulators",
-    }
-    
-    return company_info.get(company_name, f"Research {company_name} and use your knowledge of this company")
+from config.scoring import DIMENSION_LABELS
+from utils.knowledge_base import get_knowledge_base
 
+# Bump whenever the prompt template changes, so stored scores record
+# which template produced them
+PROMPT_VERSION = "1"
 
-def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
-    """
-    Generate dynamic prompt based on acquirer and target context
-    """
-    
-    industry_context = {
-        "E-commerce/Retail": """
+# Industry-specific considerations, keyed by acquirer industry
+INDUSTRY_CONTEXT = {
+    "E-commerce/Retail": """
         Key considerations for e-commerce M&A:
         - Customer data integration and privacy compliance
         - Omnichannel fulfillment and logistics synergies
@@ -36,8 +19,8 @@ def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
         - Payment processing and checkout flow compatibility
         - Merchant/seller platform integration
         """,
-        
-        "FinTech/Payments": """
+    
+    "FinTech/Payments": """
         Key considerations for fintech M&A:
         - Regulatory compliance alignment (PCI-DSS, banking regulations)
         - Payment infrastructure and API compatibility
@@ -45,8 +28,8 @@ def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
         - Banking partnership overlap and relationships
         - Risk management and compliance frameworks
         """,
-        
-        "SaaS/Enterprise Software": """
+    
+    "SaaS/Enterprise Software": """
         Key considerations for SaaS M&A:
         - API integration feasibility and architecture compatibility
         - Customer overlap and cross-sell/upsell opportunities
@@ -54,14 +37,59 @@ def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
         - Sales channel and go-to-market synergies
         - Data migration and system integration complexity
         """
-    }
+}
+
+
+def get_company_context(company_name):
+    """
+    Get known context about a company to improve analysis specificity
+    
+    Names resolve through the company knowledge base (utils/knowledge_base.py),
+    so "Shopify Inc." or "salesforce" find their entries.
+    """
+    context = get_knowledge_base().context(company_name)
+    return context or f"Research {company_name} and use your knowledge of this company"
+
+
+def get_prompt_sections(acquirer_data, target_data, collected_data, industry):
+    """
+    Deal-specific sections of the analysis prompt, in prompt order
     
-    context = industry_context.get(industry, industry_context["SaaS/Enterprise Software"])
+    The rest of the prompt is fixed by PROMPT_VERSION, so hashing these
+    sections tells whether a deal's prompt changed and why.
+    
+    Returns:
+        dict: acquirer_profile, target_profile, collected_data and
+        industry_context text
+    """
+    
+    context = INDUSTRY_CONTEXT.get(industry, INDUSTRY_CONTEXT["SaaS/Enterprise Software"])
     
     # Get company-specific context
     acquirer_context = get_company_context(acquirer_data['name'])
     target_context = get_company_context(target_data['name'])
     
+    return {
+        "acquirer_profile": f"""Company: {acquirer_data['name']}
+Industry: {acquirer_data['industry']}
+Strategic Focus: {acquirer_data.get('focus', 'Strategic expansion')}
+What they're known for: {acquirer_context}
+Additional context: {acquirer_data.get('description', 'N/A')}""",
+        "target_profile": f"""Company: {target_data['name']}
+Industry: {target_data['industry']}
+What they're known for: {target_context}
+Additional context: {target_data.get('description', 'N/A')}""",
+        "collected_data": format_collected_data(collected_data),
+        "industry_context": context
+    }
+
+
+def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
+    """
+    Generate dynamic prompt based on acquirer and target context
+    """
+    sections = get_prompt_sections(acquirer_data, target_data, collected_data, industry)
+    
     prompt = f"""You are a senior M&A strategy consultant at McKinsey analyzing a potential acquisition.
 
 ⚠️ CRITICAL INSTRUCTIONS:
@@ -72,23 +100,16 @@ def get_analysis_prompt(acquirer_data, target_data, collected_data, industry):
 5. Each piece of evidence must mention specific company details, not generic statements
 
 ACQUIRER PROFILE:
-Company: {acquirer_data['name']}
-Industry: {acquirer_data['industry']}
-Strategic Focus: {acquirer_data.get('focus', 'Strategic expansion')}
-What they're known for: {acquirer_context}
-Additional context: {acquirer_data.get('description', 'N/A')}
+{sections['acquirer_profile']}
 
 TARGET COMPANY:
-Company: {target_data['name']}
-Industry: {target_data['industry']}
-What they're known for: {target_context}
-Additional context: {target_data.get('description', 'N/A')}
+{sections['target_profile']}
 
 COLLECTED DATA:
-{format_collected_data(collected_data)}
+{sections['collected_data']}
 
 INDUSTRY-SPECIFIC CONSIDERATIONS:
-{context}
+{sections['industry_context']}
 
 SCORING GUIDELINES (FOLLOW THESE STRICTLY):
 - 85-100: Near-perfect alignment (same industry, complementary products, obvious synergies)
@@ -254,3 +275,128 @@ def format_collected_data(data):
             formatted.append(f"  Employees: {tgt['employees']}")
     
     return "\n".join(formatted) if formatted else "Limited data collected - use your knowledge of these companies."
+
+
+# Sections each dimension's own prompt is built from in per-dimension
+# analysis. A dimension is re-run only when one of its sections changes,
+# e.g. financial health depends on the target alone.
+DIMENSION_INPUTS = {
+    "technology_synergy": ("acquirer", "target", "industry_context"),
+    "market_overlap": ("acquirer", "acquirer_focus", "target", "industry_context"),
+    "product_complementarity": ("acquirer", "acquirer_focus", "target"),
+    "cultural_alignment": ("acquirer", "target"),
+    "financial_health": ("target",)
+}
+
+DIMENSION_SECTION_TITLES = {
+    "acquirer": "ACQUIRER PROFILE",
+    "acquirer_focus": "ACQUIRER STRATEGY",
+    "target": "TARGET COMPANY",
+    "industry_context": "INDUSTRY-SPECIFIC CONSIDERATIONS"
+}
+
+DIMENSION_GUIDANCE = {
+    "technology_synergy": """- How do the acquirer's tech stack and the target's platform integrate?
+- Specific APIs, infrastructure, technical architectures to consider
+- Integration complexity and technical debt""",
+    "market_overlap": """- Do the acquirer and the target serve the same customers?
+- Geographic presence alignment
+- Go-to-market channel compatibility""",
+    "product_complementarity": """- Does the target fill a specific gap in the acquirer's product suite?
+- Cross-selling and bundling opportunities
+- Competitive positioning improvement""",
+    "cultural_alignment": """- Company size and growth stage compatibility
+- Work culture and values (based on public info)
+- Talent retention and integration risk""",
+    "financial_health": """- The target's growth trajectory and business model
+- Revenue quality and sustainability
+- Profitability path and burn rate"""
+}
+
+
+def format_company_details(details):
+    """Format one company's collected details for a dimension prompt"""
+    lines = [
+        f"{label}: {details[field]}"
+        for field, label in (('description', 'Description'), ('founded', 'Founded'), ('employees', 'Employees'))
+        if details and details.get(field)
+    ]
+    return "\n".join(lines) if lines else "No data collected - use your knowledge of this company."
+
+
+def get_dimension_sections(acquirer_data, target_data, collected_data, industry):
+    """
+    Sections the per-dimension prompts are built from (see DIMENSION_INPUTS)
+    
+    Unlike get_prompt_sections, each company's profile carries only its own
+    collected details, and the acquirer's strategic focus is a section of
+    its own, so a new focus string leaves the dimensions that ignore it
+    cached.
+    
+    Returns:
+        dict: acquirer, acquirer_focus, target and industry_context text
+    """
+    return {
+        "acquirer": f"""Company: {acquirer_data['name']}
+Industry: {acquirer_data['industry']}
+What they're known for: {get_company_context(acquirer_data['name'])}
+Additional context: {acquirer_data.get('description', 'N/A')}
+Collected data:
+{format_company_details(collected_data.get('acquirer'))}""",
+        "acquirer_focus": f"Strategic Focus: {acquirer_data.get('focus') or 'Strategic expansion'}",
+        "target": f"""Company: {target_data['name']}
+Industry: {target_data['industry']}
+What they're known for: {get_company_context(target_data['name'])}
+Additional context: {target_data.get('description', 'N/A')}
+Collected data:
+{format_company_details(collected_data.get('target'))}""",
+        "industry_context": INDUSTRY_CONTEXT.get(industry, INDUSTRY_CONTEXT["SaaS/Enterprise Software"])
+    }
+
+
+def get_dimension_prompt(dimension, sections, acquirer_name, target_name):
+    """
+    Generate the standalone prompt for one dimension
+    
+    Only the sections listed in DIMENSION_INPUTS[dimension] (and the names
+    of the companies they describe) appear in the prompt, so its text
+    changes only when those inputs do.
+    """
+    inputs = DIMENSION_INPUTS[dimension]
+    label = DIMENSION_LABELS[dimension].upper()
+    context = "\n\n".join(f"{DIMENSION_SECTION_TITLES[name]}:\n{sections[name]}" for name in inputs)
+    
+    if 'acquirer' in inputs:
+        task = f"Evaluate {label} for the acquisition of {target_name} by {acquirer_name}."
+    else:
+        task = f"Evaluate {label} for {target_name} as an acquisition target."
+    
+    return f"""You are a senior M&A strategy consultant at McKinsey assessing one dimension of a potential acquisition.
+
+⚠️ CRITICAL INSTRUCTIONS:
+1. Provide HIGHLY SPECIFIC analysis based on these EXACT companies
+2. DO NOT give generic analysis - reference actual products, markets, customers, and competitors
+3. Scores MUST vary based on actual fit - bad fits = 20-45, medium fits = 50-70, great fits = 75-95
+4. Each piece of evidence must mention specific company details, not generic statements
+
+{context}
+
+ANALYSIS TASK:
+{task}
+
+{label}:
+{DIMENSION_GUIDANCE[dimension]}
+
+OUTPUT FORMAT (respond ONLY with valid JSON, no markdown):
+{{
+    "score": <0-100, be realistic>,
+    "evidence": [
+        "Specific point with actual product, customer or market names",
+        "Another specific point",
+        "Third specific point"
+    ],
+    "risks": [
+        "Specific risk for this dimension",
+        "Another specific risk"
+    ]
+}}"""
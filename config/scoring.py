@@ -0,0 +1,72 @@
+"""
+Scoring configuration: strategic dimensions, weights and recommendation bands
+"""
+
+import os
+
+# Dimensions in score-matrix column order
+DIMENSIONS = [
+    'technology_synergy',
+    'market_overlap',
+    'product_complementarity',
+    'cultural_alignment',
+    'financial_health'
+]
+
+DIMENSION_LABELS = {
+    'technology_synergy': 'Technology Synergy',
+    'market_overlap': 'Market Overlap',
+    'product_complementarity': 'Product Complementarity',
+    'cultural_alignment': 'Cultural Alignment',
+    'financial_health': 'Financial Health'
+}
+
+# Default weights, matching the weights stated in the analysis prompt
+DEFAULT_WEIGHTS = {
+    'technology_synergy': 0.30,
+    'market_overlap': 0.25,
+    'product_complementarity': 0.20,
+    'cultural_alignment': 0.15,
+    'financial_health': 0.10
+}
+
+# Recommendation bands as (minimum overall score, label), highest first
+RECOMMENDATION_BANDS = [
+    (80, "Strong Fit"),
+    (60, "Moderate Fit"),
+    (40, "Weak Fit"),
+    (0, "Poor Fit")
+]
+
+# Score assumed for a dimension the model left out
+MISSING_SCORE = 50
+
+
+def get_weights():
+    """
+    Get the dimension weights used for overall scores
+
+    Reads SCORE_WEIGHTS if set, as comma-separated dimension=weight entries,
+    e.g. "technology_synergy=0.4,market_overlap=0.3". Dimensions not listed
+    keep their DEFAULT_WEIGHTS value; weights are normalized when scoring.
+
+    Returns:
+        dict: Weight per dimension
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    spec = os.getenv('SCORE_WEIGHTS', '').strip()
+    if not spec:
+        return weights
+
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, value = entry.partition('=')
+        name = name.strip()
+        if name not in weights or not value:
+            raise ValueError(f"Invalid SCORE_WEIGHTS entry '{entry}'. Use dimension=weight with one of: "
+                             f"{', '.join(DIMENSIONS)}")
+        weights[name] = float(value)
+
+    return weights
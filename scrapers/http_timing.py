@@ -0,0 +1,98 @@
+"""
+Per-phase timing for website fetches
+
+TimedHTTPAdapter swaps in urllib3 connection classes that time connection
+setup, and fetch() splits the rest of a request into time to first byte
+and body download, recording each phase in ma_scrape_fetch_seconds.
+
+DNS resolution happens inside urllib3's connection setup, so it is part of
+the 'connect' phase. Connection phases are only recorded for fetches that
+opened a new connection; reused pooled connections skip them.
+"""
+
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from utils import metrics
+
+
+# Connection setup times for the fetch running on this thread
+_phases = threading.local()
+
+
+class _TimedConnectMixin:
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _phases.connect = time.perf_counter() - start
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        # Whatever connect() did beyond opening the socket is the TLS handshake
+        setup = time.perf_counter() - start
+        _phases.tls = max(0.0, setup - getattr(_phases, 'connect', 0.0))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report connect and TLS times"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+def fetch(session, url, timeout):
+    """
+    GET url through session, recording each phase of the fetch
+
+    Returns:
+        requests.Response with its body already downloaded
+    """
+    _phases.__dict__.clear()
+    start = time.perf_counter()
+    try:
+        response = session.get(url, timeout=timeout, stream=True)
+        headers_at = time.perf_counter()
+        response.content
+    except Exception:
+        metrics.inc('ma_scrape_fetches_total', outcome='error')
+        raise
+    done = time.perf_counter()
+
+    connect = getattr(_phases, 'connect', None)
+    tls = getattr(_phases, 'tls', None)
+    if connect is not None:
+        metrics.observe('ma_scrape_fetch_seconds', connect, phase='connect')
+    if tls is not None:
+        metrics.observe('ma_scrape_fetch_seconds', tls, phase='tls')
+
+    setup = (connect or 0.0) + (tls or 0.0)
+    metrics.observe('ma_scrape_fetch_seconds', max(0.0, headers_at - start - setup), phase='ttfb')
+    metrics.observe('ma_scrape_fetch_seconds', done - headers_at, phase='download')
+    metrics.observe('ma_scrape_fetch_seconds', done - start, phase='total')
+    metrics.inc('ma_scrape_fetches_total', outcome=str(response.status_code))
+
+    return response
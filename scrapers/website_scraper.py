@@ -5,22 +5,120 @@ Website scraper for extracting company information
 import requests
 from bs4 import BeautifulSoup
 import re
+import os
+import threading
+from collections import OrderedDict
 from urllib.parse import urljoin, urlparse
 import time
+from scrapers.http_timing import TimedHTTPAdapter, fetch
+from utils import metrics
+from utils.cassettes import Cassette, get_cassette
+from utils.rate_limiter import RateLimiter
+from utils.scheduler import PriorityScheduler
+from utils.singleflight import SingleFlight
 
 
 class WebsiteScraper:
-    def __init__(self, timeout=10):
+    def __init__(self, timeout=10, pool_size=20, requests_per_host_per_minute=30, cache_ttl=3600,
+                 cache_size=None):
+        """
+        Initialize scraper
+        
+        A single instance is safe to share across threads: it keeps one
+        pooled HTTP session, a per-host rate limiter, a bounded LRU cache
+        of scraped companies that expire after cache_ttl, and coalesces concurrent scrapes of one website.
+        Fetches share the connection pool by lane, so interactive scrapes
+        are not stuck behind a bulk screen (see utils.scheduler).
+        
+        Args:
+            timeout: Request timeout in seconds
+            pool_size: Max pooled connections per host
+            requests_per_host_per_minute: Politeness limit for each website
+            cache_ttl: Seconds to reuse a successful scrape (0 disables caching)
+            cache_size: Websites kept in the cache (or set SCRAPE_CACHE_SIZE, default 1024)
+        """
         self.timeout = timeout
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.scheduler = PriorityScheduler(capacity=pool_size, name='scraper')
+        
+        self.requests_per_host_per_minute = requests_per_host_per_minute
+        self._host_limiters = {}
+        
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size or int(os.getenv('SCRAPE_CACHE_SIZE', '1024'))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+        
+        # Record/replay of fetches (CASSETTE_MODE, see utils.cassettes)
+        self.cassette = get_cassette('http')
+    
+    def _get(self, url):
+        """GET a URL through the shared session, respecting the per-host rate limit"""
+        host = urlparse(url).netloc
+        with self._lock:
+            limiter = self._host_limiters.get(host)
+            if limiter is None:
+                limiter = RateLimiter(self.requests_per_host_per_minute, burst=5)
+                self._host_limiters[host] = limiter
+        
+        limiter.acquire()
+        with self.scheduler.slot():
+            if self.cassette is None:
+                return fetch(self.session, url, self.timeout)
+            return self._get_recorded(url)
+    
+    def _get_recorded(self, url):
+        """GET a URL through the cassette, replaying or recording its response"""
+        def record():
+            response = fetch(self.session, url, self.timeout)
+            return {
+                "url": response.url,
+                "status": response.status_code,
+                "content_type": response.headers.get('Content-Type'),
+                "body": response.text
+            }
+        
+        entry = self.cassette.play(Cassette.key('GET', url), record, description=f"GET {url}")
+        
+        response = requests.Response()
+        response.url = entry['url']
+        response.status_code = entry['status']
+        if entry.get('content_type'):
+            response.headers['Content-Type'] = entry['content_type']
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        return response
     
     def scrape_company(self, company_name, website=None):
         """
         Scrape basic company information from website
+        
+        Concurrent scrapes of the same website are coalesced into one fetch.
         """
-        result = {
+        if not website:
+            return self._empty_result(company_name)
+        
+        # Ensure URL has scheme
+        if not website.startswith(('http://', 'https://')):
+            website = 'https://' + website
+        
+        result = self._get_cached(website)
+        if result is None:
+            result = self._inflight.do(website, self._scrape_website, website)
+        
+        return dict(result, name=company_name)
+    
+    def _empty_result(self, company_name=None):
+        return {
             "name": company_name,
             "description": None,
             "mission": None,
@@ -29,15 +127,12 @@ class WebsiteScraper:
             "headquarters": None,
             "scraped_successfully": False
         }
-        
-        if not website:
-            return result
+    
+    def _scrape_website(self, website):
+        """Fetch and extract a website's About page or homepage"""
+        result = self._empty_result()
         
         try:
-            # Ensure URL has scheme
-            if not website.startswith(('http://', 'https://')):
-                website = 'https://' + website
-            
             # Try to find and scrape About page
             about_content = self._scrape_about_page(website)
             if about_content:
@@ -54,8 +149,27 @@ class WebsiteScraper:
         except Exception as e:
             result["error"] = str(e)
         
+        if result["scraped_successfully"] and self.cache_ttl:
+            with self._lock:
+                self._cache[website] = (time.monotonic() + self.cache_ttl, dict(result))
+                self._cache.move_to_end(website)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
         return result
     
+    def _get_cached(self, website):
+        with self._lock:
+            entry = self._cache.get(website)
+            if entry is None:
+                return None
+            expires, result = entry
+            if time.monotonic() > expires:
+                del self._cache[website]
+                return None
+            self._cache.move_to_end(website)
+            return result
+    
     def _scrape_about_page(self, base_url):
         """Try to find and scrape About/Company page"""
         about_urls = [
@@ -68,9 +182,10 @@ class WebsiteScraper:
         
         for url in about_urls:
             try:
-                response = requests.get(url, headers=self.headers, timeout=self.timeout)
+                response = self._get(url)
                 if response.status_code == 200:
-                    return self._extract_about_info(response.text)
+                    with metrics.span('ma_html_parse_seconds', page='about'):
+                        return self._extract_about_info(response.text)
             except:
                 continue
         
@@ -79,9 +194,10 @@ class WebsiteScraper:
     def _scrape_homepage(self, url):
         """Scrape homepage for basic information"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self._get(url)
             if response.status_code == 200:
-                return self._extract_homepage_info(response.text)
+                with metrics.span('ma_html_parse_seconds', page='homepage'):
+                    return self._extract_homepage_info(response.text)
         except:
             pass
         
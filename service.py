@@ -0,0 +1,439 @@
+"""
+M&A Strategic Fit Analyzer - HTTP service
+
+Runs several pre-forked worker processes behind one port. Each process has
+a bounded background worker pool; job state is shared between processes
+through a directory of JSON files, so any process can answer status and
+result requests for any job.
+
+Usage:
+    python service.py --port 8080 --processes 4 --workers 4 --max-queue 16
+
+Endpoints:
+    POST /v1/analyses                 submit a deal, returns a job (202, or 200 if cached);
+                                      "priority": "bulk" queues behind interactive requests
+    GET  /v1/analyses/<job_id>        job status and current stage
+    GET  /v1/analyses/<job_id>/result analysis result (202 while still running)
+    GET  /healthz                     liveness, local queue depth and per-lane wait times
+    GET  /metrics                     stage timings in Prometheus text format (this process)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from agents import DataCollector, GeminiAnalyzer
+from agents.job_manager import JobManager
+from agents.pipeline import STAGE_LABELS, STAGE_PROGRESS, run_analysis
+from agents.screening import deal_from_row
+from scrapers import WebsiteScraper
+from utils import metrics
+from utils.scheduler import LANES
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    def __init__(self, root, cache_ttl=3600):
+        """
+        Job records shared by all service processes
+
+        Each job is one JSON file named by the request fingerprint, so a
+        repeated request maps to the same job and is served from its cached
+        result until cache_ttl expires.
+        """
+        self.root = root
+        self.cache_ttl = cache_ttl
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def load(self, job_id):
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, record):
+        path = self._path(record['job_id'])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def is_reusable(self, record):
+        """Whether an existing record can answer a new request for the same job"""
+        if record is None or record['status'] == 'failed':
+            return False
+        if record['status'] == 'done':
+            return time.time() - record['finished_at'] < self.cache_ttl
+        # Queued/running jobs are only live while their process is
+        return _pid_alive(record['pid'])
+
+    def claim(self, job_id, deal, mode):
+        """
+        Create a queued record for job_id unless a reusable one exists
+
+        Returns:
+            tuple: (record, created) - created is False for cached/in-flight jobs
+        """
+        existing = self.load(job_id)
+        if self.is_reusable(existing):
+            return existing, False
+
+        record = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "deal": deal,
+            "mode": mode,
+            "pid": os.getpid(),
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+
+        if existing is None:
+            # Exclusive create so only one process wins a race on a new job
+            try:
+                fd = os.open(self._path(job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return self.load(job_id) or record, False
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            return record, True
+
+        # A stale record is replaced under the takeover lock, after checking
+        # again that no other process replaced it first
+        lock_path = self._lock_takeover(job_id)
+        if lock_path is None:
+            return self.load(job_id) or record, False
+        try:
+            current = self.load(job_id)
+            if self.is_reusable(current):
+                return current, False
+            self.save(record)
+        finally:
+            os.remove(lock_path)
+
+        return record, True
+
+    def _lock_takeover(self, job_id):
+        """
+        Take the lock for replacing job_id's stale record
+
+        The lock is a file holding its owner's pid, created exclusively; a
+        lock left behind by a dead process is broken and taken.
+
+        Returns:
+            str: Lock path to remove when done, or None if another live
+            process (or thread) holds the lock
+        """
+        lock_path = f"{self._path(job_id)}.lock"
+        tmp_path = f"{lock_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+        try:
+            for _ in range(2):
+                try:
+                    # Fails if the lock exists, like O_EXCL, and the lock never appears without its pid
+                    os.link(tmp_path, lock_path)
+                    return lock_path
+                except FileExistsError:
+                    pass
+                try:
+                    with open(lock_path, encoding='utf-8') as f:
+                        owner = int(f.read())
+                except FileNotFoundError:
+                    continue
+                if _pid_alive(owner):
+                    return None
+                # Only one process's rename of the abandoned lock succeeds
+                try:
+                    os.rename(lock_path, f"{tmp_path}.broken")
+                    os.remove(f"{tmp_path}.broken")
+                except FileNotFoundError:
+                    pass
+            return None
+        finally:
+            os.remove(tmp_path)
+
+
+class AnalysisService:
+    def __init__(self, store, workers=4, max_queue=16):
+        """
+        Per-process service state: worker pool, collectors and analyzer
+
+        Args:
+            store: Shared JobStore
+            workers: Analyses run concurrently in this process
+            max_queue: Extra jobs accepted beyond running ones before returning 429
+        """
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self.jobs = JobManager(max_workers=workers)
+        self._scraper = WebsiteScraper()
+        self._collectors = {}
+        self._analyzer = None
+        self._lock = threading.Lock()
+
+    def _resources(self, mode):
+        """Create the analyzer and per-mode collectors on first use, after forking"""
+        with self._lock:
+            if self._analyzer is None:
+                self._analyzer = GeminiAnalyzer()
+            if mode not in self._collectors:
+                self._collectors[mode] = DataCollector(mode=mode, scraper=self._scraper)
+            return self._collectors[mode], self._analyzer
+
+    @staticmethod
+    def fingerprint(deal, mode):
+        payload = json.dumps({"acquirer": deal['acquirer'], "target": deal['target'], "mode": mode}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+    def is_full(self):
+        return self.jobs.active_count() >= self.workers + self.max_queue
+
+    def submit(self, payload):
+        """
+        Submit a deal
+
+        Returns:
+            tuple: (http_status, body)
+        """
+        mode = payload.get('mode', 'fast')
+        if mode not in ('fast', 'deep'):
+            return 400, {"error": "mode must be 'fast' or 'deep'"}
+        lane = payload.get('priority', 'interactive')
+        if lane not in LANES:
+            return 400, {"error": f"priority must be one of: {', '.join(LANES)}"}
+        try:
+            deal = deal_from_row(payload)
+        except (ValueError, AttributeError, TypeError) as e:
+            return 400, {"error": str(e)}
+        deal.pop('key', None)
+
+        job_id = self.fingerprint(deal, mode)
+        existing = self.store.load(job_id)
+        if self.store.is_reusable(existing):
+            return (200 if existing['status'] == 'done' else 202), self._status_body(existing)
+
+        if self.is_full():
+            return 429, {"error": "Queue full, retry later"}
+
+        record, created = self.store.claim(job_id, deal, mode)
+        if created:
+            self.jobs.submit(job_id, self._run, record, lane=lane)
+
+        return (200 if record['status'] == 'done' else 202), self._status_body(record)
+
+    def lane_stats(self):
+        """
+        Per-lane load and queue wait times for this process's model and scraper
+        capacity; with SCHEDULER_DB, model stats add 'shared' counts across processes
+        """
+        stats = {"scraper": self._scraper.scheduler.stats()}
+        if self._analyzer is not None:
+            stats["model"] = self._analyzer.scheduler.stats()
+        return stats
+
+    def _run(self, record, progress_callback=None):
+        def on_event(stage, detail=None):
+            if progress_callback:
+                progress_callback(stage, detail)
+            record['stage'] = stage
+            self.store.save(record)
+
+        record['status'] = 'running'
+        try:
+            collector, analyzer = self._resources(record['mode'])
+            result = run_analysis(record['deal'], collector, analyzer, progress_callback=on_event)
+            record.update(status='done', result=result)
+        except Exception as e:
+            record.update(status='failed', error=str(e))
+        record['finished_at'] = time.time()
+        self.store.save(record)
+
+    def _status_body(self, record):
+        body = {
+            "job_id": record['job_id'],
+            "status": record['status'],
+            "stage": record['stage'],
+            "stage_label": STAGE_LABELS.get(record['stage'], record['stage']),
+            "progress": STAGE_PROGRESS.get(record['stage'], 0.0),
+            "submitted_at": record['submitted_at'],
+            "finished_at": record['finished_at'],
+            "links": {
+                "status": f"/v1/analyses/{record['job_id']}",
+                "result": f"/v1/analyses/{record['job_id']}/result"
+            }
+        }
+        if record['error']:
+            body['error'] = record['error']
+        return body
+
+    def status(self, job_id):
+        record = self.store.load(job_id)
+        if record is None:
+            return 404, {"error": f"Unknown job {job_id}"}
+        if record['status'] in ('queued', 'running') and not _pid_alive(record['pid']):
+            record.update(status='failed', error="Worker process exited before finishing")
+        return 200, self._status_body(record)
+
+    def result(self, job_id):
+        status, body = self.status(job_id)
+        if status != 200:
+            return status, body
+        if body['status'] == 'failed':
+            return 500, body
+        if body['status'] != 'done':
+            return 202, body
+        return 200, dict(body, result=self.store.load(job_id)['result'])
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/analyses':
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send(400, {"error": "Body must be JSON"})
+            return
+        if not isinstance(payload, dict):
+            self._send(400, {"error": "Body must be a JSON object"})
+            return
+        self._send(*self.service.submit(payload))
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+
+        if parts == ['healthz']:
+            self._send(200, {
+                "status": "ok",
+                "pid": os.getpid(),
+                "active_jobs": self.service.jobs.active_count(),
+                "lanes": self.service.lane_stats()
+            })
+        elif parts == ['metrics']:
+            data = metrics.REGISTRY.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif len(parts) == 3 and parts[:2] == ['v1', 'analyses']:
+            self._send(*self.service.status(parts[2]))
+        elif len(parts) == 4 and parts[:2] == ['v1', 'analyses'] and parts[3] == 'result':
+            self._send(*self.service.result(parts[2]))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '5')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(sock, store, workers, max_queue):
+    """Serve requests on an already-listening socket until interrupted"""
+    handler = type('ServiceHandler', (_ServiceHandler,), {
+        "service": AnalysisService(store, workers=workers, max_queue=max_queue)
+    })
+    server = ThreadingHTTPServer(sock.getsockname(), handler, bind_and_activate=False)
+    server.daemon_threads = True
+    server.socket.close()
+    server.socket = sock
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the analyzer as an HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes sharing the port")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent analyses per process")
+    parser.add_argument('--max-queue', type=int, default=16,
+                        help="Queued analyses per process before returning 429")
+    parser.add_argument('--jobs-dir', default=os.getenv('SERVICE_JOBS_DIR', 'service_jobs'),
+                        help="Directory for job state shared by all processes")
+    parser.add_argument('--cache-ttl', type=int, default=3600,
+                        help="Seconds a finished result answers repeated requests")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+
+    store = JobStore(args.jobs_dir, cache_ttl=args.cache_ttl)
+    sock = socket.create_server((args.host, args.port), backlog=128)
+    print(f"🚀 Serving on http://{args.host}:{sock.getsockname()[1]} "
+          f"({args.processes} processes × {args.workers} workers)")
+
+    if args.processes <= 1 or not hasattr(os, 'fork'):
+        serve(sock, store, args.workers, args.max_queue)
+        return 0
+
+    children = []
+    for _ in range(args.processes):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            serve(sock, store, args.workers, args.max_queue)
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for child in children:
+            os.waitpid(child, 0)
+    except KeyboardInterrupt:
+        stop(None, None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ Test script to check available Gemini models
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from config.models import get_model_pool
 
 load_dotenv()
 
@@ -18,17 +19,25 @@ print("🔍 Checking available Gemini models...\n")
 
 try:
     models = genai.list_models()
+    available = set()
     
     print("✅ Available models that support generateContent:\n")
     for model in models:
         if 'generateContent' in model.supported_generation_methods:
+            available.add(model.name)
             print(f"   • {model.name}")
             print(f"     Display name: {model.display_name}")
             print(f"     Description: {model.description[:100]}...")
             print()
     
-    print("\n💡 Recommendation: Use one of the models listed above")
-    print("   Most common: 'models/gemini-1.5-flash' or 'models/gemini-1.5-pro'")
+    print("\n🔀 Configured model pool (GEMINI_MODELS):\n")
+    for model in get_model_pool():
+        status = "✅" if model['name'] in available else "❌ not available"
+        print(f"   {status} {model['name']} "
+              f"(concurrency {model['max_concurrency']}, {model['requests_per_minute']:g} req/min)")
+    
+    print("\n💡 Recommendation: Set GEMINI_MODELS to models listed above")
+    print("   e.g. GEMINI_MODELS=models/gemini-2.5-flash:4:10,models/gemini-2.0-flash:4:15")
     
 except Exception as e:
     print(f"❌ Error: {e}")
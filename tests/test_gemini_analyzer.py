@@ -0,0 +1,40 @@
+import json
+
+from agents.gemini_analyzer import GeminiAnalyzer
+from agents.llm_backends import LLMBackend
+from config.scoring import DIMENSIONS
+from utils.scoring import score_analysis
+
+
+class ScriptedBackend(LLMBackend):
+    name = 'scripted'
+
+    def __init__(self, response):
+        self.response = response
+
+    def generate(self, model_name, prompt, generation_config=None):
+        return json.dumps(self.response)
+
+
+def test_overall_score_follows_weighted_dimensions_not_the_model(monkeypatch):
+    monkeypatch.setenv('SCORE_WEIGHTS', 'technology_synergy=0.6')
+    dimensions = {
+        dim: {"score": 90 if dim == 'technology_synergy' else 30, "evidence": ["e"], "risks": ["r"]}
+        for dim in DIMENSIONS
+    }
+    # The model's own overall disagrees with its dimension scores
+    backend = ScriptedBackend({
+        "overall_score": 95, "recommendation": "Strong Fit",
+        "recommendation_detail": "d", "dimensions": dimensions
+    })
+    analyzer = GeminiAnalyzer(backend=backend, analysis_mode='single')
+
+    analysis = analyzer.analyze_strategic_fit(
+        {"name": "Shopify", "industry": "E-commerce/Retail"},
+        {"name": "Deliverr", "industry": "E-commerce/Retail"},
+        {"acquirer": {}, "target": {}}
+    )
+
+    assert not analysis.get('note')
+    assert (analysis['overall_score'], analysis['recommendation']) == score_analysis(analysis)
+    assert analysis['overall_score'] != 95
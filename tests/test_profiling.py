@@ -0,0 +1,29 @@
+import sys
+import threading
+
+from utils.profiling import RunProfile
+
+
+def test_marks_from_another_thread_leave_its_profiler_alone(tmp_path):
+    profile = RunProfile('cross-thread', profile_dir=str(tmp_path)).start()
+    on_event = profile.wrap_callback(lambda stage, detail=None: events.append(stage))
+    events = []
+    leader_profiler = []
+
+    # The leader of a coalesced call sends this run's progress events from its own thread
+    def leader():
+        on_event('build_prompt')
+        on_event('model')
+        leader_profiler.append(sys.getprofile())
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    thread.join()
+    profile.mark('parse')
+    artifacts = profile.stop()
+
+    assert events == ['build_prompt', 'model']
+    assert leader_profiler == [None]
+    assert sys.getprofile() is None
+    assert [stage['stage'] for stage in profile._stages] == ['start', 'parse']
+    assert artifacts['pstats']
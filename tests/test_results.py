@@ -0,0 +1,66 @@
+from agents import history, results
+from agents.results import AnalysisResult, Dimension, ResultStore
+from config.scoring import DIMENSIONS
+
+
+def _result(key, score, status='ok'):
+    return AnalysisResult(
+        key, 'Shopify', 'E-commerce/Retail', 'Deliverr', 'E-commerce/Retail',
+        score, 'Moderate Fit', [Dimension(score) for _ in DIMENSIONS], status=status
+    )
+
+
+def _scores(store):
+    return dict(zip(*store.load(columns=['key', 'overall_score']).to_pydict().values()))
+
+
+def test_append_during_compaction_stays_latest(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), compact_parts=0)
+    store.append([_result('d0', 50)])
+    store.append([_result('d0', 55)])
+
+    latest_per_key = results._latest_per_key
+
+    # Another writer appends after compact() read the parts but before it writes the merged one
+    def append_mid_compaction(table):
+        store.append([_result('d0', 90)])
+        return latest_per_key(table)
+
+    monkeypatch.setattr(results, '_latest_per_key', append_mid_compaction)
+    assert store.compact()
+    monkeypatch.setattr(results, '_latest_per_key', latest_per_key)
+
+    assert _scores(store) == {'d0': 90.0}
+    assert len(store._parts()) == 2
+    store.compact()
+    assert _scores(store) == {'d0': 90.0}
+    assert len(store._parts()) == 1
+
+
+def test_history_append_during_compaction_keeps_every_row(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), compact_parts=0)
+    store.append([_result('d0', 50)])
+    store.append([_result('d1', 55)])
+
+    write = history._write
+
+    def append_mid_compaction(table, path):
+        if path.endswith('-compacted.parquet'):
+            store.history.append(results.to_table([_result('d2', 90)]))
+        write(table, path)
+
+    monkeypatch.setattr(history, '_write', append_mid_compaction)
+    store.history.compact()
+    monkeypatch.setattr(history, '_write', write)
+
+    assert sorted(store.history.load()['key'].to_pylist()) == ['d0', 'd1', 'd2']
+    assert not store.history._parts()[-1].endswith('-compacted.parquet')
+
+
+def test_fallback_does_not_replace_ok_result(tmp_path):
+    store = ResultStore(str(tmp_path), compact_parts=0)
+    store.append([_result('d0', 80)])
+    store.append([_result('d0', 60, status='fallback')])
+    assert _scores(store) == {'d0': 80.0}
+    store.compact()
+    assert _scores(store) == {'d0': 80.0}
@@ -0,0 +1,70 @@
+import json
+
+from agents.task_queue import TaskQueue
+import worker
+from worker import QueueWorker
+
+
+DEAL = {
+    "key": "d0",
+    "acquirer": {"name": "Shopify", "industry": "E-commerce/Retail"},
+    "target": {"name": "Deliverr", "industry": "E-commerce/Retail"}
+}
+
+
+class StubCollector:
+    def collect_deal_data(self, **kwargs):
+        return {"acquirer": {"data_sources": []}, "target": {"data_sources": []}}
+
+
+def _worker(queue):
+    queue_worker = QueueWorker(queue)
+    queue_worker._collector = lambda mode: StubCollector()
+    queue_worker.handle_analyze = lambda payload, task_id=None: {"analysis": {"overall_score": 70}}
+    return queue_worker
+
+
+def test_expired_collect_lease_does_not_reanalyze_finished_deal(tmp_path):
+    queue = TaskQueue(str(tmp_path / 'queue.db'), visibility_timeout=0)
+    queue_worker = _worker(queue)
+    queue.enqueue('collect', {"deal": DEAL, "mode": 'fast'}, dedupe_key="collect:d0:fast")
+
+    collect = queue.lease('w1', ['collect'])
+    queue_worker.handle_collect(collect.payload, collect.id)
+    analyze = queue.lease('w1', ['analyze'])
+    queue_worker.run_task(analyze, 'w1')
+    assert queue.stats()['analyze'] == {'done': 1}
+
+    # The first collect attempt's lease expired before it completed: another worker re-runs it
+    rerun = queue.lease('w2', ['collect'])
+    assert rerun.id == collect.id
+    queue_worker.run_task(rerun, 'w2')
+
+    assert queue.stats()['analyze'] == {'done': 1}
+    assert queue.lease('w2', ['analyze']) is None
+
+
+def test_rescreen_after_done_analyzes_again(tmp_path):
+    queue = TaskQueue(str(tmp_path / 'queue.db'))
+    queue_worker = _worker(queue)
+    for _ in range(2):
+        queue.enqueue('collect', {"deal": DEAL, "mode": 'fast'}, dedupe_key="collect:d0:fast")
+        queue_worker.run_task(queue.lease('w1', ['collect']), 'w1')
+        queue_worker.run_task(queue.lease('w1', ['analyze']), 'w1')
+    assert queue.stats()['analyze'] == {'done': 2}
+
+
+def test_export_records_have_status_and_completed_at(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = TaskQueue(path)
+    queue_worker = _worker(queue)
+    queue.enqueue('collect', {"deal": DEAL, "mode": 'fast'})
+    queue_worker.run_task(queue.lease('w1', ['collect']), 'w1')
+    queue_worker.run_task(queue.lease('w1', ['analyze']), 'w1')
+
+    output = tmp_path / 'results.jsonl'
+    assert worker.main(['--queue', path, 'export', str(output)]) == 0
+    record = json.loads(output.read_text().splitlines()[0])
+    assert record['key'] == 'd0'
+    assert record['status'] == 'ok'
+    assert len(record['completed_at']) == len("2026-01-01 00:00:00")
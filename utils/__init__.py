@@ -6,6 +6,11 @@ from .visualizations import (
     create_radar_chart,
     create_gauge_chart,
     create_dimension_bar_chart,
+    create_recommendation_chart,
+    create_distribution_heatmap,
+    radar_thumbnail_svg,
+    thumbnail_data_uri,
+    render_thumbnails,
     get_recommendation_color,
     get_recommendation_emoji
 )
@@ -14,6 +19,11 @@ __all__ = [
     'create_radar_chart',
     'create_gauge_chart',
     'create_dimension_bar_chart',
+    'create_recommendation_chart',
+    'create_distribution_heatmap',
+    'radar_thumbnail_svg',
+    'thumbnail_data_uri',
+    'render_thumbnails',
     'get_recommendation_color',
     'get_recommendation_emoji'
 ]
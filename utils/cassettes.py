@@ -0,0 +1,119 @@
+"""
+Record/replay cassettes for website fetches and model calls
+
+Set CASSETTE_MODE to make runs deterministic without touching the network:
+
+    off     (default) call websites and models directly
+    record  make real calls and save each response to a cassette
+    replay  serve every call from cassettes; a missing cassette is an error
+    auto    replay when a cassette exists, otherwise record one
+
+Cassettes live under CASSETTE_DIR (default "cassettes") as one small
+gzipped JSON file per request, keyed by a hash of the request, so
+concurrent recorders never contend for a file. Replays wait for the
+recorded latency times CASSETTE_LATENCY_SCALE (default 1.0; 0 disables
+the delay).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+MODES = ('off', 'record', 'replay', 'auto')
+
+
+class CassetteMiss(LookupError):
+    """Replay mode found no cassette for a request"""
+
+
+class Cassette:
+    def __init__(self, root, mode='auto', latency_scale=1.0):
+        """
+        Store of recorded responses for one kind of request
+
+        Args:
+            root: Directory holding this kind's cassette files
+            mode: 'record', 'replay' or 'auto'
+            latency_scale: Multiplier for recorded latencies on replay
+        """
+        if mode not in MODES or mode == 'off':
+            raise ValueError(f"Unknown cassette mode '{mode}'. Use record, replay or auto.")
+        self.root = root
+        self.mode = mode
+        self.latency_scale = latency_scale
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json.gz")
+
+    def load(self, key):
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, entry):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def play(self, key, record, description=None):
+        """
+        Return the entry for key, replaying or recording it as the mode allows
+
+        Args:
+            key: Request key from Cassette.key()
+            record: Callable making the real request and returning a
+                JSON-serializable entry. Exceptions propagate and nothing
+                is saved, so transient failures aren't replayed forever.
+            description: Request shown in CassetteMiss errors
+
+        Returns:
+            dict: The entry, with the latency it took when recorded
+        """
+        if self.mode in ('replay', 'auto'):
+            entry = self.load(key)
+            if entry is not None:
+                delay = entry.get('latency', 0.0) * self.latency_scale
+                if delay > 0:
+                    time.sleep(delay)
+                return entry
+            if self.mode == 'replay':
+                raise CassetteMiss(f"No cassette recorded for {description or key} in {self.root}")
+
+        started = time.perf_counter()
+        entry = record()
+        entry['latency'] = round(time.perf_counter() - started, 4)
+        self.save(key, entry)
+        return entry
+
+
+def get_cassette(kind):
+    """
+    Build the cassette for kind ('http' or 'llm') from CASSETTE_* env vars
+
+    Returns:
+        Cassette, or None when CASSETTE_MODE is off
+    """
+    mode = os.getenv('CASSETTE_MODE', 'off').lower()
+    if mode == 'off':
+        return None
+    return Cassette(
+        os.path.join(os.getenv('CASSETTE_DIR', 'cassettes'), kind),
+        mode=mode,
+        latency_scale=float(os.getenv('CASSETTE_LATENCY_SCALE', '1.0'))
+    )
@@ -0,0 +1,251 @@
+"""
+Memory-mapped snapshot of the company knowledge base and stored profiles
+
+Loading a large knowledge base means parsing every entry and building the
+name index in each worker process. A snapshot does that once: the export
+step compiles entries, stored company profiles and the finished index into
+one immutable file, and workers open it with mmap. Opening reads only a
+small header; lookups binary-search the sorted name keys and decode just
+the entries they hit, and every process shares the pages through the OS
+page cache.
+
+Layout: magic, format version and header length, a JSON header giving each
+section's offset, size and dtype, then 8-byte aligned sections - sorted
+name keys with their offsets, the trigram index arrays of
+CompanyKnowledgeBase, and one compact JSON document per entry with an
+offset index.
+
+Build one from the knowledge base plus the profiles collected by earlier
+screens, then point COMPANY_KB_PATH at it:
+    python -m utils.company_snapshot companies.snap --profiles results.jsonl
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from utils.knowledge_base import (
+    DEFAULT_PATH, PROFILE_FIELDS, CompanyKnowledgeBase, load_knowledge_base, normalize_name
+)
+
+MAGIC = b'MAKBSNAP'
+FORMAT_VERSION = 1
+
+# Magic, format version, header length
+_PREFIX = struct.Struct('<8sII')
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def write_snapshot(kb, path):
+    """
+    Compile an in-memory CompanyKnowledgeBase into a snapshot file
+
+    Returns:
+        int: Bytes written
+    """
+    key_bytes = [key.encode('utf-8') for key in kb._keys]
+    entry_bytes = [
+        json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for entry in kb.entries
+    ]
+    sections = [
+        ('key_offsets', np.cumsum([0, *map(len, key_bytes)], dtype=np.uint64)),
+        ('key_blob', b''.join(key_bytes)),
+        ('key_entries', kb._key_entries.astype(np.int32)),
+        ('gram_counts', kb._gram_counts.astype(np.int32)),
+        ('grams', kb._grams.astype('<U3')),
+        ('gram_offsets', kb._gram_offsets.astype(np.int64)),
+        ('postings', kb._postings.astype(np.int32)),
+        ('entry_offsets', np.cumsum([0, *map(len, entry_bytes)], dtype=np.uint64)),
+        ('entry_blob', b''.join(entry_bytes))
+    ]
+
+    layout, offset = {}, 0
+    for name, data in sections:
+        size = data.nbytes if isinstance(data, np.ndarray) else len(data)
+        layout[name] = [offset, size, data.dtype.str if isinstance(data, np.ndarray) else 'bytes']
+        offset = _align(offset + size)
+    header = json.dumps({
+        "entries": len(kb.entries),
+        "keys": len(key_bytes),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sections": layout
+    }).encode('utf-8')
+    base = _align(_PREFIX.size + len(header))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, data in sections:
+            f.seek(base + layout[name][0])
+            f.write(data.tobytes() if isinstance(data, np.ndarray) else data)
+        f.truncate(base + offset)
+    os.replace(tmp_path, path)
+    return base + offset
+
+
+class CompanySnapshot(CompanyKnowledgeBase):
+    def __init__(self, path, cache_size=4096):
+        """
+        Open a snapshot written by write_snapshot, read-only and zero-copy
+
+        Args:
+            path: Snapshot file
+            cache_size: Lookups memoized per snapshot
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = _PREFIX.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a company snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} is snapshot format {version}, expected {FORMAT_VERSION} - rebuild it")
+        self.header = json.loads(self._mm[_PREFIX.size:_PREFIX.size + header_length])
+        base = _align(_PREFIX.size + header_length)
+
+        self._blobs = {}
+        arrays = {}
+        for name, (offset, size, dtype) in self.header['sections'].items():
+            if dtype == 'bytes':
+                self._blobs[name] = base + offset
+            else:
+                dtype = np.dtype(dtype)
+                arrays[name] = np.frombuffer(self._mm, dtype=dtype, count=size // dtype.itemsize, offset=base + offset)
+
+        self._key_offsets = arrays['key_offsets']
+        self._key_entries = arrays['key_entries']
+        self._gram_counts = arrays['gram_counts']
+        self._grams = arrays['grams']
+        self._gram_offsets = arrays['gram_offsets']
+        self._postings = arrays['postings']
+        self._entry_offsets = arrays['entry_offsets']
+        self._match = lru_cache(maxsize=cache_size)(self._find)
+
+    def __len__(self):
+        return self.header['entries']
+
+    def _key_count(self):
+        return self.header['keys']
+
+    def _key_bytes(self, k):
+        start = self._blobs['key_blob']
+        return self._mm[start + int(self._key_offsets[k]):start + int(self._key_offsets[k + 1])]
+
+    def _key(self, k):
+        return self._key_bytes(k).decode('utf-8')
+
+    def _key_index(self, key):
+        # Keys are sorted by code point, which is also their UTF-8 byte order
+        target = key.encode('utf-8')
+        low, high = 0, self._key_count()
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._key_count() and self._key_bytes(low) == target:
+            return int(self._key_entries[low])
+        return None
+
+    def _entry(self, index):
+        start = self._blobs['entry_blob']
+        return json.loads(self._mm[start + int(self._entry_offsets[index]):start + int(self._entry_offsets[index + 1])])
+
+
+def collected_profiles(results_paths):
+    """
+    Latest collected profile per company from screening results JSONL files
+
+    Only profiles gathered from a real source are kept: not ones that failed
+    to find data, and not ones that were themselves read from a stored
+    profile ('knowledge_base'), which would otherwise pass off old data as
+    newly collected. Each keeps the collected_at of its data.
+
+    Returns:
+        dict: normalized name -> (name, industry, profile)
+    """
+    profiles = {}
+    for path in results_paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                for side in ('acquirer', 'target'):
+                    company = (record.get('collected_data') or {}).get(side) or {}
+                    sources = [source for source in company.get('data_sources') or [] if source != 'knowledge_base']
+                    if not company.get('name') or not sources:
+                        continue
+                    key = normalize_name(company['name'])
+                    # Records from before collected_at existed were collected as they completed
+                    collected_at = company.get('collected_at') or record.get('completed_at') or ''
+                    if key in profiles and profiles[key][2]['collected_at'] > collected_at:
+                        continue
+                    profile = {field: company.get(field) for field in PROFILE_FIELDS}
+                    profile['data_sources'] = sources
+                    profile['collected_at'] = collected_at
+                    profiles[key] = (company['name'], company.get('industry'), profile)
+    return profiles
+
+
+def build_snapshot(output_path, kb_path=DEFAULT_PATH, results_paths=()):
+    """
+    Merge a knowledge base file with collected profiles and write a snapshot
+
+    Profiles attach to the entry whose name or alias matches exactly; the
+    rest become entries of their own, without context.
+
+    Returns:
+        dict: entries, profiles, keys and bytes of the snapshot
+    """
+    companies = [dict(entry) for entry in CompanyKnowledgeBase.load(kb_path).entries] if kb_path else []
+    index = {}
+    for position, company in enumerate(companies):
+        for name in [company['name'], *company['aliases']]:
+            index.setdefault(normalize_name(name), position)
+
+    profiles = collected_profiles(results_paths)
+    for key, (name, industry, profile) in profiles.items():
+        if key in index:
+            companies[index[key]]['profile'] = profile
+        else:
+            index[key] = len(companies)
+            companies.append({"name": name, "aliases": [], "industry": industry, "profile": profile})
+
+    kb = CompanyKnowledgeBase(companies)
+    size = write_snapshot(kb, output_path)
+    return {"entries": len(kb), "profiles": len(profiles), "keys": len(kb._keys), "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the company knowledge base and profiles into a snapshot")
+    parser.add_argument('output', help="Snapshot file to write (.snap)")
+    parser.add_argument('--kb', default=DEFAULT_PATH, help="Knowledge base file (JSONL, CSV or JSON)")
+    parser.add_argument('--profiles', nargs='*', default=[], metavar='RESULTS',
+                        help="Screening results JSONL files to take collected company profiles from")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = build_snapshot(args.output, args.kb, args.profiles)
+    print(f"📦 Wrote {summary['entries']} companies ({summary['profiles']} profiles, {summary['keys']} names) "
+          f"to {args.output}: {summary['bytes'] / 1e6:.1f} MB in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    snapshot = load_knowledge_base(args.output)
+    print(f"⚡ Opened in {(time.perf_counter() - started) * 1000:.1f} ms ({len(snapshot)} companies)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Content fingerprints for analysis inputs
+
+A fingerprint is a short hash of a value's canonical JSON, so equal
+content hashes equal however its dicts were built.
+"""
+
+import hashlib
+import json
+
+
+def content_hash(value, length=16):
+    """Hex digest of value's canonical JSON, truncated to length"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:length]
@@ -0,0 +1,74 @@
+"""
+Bucketed latency histograms with recent-sample percentiles
+"""
+
+import threading
+from collections import deque
+
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60, 120, float('inf')]
+
+# Pipeline stages range from millisecond parses to minute-long model calls
+STAGE_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf')]
+
+# Finer buckets for short waits such as time spent queued for a slot
+WAIT_BUCKETS = [0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, float('inf')]
+
+
+class LatencyHistogram:
+    def __init__(self, window=50, buckets=None):
+        """
+        Cumulative bucketed latency histogram plus a sliding window for percentiles
+
+        Args:
+            window: Number of recent samples used for p95
+            buckets: Bucket upper bounds in seconds (default LATENCY_BUCKETS)
+        """
+        self.bounds = buckets or LATENCY_BUCKETS
+        self.counts = [0] * len(self.bounds)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(self.bounds):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+            self.total += seconds
+            self.count += 1
+            self.recent.append(seconds)
+
+    def percentile(self, pct):
+        """Return the pct percentile of recent samples, or None without samples"""
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def p95(self):
+        return self.percentile(95)
+
+    def snapshot(self):
+        """Return the histogram as a plain dict"""
+        with self._lock:
+            buckets = {}
+            running = 0
+            for bound, count in zip(self.bounds, self.counts):
+                running += count
+                buckets['+Inf' if bound == float('inf') else str(bound)] = running
+            count = self.count
+            total = self.total
+
+        return {
+            "buckets": buckets,
+            "count": count,
+            "sum": round(total, 6),
+            "p50": self.percentile(50),
+            "p95": self.p95()
+        }
@@ -0,0 +1,356 @@
+"""
+Company knowledge base with a fuzzy name index
+
+Background on known companies ("what they're known for") feeds the analysis
+prompt. Entries come from a file - JSONL (default config/companies.jsonl,
+or COMPANY_KB_PATH), CSV or a JSON list - with a name, optional aliases,
+industry and context. Lookups go through three steps:
+
+    exact     the normalized name or an alias ("Shopify Inc." -> "shopify")
+    fuzzy     character trigram candidates ranked by Dice overlap, then
+              re-ranked by edit distance over the whole name and over its
+              first distinctive word ("Shopfy" -> "shopify", but not "Plain
+              Technologies" -> "plaid technologies")
+    miss      None; the prompt asks the model to research the company
+
+The index is built once per process (get_knowledge_base) and only read
+afterwards, so threads share it without locking. A COMPANY_KB_PATH ending
+in .snap opens a compiled snapshot instead (utils/company_snapshot.py):
+the same index, memory-mapped, with nothing to build.
+
+Check how names resolve, or (with no names) run the built-in CHECKS:
+    python -m utils.knowledge_base "Shopify Inc." salesforce --kb companies.jsonl
+    python -m utils.knowledge_base
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from itertools import count
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'companies.jsonl')
+
+# Trailing tokens dropped from names, so "Stripe, Inc." matches "Stripe"
+LEGAL_SUFFIXES = {
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited',
+    'llc', 'plc', 'gmbh', 'ag', 'sa', 'nv', 'bv', 'com'
+}
+
+# Words shared by many unrelated company names; a fuzzy match must also hold
+# for the first word that isn't one, so "Black Technologies" doesn't match
+# "Slack Technologies"
+GENERIC_WORDS = {
+    'the', 'and', 'of', 'technologies', 'technology', 'tech', 'software', 'labs', 'lab',
+    'group', 'systems', 'solutions', 'holdings', 'international', 'global', 'networks',
+    'digital', 'industries', 'services', 'partners', 'ventures', 'enterprises', 'ai', 'io'
+}
+
+# Company data an entry's stored 'profile' holds, as collected by DataCollector
+PROFILE_FIELDS = ('description', 'mission', 'founded', 'employees', 'headquarters')
+
+# Edit similarity (1 - distance / longer length) a fuzzy match must reach
+MIN_SIMILARITY = 0.85
+
+# Trigram candidates re-ranked by edit distance per fuzzy lookup
+FUZZY_CANDIDATES = 32
+
+
+def normalize_name(name):
+    """Lowercase, accent-free, punctuation-free name without legal suffixes"""
+    text = str(name).casefold().replace('&', ' and ')
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    # Dotted initials count as one token: "S.A." -> "sa"
+    text = re.sub(r'\b(?:[^\W_]\.){2,}', lambda initials: initials.group().replace('.', ''), text)
+    tokens = re.findall(r'[^\W_]+', text)
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def lead_word(key):
+    """First word of a normalized name that isn't in GENERIC_WORDS (else its first word)"""
+    tokens = key.split()
+    return next((token for token in tokens if token not in GENERIC_WORDS), tokens[0] if tokens else key)
+
+
+def _trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_similarity(a, b, min_similarity=0.0):
+    """
+    1 - Levenshtein distance / length of the longer string
+
+    Returns 0.0 as soon as the similarity is known to fall below
+    min_similarity, which skips most of the work for poor candidates.
+    """
+    if a == b:
+        return 1.0
+    longest = max(len(a), len(b))
+    max_distance = int((1.0 - min_similarity) * longest + 1e-9)
+    if not a or not b or abs(len(a) - len(b)) > max_distance:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return 0.0
+        previous = current
+    return max(0.0, 1.0 - previous[-1] / longest) if previous[-1] <= max_distance else 0.0
+
+
+class CompanyKnowledgeBase:
+    def __init__(self, companies, cache_size=4096):
+        """
+        Index company entries by normalized name, alias and trigram
+
+        Args:
+            companies: Iterable of dicts with 'name' and optional 'aliases'
+                (list), 'industry', 'website', 'context' and 'profile'
+                (collected company data, see DataCollector)
+            cache_size: Lookups memoized per knowledge base
+        """
+        self.entries = []
+        for company in companies:
+            if not company.get('name'):
+                continue
+            aliases = company.get('aliases') or []
+            if isinstance(aliases, str):
+                aliases = [alias for alias in aliases.split('|') if alias.strip()]
+            self.entries.append({**company, 'aliases': list(aliases)})
+
+        # Names claim their keys before any alias does; the first entry wins a tie
+        self._exact = {}
+        for pass_aliases in (False, True):
+            for index, entry in enumerate(self.entries):
+                for name in (entry['aliases'] if pass_aliases else [entry['name']]):
+                    key = normalize_name(name)
+                    if key and key not in self._exact:
+                        self._exact[key] = index
+
+        self._keys = sorted(self._exact)
+        self._key_entries = np.array([self._exact[key] for key in self._keys], dtype=np.int32)
+        self._build_trigram_index()
+        self._match = lru_cache(maxsize=cache_size)(self._find)
+
+    def _build_trigram_index(self):
+        # Inverted index over the sorted grams: postings[gram_offsets[g]:gram_offsets[g + 1]]
+        # are the keys containing grams[g]
+        gram_ids = defaultdict(count().__next__)
+        gram_column = []
+        self._gram_counts = np.empty(len(self._keys), dtype=np.int32)
+        for k, key in enumerate(self._keys):
+            grams = _trigrams(key)
+            gram_column.extend(map(gram_ids.__getitem__, grams))
+            self._gram_counts[k] = len(grams)
+
+        grams = sorted(gram_ids)
+        ranks = np.empty(len(grams), dtype=np.int32)
+        ranks[[gram_ids[gram] for gram in grams]] = np.arange(len(grams), dtype=np.int32)
+        gram_column = ranks[np.array(gram_column, dtype=np.int32)]
+        key_column = np.repeat(np.arange(len(self._keys), dtype=np.int32), self._gram_counts)
+
+        order = np.argsort(gram_column, kind='stable')
+        self._grams = np.array(grams, dtype='<U3')
+        self._postings = key_column[order]
+        self._gram_offsets = np.searchsorted(gram_column[order], np.arange(len(grams) + 1)).astype(np.int64)
+
+    @classmethod
+    def load(cls, path):
+        """Load entries from a .jsonl, .csv (aliases separated by '|') or .json file"""
+        with open(path, newline='', encoding='utf-8') as f:
+            if path.endswith('.csv'):
+                companies = list(csv.DictReader(f))
+            elif path.endswith('.jsonl'):
+                companies = [json.loads(line) for line in f if line.strip()]
+            else:
+                companies = json.load(f)
+        return cls(companies)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _key_index(self, key):
+        index = self._exact.get(key)
+        return None if index is None else int(index)
+
+    def _key(self, k):
+        return self._keys[k]
+
+    def _entry(self, index):
+        return self.entries[index]
+
+    def _key_count(self):
+        return len(self._keys)
+
+    def candidates(self, name, limit=5, min_similarity=0.0):
+        """
+        Closest entries to name by trigram overlap and edit distance
+
+        Args:
+            name: Company name as written
+            limit: Entries to return
+            min_similarity: Drop entries less similar than this
+
+        Returns:
+            list: (entry, similarity) tuples, best first
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+        query_grams = _trigrams(key)
+        lookup = np.array(sorted(query_grams), dtype='<U3')
+        positions = np.searchsorted(self._grams, lookup)
+        found = positions < len(self._grams)
+        found[found] = self._grams[positions[found]] == lookup[found]
+        grams = positions[found].tolist()
+        if not grams:
+            return []
+
+        shared = np.bincount(
+            np.concatenate([self._postings[self._gram_offsets[g]:self._gram_offsets[g + 1]] for g in grams]),
+            minlength=self._key_count()
+        )
+        dice = 2.0 * shared / (len(query_grams) + self._gram_counts)
+        hits = np.flatnonzero(shared)
+        if len(hits) > FUZZY_CANDIDATES:
+            hits = np.argpartition(-dice, FUZZY_CANDIDATES)[:FUZZY_CANDIDATES]
+
+        lead = lead_word(key)
+        best = {}
+        for k in hits[np.argsort(-dice[hits], kind='stable')].tolist():
+            entry = int(self._key_entries[k])
+            candidate = self._key(k)
+            # Shared generic words mustn't carry a match between different names
+            similarity = min(
+                edit_similarity(key, candidate, min_similarity),
+                edit_similarity(lead, lead_word(candidate), min_similarity)
+            )
+            if similarity > best.get(entry, -1.0) and similarity >= min_similarity:
+                best[entry] = similarity
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self._entry(entry), round(similarity, 3)) for entry, similarity in ranked]
+
+    def _find(self, name, min_similarity):
+        index = self._key_index(normalize_name(name))
+        if index is not None:
+            return self._entry(index), 'exact', 1.0
+        if min_similarity > 1.0:
+            return None
+        found = self.candidates(name, limit=1, min_similarity=min_similarity)
+        if found:
+            return found[0][0], 'fuzzy', found[0][1]
+        return None
+
+    def match(self, name, min_similarity=MIN_SIMILARITY):
+        """
+        Resolve a company name
+
+        Args:
+            name: Company name as written
+            min_similarity: Edit similarity a fuzzy match must reach
+                (above 1.0 allows exact name and alias matches only)
+
+        Returns:
+            tuple: (entry, 'exact' or 'fuzzy', similarity), or None
+        """
+        return self._match(name, min_similarity) if name else None
+
+    def context(self, name):
+        """The matched entry's context text, or None"""
+        found = self.match(name)
+        return found[0].get('context') if found else None
+
+    def profile(self, name):
+        """
+        Stored company data (see DataCollector) for an exact name or alias
+        match, or None; fuzzy matches are too risky to borrow a profile from
+        """
+        found = self.match(name, min_similarity=2.0)
+        return found[0].get('profile') if found else None
+
+
+# Names and the entry each should resolve to (None: no match) in the default
+# knowledge base; lookalikes sharing only generic words must not match
+CHECKS = [
+    ("Shopify Inc.", "Shopify"),
+    ("Shopfy", "Shopify"),
+    ("Salesforse", "Salesforce"),
+    ("Plaid Technologies", "Plaid"),
+    ("Slack Technolgies", "Slack"),
+    ("Plain Technologies", None),
+    ("Black Technologies", None),
+    ("Technologies", None),
+]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def load_knowledge_base(path):
+    """Open a compiled .snap snapshot, or load and index any other knowledge base file"""
+    if path.endswith('.snap'):
+        from utils.company_snapshot import CompanySnapshot
+        return CompanySnapshot(path)
+    return CompanyKnowledgeBase.load(path)
+
+
+def get_knowledge_base():
+    """The process-wide knowledge base from COMPANY_KB_PATH (default config/companies.jsonl)"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = load_knowledge_base(os.getenv('COMPANY_KB_PATH') or DEFAULT_PATH)
+    return _default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how company names resolve in the knowledge base")
+    parser.add_argument('names', nargs='*', help="Names to resolve (default: run CHECKS)")
+    parser.add_argument('--kb', default=os.getenv('COMPANY_KB_PATH') or DEFAULT_PATH,
+                        help="Knowledge base file or .snap snapshot")
+    parser.add_argument('--limit', type=int, default=3, help="Fuzzy candidates to show per name")
+    args = parser.parse_args()
+
+    kb = load_knowledge_base(args.kb)
+    print(f"📚 {len(kb)} companies in {args.kb}")
+    if not args.names:
+        failed = 0
+        for name, expected in CHECKS:
+            found = kb.match(name)
+            resolved = found[0]['name'] if found else None
+            if resolved == expected:
+                print(f"✅ {name!r} → {resolved}")
+            else:
+                failed += 1
+                print(f"❌ {name!r} → {resolved}, expected {expected}")
+        return 1 if failed else 0
+
+    for name in args.names:
+        found = kb.match(name)
+        if found:
+            entry, kind, similarity = found
+            print(f"✅ {name!r} → {entry['name']} ({kind}, {similarity:.2f})")
+        else:
+            print(f"❌ {name!r} not found")
+        for entry, similarity in kb.candidates(name, limit=args.limit):
+            print(f"     {entry['name']}  {similarity:.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Process-wide pipeline metrics: timing histograms and counters
+
+Stages record into the shared REGISTRY with span()/observe()/inc(); the
+registry renders itself in the Prometheus text exposition format (served
+by service.py at /metrics) and as summary rows for the Streamlit sidebar.
+
+Metrics are per process. A pre-forked service exposes the metrics of
+whichever process answers the scrape, so label dashboards by pid.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.histogram import STAGE_BUCKETS, LatencyHistogram
+
+
+METRIC_HELP = {
+    "ma_stage_seconds": "Time spent in each analysis pipeline stage",
+    "ma_scrape_fetch_seconds": "Website fetch time by phase (connect, tls, ttfb, download, total)",
+    "ma_scrape_fetches_total": "Website fetches by outcome",
+    "ma_html_parse_seconds": "HTML parse and extraction time by page type",
+    "ma_model_latency_seconds": "Model call latency by model and outcome",
+    "ma_llm_tokens_total": "Tokens sent to and generated by each model",
+    "ma_parse_path_total": "Model responses by JSON parse path taken",
+    "ma_queue_wait_seconds": "Time spent waiting for a scheduler slot by pool and lane",
+    "ma_figure_cache_total": "Chart lookups in the figure cache by chart and outcome",
+    "ma_reanalysis_total": "Deals analyzed or carried forward from a previous screen",
+    "ma_dimension_cache_total": "Per-dimension analysis lookups by dimension and outcome"
+}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name, buckets=None, **labels):
+        """Get (or create) the histogram for name and labels"""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram(window=200, buckets=buckets or STAGE_BUCKETS)
+            return self._histograms[key]
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block into histogram name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def summary(self):
+        """
+        Summarize every histogram
+
+        Returns:
+            list: Dicts with metric, labels, count, mean, p50 and p95 (seconds)
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+
+        rows = []
+        for (name, labels), histogram in histograms:
+            snapshot = histogram.snapshot()
+            rows.append({
+                "metric": name,
+                "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                "count": snapshot['count'],
+                "mean": snapshot['sum'] / snapshot['count'] if snapshot['count'] else None,
+                "p50": snapshot['p50'],
+                "p95": snapshot['p95']
+            })
+        return rows
+
+    def counters(self):
+        """Return counters as {name: {labels: value}}"""
+        with self._lock:
+            items = sorted(self._counters.items())
+        counters = {}
+        for (name, labels), value in items:
+            counters.setdefault(name, {})[", ".join(f"{k}={v}" for k, v in labels)] = value
+        return counters
+
+    def prometheus_text(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram')
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def span(name, **labels):
+    return REGISTRY.span(name, **labels)
+
+
+def observe(name, seconds, **labels):
+    REGISTRY.observe(name, seconds, **labels)
+
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
@@ -0,0 +1,276 @@
+"""
+On-demand profiling for individual analyses and batch jobs
+
+Profiling is off unless asked for, per run (profile=True) or through env:
+
+    PROFILE_MODE         off (default), always, or sample
+    PROFILE_SAMPLE_RATE  fraction of runs profiled in sample mode (default 0.01)
+    PROFILE_DIR          where artifacts are written (default "profiles")
+    PROFILE_INTERVAL     stack sampling interval in seconds (default 0.005)
+
+Each profiled run gets its own directory, PROFILE_DIR/<run_id>/:
+
+    profile.pstats     cProfile stats for the run's thread (pstats, snakeviz)
+    stacks.folded      sampled stacks in collapsed format (flamegraph.pl, speedscope)
+    allocations.json   top allocation sites per pipeline stage (tracemalloc)
+    summary.json       stage timings, hottest functions and the artifact paths
+
+tracemalloc is process-wide, so allocations of a stage include whatever
+other threads allocated meanwhile; profile one run at a time for clean
+per-stage numbers.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+MODES = ('off', 'always', 'sample')
+
+TOP_ALLOCATIONS = 10
+TOP_FUNCTIONS = 20
+
+# Runs currently using tracemalloc, and whether we started it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def should_profile(enabled=None):
+    """
+    Decide whether to profile a run
+
+    Args:
+        enabled: True/False forces the decision; None follows PROFILE_MODE
+    """
+    if enabled is not None:
+        return enabled
+    mode = os.getenv('PROFILE_MODE', 'off').lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown PROFILE_MODE '{mode}'. Use off, always or sample.")
+    if mode == 'sample':
+        return random.random() < float(os.getenv('PROFILE_SAMPLE_RATE', '0.01'))
+    return mode == 'always'
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=0.005):
+        """
+        Sample one thread's call stack on a timer
+
+        Args:
+            thread_id: threading.get_ident() of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.paused = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.paused.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Samples in collapsed-stack format, one 'frame;frame;... count' per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RunProfile:
+    def __init__(self, label, profile_dir=None, interval=None):
+        """
+        cProfile, a stack sampler and tracemalloc around one run
+
+        Call mark(stage) as the run moves between stages (wrap_callback does
+        this from pipeline stage events) to split allocations by stage. The
+        run is the thread that calls start(); marks from other threads (e.g.
+        the leader of a coalesced call reporting progress) are ignored.
+        """
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-').lower()[:40] or 'run'
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+        self.label = label
+        self.dir = os.path.join(profile_dir or os.getenv('PROFILE_DIR', 'profiles'), self.run_id)
+        self.interval = interval or float(os.getenv('PROFILE_INTERVAL', '0.005'))
+        self.artifacts = None
+
+        self._profiler = cProfile.Profile()
+        self._thread_id = None
+        self._sampler = None
+        self._stages = []
+        self._stage = None
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ))
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = StackSampler(self._thread_id, self.interval)
+        _acquire_tracing()
+        self._started = time.perf_counter()
+        self._stage = ('start', self._started, self._snapshot())
+        self._sampler.start()
+        self._profiler.enable()
+        return self
+
+    def mark(self, stage):
+        """Close the current stage and start timing stage (only on the profiled thread)"""
+        # cProfile hooks the calling thread: toggling it from another thread
+        # would leave this run's profiler installed there
+        if threading.get_ident() != self._thread_id:
+            return
+        now = time.perf_counter()
+        # Snapshots are slow; keep them out of the CPU profiles and stage times
+        self._profiler.disable()
+        self._sampler.paused.set()
+        snapshot = self._snapshot()
+        name, started, previous = self._stage
+
+        # Growth per allocation site, largest first; freed memory isn't counted
+        grown = [stat for stat in snapshot.compare_to(previous, 'lineno') if stat.size_diff > 0]
+        self._stages.append({
+            "stage": name,
+            "seconds": round(now - started, 4),
+            "allocated_kb": round(sum(stat.size_diff for stat in grown) / 1024, 1),
+            "top_allocations": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count_diff
+                }
+                for stat in grown[:TOP_ALLOCATIONS]
+            ]
+        })
+        self._stage = (stage, time.perf_counter(), snapshot)
+        self._sampler.paused.clear()
+        self._profiler.enable()
+
+    def wrap_callback(self, progress_callback=None):
+        """Return a progress callback that marks stages before passing events on from any thread"""
+        def on_event(stage, detail=None):
+            self.mark(stage)
+            if progress_callback:
+                progress_callback(stage, detail)
+        return on_event
+
+    def stop(self):
+        """Stop profiling, write the artifacts and return their paths"""
+        self.mark('end')
+        self._profiler.disable()
+        self._sampler.stop()
+        _release_tracing()
+        seconds = time.perf_counter() - self._started
+
+        os.makedirs(self.dir, exist_ok=True)
+        paths = {
+            "pstats": os.path.join(self.dir, 'profile.pstats'),
+            "folded": os.path.join(self.dir, 'stacks.folded'),
+            "allocations": os.path.join(self.dir, 'allocations.json'),
+            "summary": os.path.join(self.dir, 'summary.json')
+        }
+
+        self._profiler.dump_stats(paths['pstats'])
+        with open(paths['folded'], 'w', encoding='utf-8') as f:
+            f.write(self._sampler.folded())
+        with open(paths['allocations'], 'w', encoding='utf-8') as f:
+            json.dump(self._stages, f, indent=2)
+
+        self.artifacts = {
+            "run_id": self.run_id,
+            "dir": self.dir,
+            "seconds": round(seconds, 4),
+            "samples": sum(self._sampler.stacks.values()),
+            **paths
+        }
+        with open(paths['summary'], 'w', encoding='utf-8') as f:
+            json.dump({
+                **self.artifacts,
+                "label": self.label,
+                "stages": [{k: s[k] for k in ('stage', 'seconds', 'allocated_kb')} for s in self._stages],
+                "top_functions": self._top_functions()
+            }, f, indent=2)
+
+        return self.artifacts
+
+    def _top_functions(self):
+        stats = pstats.Stats(self._profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        return [
+            {
+                "function": f"{func} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            }
+            for (filename, line, func), (_, calls, own, cumulative, _) in rows
+        ]
+
+
+@contextmanager
+def profile_run(label, enabled=None, profile_dir=None):
+    """
+    Profile the enclosed block if enabled (or PROFILE_MODE) says so
+
+    Yields:
+        RunProfile, or None when this run isn't profiled. After the block,
+        RunProfile.artifacts holds the paths of the written files.
+    """
+    if not should_profile(enabled):
+        yield None
+        return
+
+    profile = RunProfile(label, profile_dir).start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
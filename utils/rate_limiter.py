@@ -0,0 +1,67 @@
+"""
+Thread-safe token bucket rate limiter
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute, burst=None):
+        """
+        Initialize rate limiter
+
+        Args:
+            requests_per_minute: Sustained request rate
+            burst: Bucket size (defaults to one minute's worth, at least 1)
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, requests_per_minute))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self):
+        """Return the number of requests that could be made right now"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self):
+        """Take a token if one is available, without waiting"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a token
+
+        Returns:
+            bool: True if a token was taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
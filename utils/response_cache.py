@@ -0,0 +1,90 @@
+"""
+Content-addressed cache of parsed model responses
+
+Per-dimension analysis caches each dimension's result under the
+fingerprint of its prompt (see GeminiAnalyzer.fingerprint), so identical
+prompts - the same target's financial health across many acquirers, say -
+are answered once. Entries live in an in-process LRU and, when a directory
+is configured, as one small JSON file each so later runs reuse them too.
+
+    DIMENSION_CACHE_SIZE   entries kept in memory (default 4096, 0 disables)
+    DIMENSION_CACHE_DIR    directory for persisted entries (default: memory only)
+"""
+
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(self, max_entries=4096, root=None):
+        """
+        Least-recently-used cache of JSON-serializable results by key
+
+        Args:
+            max_entries: Entries kept in memory (0 disables the cache)
+            root: Optional directory persisting every entry across runs
+        """
+        self.max_entries = max_entries
+        self.root = root
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from DIMENSION_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv('DIMENSION_CACHE_SIZE', '4096')),
+            root=os.getenv('DIMENSION_CACHE_DIR') or None
+        )
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """A copy of the entry for key, or None"""
+        if not self.max_entries:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(self._entries[key])
+        if not self.root:
+            return None
+
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._remember(key, value)
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Store a copy of value under key"""
+        if not self.max_entries:
+            return
+        value = copy.deepcopy(value)
+        self._remember(key, value)
+        if self.root:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,485 @@
+"""
+Priority scheduling between interactive and bulk work
+
+Interactive analyses (the Streamlit UI, single API requests) and bulk
+screens (CLI, queue workers, batch jobs) share the same scraper and model
+capacity. A PriorityScheduler sits in front of that capacity: interactive
+work goes first and always has reserved slots, while bulk work ages so it
+is never starved outright.
+
+The model quota is shared by every process using the same API key, so
+with SCHEDULER_DB set, model calls are scheduled by a SharedPriorityScheduler
+instead: the same rules, applied across all processes (Streamlit, the HTTP
+service, cli.py and worker.py) through one SQLite file.
+
+The lane of the current work is carried in a context variable, so entry
+points only need to wrap their work in use_lane('bulk'). Work coalesced
+onto a call already in flight (see utils.singleflight) raises that call to
+its highest-priority caller's lane, even while it waits for a slot.
+"""
+
+import contextvars
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.histogram import WAIT_BUCKETS, LatencyHistogram
+
+
+LANES = ('interactive', 'bulk')
+
+# Lower runs first; a waiting job's priority drops by 1 every aging_seconds
+LANE_PRIORITY = {'interactive': 0, 'bulk': 1}
+
+
+def _check_lane(lane):
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane '{lane}'. Use one of: {', '.join(LANES)}")
+
+
+class LaneCell:
+    def __init__(self, lane, parent=None):
+        """
+        The lane of one piece of work, which can be raised while it runs
+
+        Args:
+            lane: Starting lane
+            parent: Cell of the enclosing work; raising it raises this one too
+        """
+        _check_lane(lane)
+        self._lane = lane
+        self.parent = parent
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def lane(self):
+        lane = self._lane
+        if self.parent is not None:
+            lane = min(lane, self.parent.lane, key=LANE_PRIORITY.get)
+        return lane
+
+    def raise_to(self, lane):
+        """Move to lane if it outranks the current one, notifying subscribers"""
+        _check_lane(lane)
+        with self._lock:
+            if LANE_PRIORITY[lane] >= LANE_PRIORITY[self._lane]:
+                return
+            self._lane = lane
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def subscribe(self, listener):
+        """Call listener() whenever this cell or an enclosing one is raised"""
+        cell = self
+        while cell is not None:
+            with cell._lock:
+                cell._listeners.append(listener)
+            cell = cell.parent
+
+    def unsubscribe(self, listener):
+        cell = self
+        while cell is not None:
+            with cell._lock:
+                cell._listeners.remove(listener)
+            cell = cell.parent
+
+
+# Interactive is the top lane, so the shared default cell can never be raised
+_current_lane = contextvars.ContextVar('analysis_lane', default=LaneCell('interactive'))
+
+
+def current_lane():
+    """Lane of the work running in this context ('interactive' unless set)"""
+    return _current_lane.get().lane
+
+
+def current_lane_cell():
+    """LaneCell of the work running in this context"""
+    return _current_lane.get()
+
+
+@contextmanager
+def use_lane(lane):
+    """Run the enclosed work in lane (a lane name or a LaneCell)"""
+    token = _current_lane.set(lane if isinstance(lane, LaneCell) else LaneCell(lane))
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class _Waiter:
+    __slots__ = ('cell', 'enqueued_at', 'seq', 'granted', 'granted_lane')
+
+    def __init__(self, cell, seq, enqueued_at=None):
+        self.cell = cell
+        self.enqueued_at = time.monotonic() if enqueued_at is None else enqueued_at
+        self.seq = seq
+        self.granted = False
+        self.granted_lane = None
+
+    @property
+    def lane(self):
+        return self.cell.lane
+
+
+def _grants(waiters, running, capacity, bulk_capacity, aging_seconds, now):
+    """
+    Waiters that may start now, highest priority first
+
+    Args:
+        waiters: _Waiter objects, with enqueued_at on the same clock as now
+        running: Running slots per lane, updated in place for each grant
+        capacity: Slots that can run at once
+        bulk_capacity: Slots bulk work may hold at once
+    """
+    def can_start(lane):
+        if sum(running.values()) >= capacity:
+            return False
+        return lane != 'bulk' or running['bulk'] < bulk_capacity
+
+    def priority(waiter):
+        aged = (now - waiter.enqueued_at) / aging_seconds if aging_seconds else 0.0
+        return (LANE_PRIORITY[waiter.lane] - aged, waiter.seq)
+
+    waiting = list(waiters)
+    granted = []
+    while True:
+        eligible = [waiter for waiter in waiting if can_start(waiter.lane)]
+        if not eligible:
+            return granted
+        waiter = min(eligible, key=priority)
+        waiting.remove(waiter)
+        running[waiter.lane] += 1
+        granted.append(waiter)
+
+
+class PriorityScheduler:
+    def __init__(self, capacity, reserved_interactive=None, aging_seconds=30, name=None):
+        """
+        Gate a pool of capacity slots by lane
+
+        Args:
+            capacity: Slots that can run at once
+            reserved_interactive: Slots bulk work can never take (default: a quarter, at least 1)
+            aging_seconds: Wait after which a bulk job outranks a newly arrived interactive one
+            name: Pool name for the ma_queue_wait_seconds metric (unreported if None)
+        """
+        if reserved_interactive is None:
+            reserved_interactive = max(1, capacity // 4)
+
+        self.capacity = capacity
+        # Bulk always keeps at least one slot so it can make progress
+        self.reserved_interactive = max(0, min(reserved_interactive, capacity - 1))
+        self.aging_seconds = aging_seconds
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._running = {lane: 0 for lane in LANES}
+        self._started = {lane: 0 for lane in LANES}
+        self._wait_times = {lane: LatencyHistogram(window=200, buckets=WAIT_BUCKETS) for lane in LANES}
+        self._seq = itertools.count()
+
+    def _dispatch(self):
+        """Hand free slots to the highest-priority waiters that may take them"""
+        granted = _grants(
+            self._waiters, self._running, self.capacity, self.capacity - self.reserved_interactive,
+            self.aging_seconds, time.monotonic()
+        )
+        for waiter in granted:
+            self._waiters.remove(waiter)
+            # Counted against the lane it started in, even if raised later
+            waiter.granted_lane = waiter.lane
+            self._started[waiter.granted_lane] += 1
+            waiter.granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _redispatch(self):
+        with self._cond:
+            self._dispatch()
+
+    def _observe_wait(self, lane, waited):
+        self._wait_times[lane].observe(waited)
+        if self.name:
+            metrics.REGISTRY.histogram('ma_queue_wait_seconds', buckets=WAIT_BUCKETS,
+                                       pool=self.name, lane=lane).observe(waited)
+
+    @contextmanager
+    def slot(self, lane=None, timeout=None):
+        """
+        Hold one slot for the enclosed work
+
+        Args:
+            lane: 'interactive' or 'bulk' (defaults to the current lane,
+                following it if it is raised while waiting)
+            timeout: Max seconds to wait for a slot (None waits indefinitely)
+        """
+        cell = LaneCell(lane) if lane else current_lane_cell()
+
+        with self._cond:
+            waiter = _Waiter(cell, next(self._seq))
+            self._waiters.append(waiter)
+            self._dispatch()
+
+        # A raised lane may take a slot the old one couldn't
+        cell.subscribe(self._redispatch)
+        try:
+            with self._cond:
+                deadline = None if timeout is None else waiter.enqueued_at + timeout
+                while not waiter.granted:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._waiters.remove(waiter)
+                        raise TimeoutError(f"Timed out waiting for a free {waiter.lane} slot")
+                    self._cond.wait(remaining)
+        finally:
+            cell.unsubscribe(self._redispatch)
+
+        lane = waiter.granted_lane
+        self._observe_wait(lane, time.monotonic() - waiter.enqueued_at)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[lane] -= 1
+                self._dispatch()
+
+    def stats(self):
+        """
+        Get per-lane load and queue wait times
+
+        Returns:
+            dict: Lane -> running, waiting, started and a wait-time histogram snapshot
+        """
+        with self._cond:
+            waiting = {lane: 0 for lane in LANES}
+            for waiter in self._waiters:
+                waiting[waiter.lane] += 1
+            stats = {
+                lane: {
+                    "running": self._running[lane],
+                    "waiting": waiting[lane],
+                    "started": self._started[lane]
+                }
+                for lane in LANES
+            }
+
+        for lane in LANES:
+            stats[lane]["wait_seconds"] = self._wait_times[lane].snapshot()
+        return stats
+
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lane_slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pool TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    state TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lane_slots_pool ON lane_slots (pool, state);
+"""
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedPriorityScheduler(PriorityScheduler):
+    def __init__(self, path, capacity, reserved_interactive=None, aging_seconds=30, name='model',
+                 poll_interval=0.05):
+        """
+        PriorityScheduler whose slots are shared by every process using path
+
+        Each waiting or running slot is a row in a SQLite table. Whoever
+        changes the table (a new waiter, a release, a waiter polling) grants
+        free slots to the highest-priority waiters of any process, so a bulk
+        screen in cli.py or worker.py yields to interactive analyses in the
+        app or the HTTP service. Processes sharing a pool should configure
+        the same model pool, since capacity is that of the process granting.
+        Rows of processes that died are dropped; all processes must run on
+        one machine.
+
+        Args:
+            path: SQLite file shared by the processes
+            capacity, reserved_interactive, aging_seconds: As PriorityScheduler, across all processes
+            name: Pool name; processes share slots of the pool with the same name
+            poll_interval: Longest wait between checks for slots freed by other processes
+        """
+        super().__init__(capacity, reserved_interactive, aging_seconds, name)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._pid = os.getpid()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SHARED_SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _dispatch_shared(self, conn):
+        """Grant free slots of the pool to the highest-priority waiting rows of any process"""
+        rows = conn.execute("SELECT * FROM lane_slots WHERE pool = ?", (self.name,)).fetchall()
+        dead = {row['pid'] for row in rows if row['pid'] != self._pid and not _pid_alive(row['pid'])}
+        if dead:
+            conn.execute(
+                f"DELETE FROM lane_slots WHERE pool = ? AND pid IN ({','.join('?' for _ in dead)})",
+                (self.name, *dead)
+            )
+            rows = [row for row in rows if row['pid'] not in dead]
+
+        running = {lane: 0 for lane in LANES}
+        waiters = []
+        for row in rows:
+            if row['state'] == 'running':
+                running[row['lane']] += 1
+            else:
+                waiters.append(_Waiter(LaneCell(row['lane']), row['id'], row['enqueued_at']))
+
+        granted = _grants(
+            waiters, running, self.capacity, self.capacity - self.reserved_interactive,
+            self.aging_seconds, time.time()
+        )
+        if granted:
+            conn.execute(
+                f"UPDATE lane_slots SET state = 'running' WHERE id IN ({','.join('?' for _ in granted)})",
+                [waiter.seq for waiter in granted]
+            )
+
+    def _poll(self, row_id, cell):
+        """Sync the waiting row's lane, dispatch, and return its state (None if gone)"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE lane_slots SET lane = ? WHERE id = ? AND state = 'waiting'", (cell.lane, row_id)
+            )
+            self._dispatch_shared(conn)
+            row = conn.execute("SELECT state, lane FROM lane_slots WHERE id = ?", (row_id,)).fetchone()
+        return row
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane=None, timeout=None):
+        """
+        Hold one slot of the shared pool for the enclosed work
+
+        Args:
+            lane: 'interactive' or 'bulk' (defaults to the current lane,
+                following it if it is raised while waiting)
+            timeout: Max seconds to wait for a slot (None waits indefinitely)
+        """
+        cell = LaneCell(lane) if lane else current_lane_cell()
+        started = time.monotonic()
+        with self._transaction() as conn:
+            row_id = conn.execute(
+                "INSERT INTO lane_slots (pool, lane, state, pid, enqueued_at) VALUES (?, ?, 'waiting', ?, ?)",
+                (self.name, cell.lane, self._pid, time.time())
+            ).lastrowid
+        with self._cond:
+            self._waiters.append(cell)
+
+        # A raised lane (or a slot freed in this process) is checked at once
+        cell.subscribe(self._wake)
+        try:
+            delay = 0.005
+            while True:
+                row = self._poll(row_id, cell)
+                if row is not None and row['state'] == 'running':
+                    break
+                waited = time.monotonic() - started
+                if timeout is not None and waited >= timeout:
+                    with self._transaction() as conn:
+                        conn.execute("DELETE FROM lane_slots WHERE id = ? AND state = 'waiting'", (row_id,))
+                    raise TimeoutError(f"Timed out waiting for a free {cell.lane} slot")
+                with self._cond:
+                    self._cond.wait(delay)
+                delay = min(delay * 2, self.poll_interval)
+        except BaseException:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM lane_slots WHERE id = ?", (row_id,))
+                self._dispatch_shared(conn)
+            raise
+        finally:
+            cell.unsubscribe(self._wake)
+            with self._cond:
+                self._waiters.remove(cell)
+
+        lane = row['lane']
+        with self._cond:
+            self._running[lane] += 1
+            self._started[lane] += 1
+        self._observe_wait(lane, time.monotonic() - started)
+        try:
+            yield
+        finally:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM lane_slots WHERE id = ?", (row_id,))
+                self._dispatch_shared(conn)
+            with self._cond:
+                self._running[lane] -= 1
+                self._cond.notify_all()
+
+    def shared_stats(self):
+        """Running and waiting slots per lane across every process sharing the pool"""
+        stats = {lane: {"running": 0, "waiting": 0} for lane in LANES}
+        with self._connect() as conn:
+            for row in conn.execute(
+                "SELECT lane, state, COUNT(*) AS n FROM lane_slots WHERE pool = ? GROUP BY lane, state", (self.name,)
+            ):
+                stats[row['lane']][row['state']] = row['n']
+        return stats
+
+    def stats(self):
+        """PriorityScheduler.stats() for this process, plus 'shared' counts across processes"""
+        stats = super().stats()
+        stats["shared"] = self.shared_stats()
+        return stats
+
+
+def get_scheduler(capacity, name):
+    """
+    Scheduler for capacity shared beyond this process, like the model quota
+
+    Returns a SharedPriorityScheduler over SCHEDULER_DB when it is set,
+    otherwise a PriorityScheduler for this process alone.
+    """
+    path = os.getenv('SCHEDULER_DB')
+    if path:
+        return SharedPriorityScheduler(path, capacity, name=name)
+    return PriorityScheduler(capacity, name=name)
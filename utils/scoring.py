@@ -0,0 +1,264 @@
+"""
+Vectorized scoring engine
+
+Analyses are held as an N deals x 5 dimensions score matrix, so overall
+scores and recommendation bands for every deal are recomputed in one
+matrix-vector product whenever the weights change, without new model
+calls. Single analyses are scored through the same functions.
+"""
+
+import numpy as np
+
+from config.scoring import DIMENSION_LABELS, DIMENSIONS, MISSING_SCORE, RECOMMENDATION_BANDS, get_weights
+
+# Band thresholds ascending, and labels[i] for scores in [thresholds[i-1], thresholds[i])
+_BAND_THRESHOLDS = np.array([minimum for minimum, _ in reversed(RECOMMENDATION_BANDS)][1:], dtype=float)
+_BAND_LABELS = np.array([label for _, label in reversed(RECOMMENDATION_BANDS)])
+
+
+def weight_vector(weights=None):
+    """
+    Normalized weight vector in DIMENSIONS order
+
+    Args:
+        weights: Dict of dimension -> weight (missing dimensions weigh 0),
+            a sequence of 5 weights, or None for get_weights()
+
+    Returns:
+        np.ndarray: Non-negative weights summing to 1
+    """
+    if weights is None:
+        weights = get_weights()
+    if isinstance(weights, dict):
+        unknown = set(weights) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions in weights: {', '.join(sorted(unknown))}")
+        vector = np.array([weights.get(dim, 0.0) for dim in DIMENSIONS], dtype=float)
+    else:
+        vector = np.asarray(weights, dtype=float)
+        if vector.shape != (len(DIMENSIONS),):
+            raise ValueError(f"Expected {len(DIMENSIONS)} weights, got {vector.shape}")
+
+    total = vector.sum()
+    if (vector < 0).any() or total <= 0:
+        raise ValueError("Weights must be non-negative and not all zero")
+    return vector / total
+
+
+def dimension_row(dimensions):
+    """Scores of one analysis's dimensions dict in DIMENSIONS order"""
+    return np.array([
+        _score(dimensions.get(dim)) for dim in DIMENSIONS
+    ], dtype=float)
+
+
+def _score(entry):
+    score = entry.get('score') if isinstance(entry, dict) else None
+    try:
+        return min(100.0, max(0.0, float(score)))
+    except (TypeError, ValueError):
+        return float(MISSING_SCORE)
+
+
+def overall_scores(scores, weights=None):
+    """
+    Weighted overall score per row of scores
+
+    Args:
+        scores: Array of shape (n, 5) or (5,)
+        weights: Anything weight_vector() accepts
+
+    Returns:
+        np.ndarray: Overall scores rounded to one decimal
+    """
+    return np.round(np.asarray(scores, dtype=float) @ weight_vector(weights), 1)
+
+
+def recommendations(overall):
+    """Recommendation label for each overall score"""
+    return _BAND_LABELS[np.searchsorted(_BAND_THRESHOLDS, np.asarray(overall, dtype=float), side='right')]
+
+
+def recommendation_for(score):
+    """Recommendation label for one overall score"""
+    return str(recommendations(score))
+
+
+def score_analysis(analysis, weights=None):
+    """
+    Overall score and recommendation of one analysis from its dimension scores
+
+    Returns:
+        tuple: (overall score, recommendation)
+    """
+    overall = float(overall_scores(dimension_row(analysis.get('dimensions') or {}), weights))
+    return overall, recommendation_for(overall)
+
+
+def chart_series(dimensions):
+    """
+    Labels and scores of the dimensions present in a dimensions dict
+
+    Returns:
+        tuple: (list of labels, np.ndarray of scores) in DIMENSIONS order
+    """
+    present = [dim for dim in DIMENSIONS if dim in dimensions]
+    row = dimension_row(dimensions)
+    return [DIMENSION_LABELS[dim] for dim in present], row[[DIMENSIONS.index(dim) for dim in present]]
+
+
+class ScoreMatrix:
+    def __init__(self, keys, scores, weights=None):
+        """
+        Dimension scores of many deals, re-weightable in one operation
+
+        Args:
+            keys: Deal key per row
+            scores: Array of shape (len(keys), 5) in DIMENSIONS order
+            weights: Anything weight_vector() accepts (default get_weights())
+        """
+        self.keys = list(keys)
+        self.scores = np.asarray(scores, dtype=float).reshape(len(self.keys), len(DIMENSIONS))
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self.reweight(weights)
+
+    @classmethod
+    def from_analyses(cls, analyses, keys=None, weights=None):
+        """Build from analysis dicts; keys default to their positions"""
+        analyses = list(analyses)
+        scores = np.empty((len(analyses), len(DIMENSIONS)))
+        for i, analysis in enumerate(analyses):
+            scores[i] = dimension_row(analysis.get('dimensions') or {})
+        return cls(range(len(analyses)) if keys is None else keys, scores, weights)
+
+    @classmethod
+    def from_records(cls, records, weights=None):
+        """Build from screening records, skipping deals without an analysis"""
+        records = [record for record in records if record.get('analysis')]
+        return cls.from_analyses(
+            [record['analysis'] for record in records],
+            keys=[record['key'] for record in records],
+            weights=weights
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def reweight(self, weights=None):
+        """Recompute every overall score and recommendation with new weights"""
+        self.weights = weight_vector(weights)
+        self.overall = overall_scores(self.scores, self.weights)
+        self.recommendations = recommendations(self.overall)
+        return self
+
+    def row(self, key):
+        """Dimension scores of one deal as a {dimension: score} dict"""
+        return dict(zip(DIMENSIONS, self.scores[self._index[key]].tolist()))
+
+    def ranking(self, limit=None):
+        """Deal keys ordered by overall score, best first"""
+        order = np.argsort(-self.overall, kind='stable')
+        return [self.keys[i] for i in order[:limit]]
+
+
+def weight_sensitivity(matrix, samples=1000, concentration=50.0, top_k=10, seed=None, chunk_size=250):
+    """
+    Monte Carlo sensitivity of a screen's ranking to the dimension weights
+
+    Samples weight vectors from a Dirichlet centred on the matrix's current
+    weights and re-scores every deal under each, a chunk of samples per
+    matrix product.
+
+    Args:
+        matrix: ScoreMatrix of the screen
+        samples: Weight vectors to sample
+        concentration: Dirichlet concentration; higher keeps samples closer
+            to the current weights
+        top_k: K for the probability of ranking in the top K
+        seed: Random seed for reproducible reports
+        chunk_size: Samples scored per batch, bounding memory to
+            chunk_size x len(matrix) floats
+
+    Returns:
+        dict: samples, concentration, top_k, mean_spearman (rank correlation
+        of sampled rankings with the current one) and deals, one dict per
+        deal in current rank order with key, overall, recommendation, rank,
+        mean_rank, rank_std, best_rank, worst_rank, p_top_k and flip_rate
+    """
+    if samples < 1:
+        raise ValueError(f"samples must be at least 1, got {samples}")
+    n = len(matrix)
+    rng = np.random.default_rng(seed)
+    alpha = np.maximum(matrix.weights * concentration, 1e-3)
+    scores = matrix.scores.astype(np.float32)
+
+    base_rank = np.empty(n, dtype=np.int32)
+    base_rank[np.argsort(-matrix.overall, kind='stable')] = np.arange(1, n + 1, dtype=np.int32)
+    # A deal flips when its sampled score leaves its current band
+    edges = np.concatenate(([-np.inf], _BAND_THRESHOLDS, [np.inf])).astype(np.float32)
+    band = np.searchsorted(_BAND_THRESHOLDS, matrix.overall, side='right')
+    band_low, band_high = edges[band], edges[band + 1]
+    positions = np.arange(1, n + 1, dtype=np.int32)
+    # Sort key per deal: descending score in tenths, then current rank for ties
+    key_type = np.int32 if 1002 * n < np.iinfo(np.int32).max else np.int64
+    tie_break = (base_rank - 1).astype(key_type)
+
+    shift_sum = np.zeros(n)
+    shift_sq_sum = np.zeros(n)
+    best_rank = np.full(n, n, dtype=np.int32)
+    worst_rank = np.zeros(n, dtype=np.int32)
+    top_k_count = np.zeros(n, dtype=np.int64)
+    flip_count = np.zeros(n, dtype=np.int64)
+    spearman = []
+
+    for start in range(0, samples, chunk_size):
+        weights = rng.dirichlet(alpha, size=min(chunk_size, samples - start)).astype(np.float32)
+        # (chunk, n): one row of overall scores per sampled weight vector
+        overall = np.round(weights @ scores.T, 1)
+
+        # Deals tied after rounding keep their current order, so ties don't read as rank spread;
+        # one integer key sorts several times faster than a two-key lexsort
+        key = -np.rint(overall * 10).astype(key_type) * key_type(n) + tie_break
+        order = np.argsort(key, axis=1)
+        ranks = np.empty(overall.shape, dtype=np.int32)
+        np.put_along_axis(ranks, order, positions[None, :], axis=1)
+        top_k_count += np.bincount(order[:, :top_k].ravel(), minlength=n)
+
+        # Rank shifts from the current ranking give both rank spread and Spearman's rho
+        shift = ranks - base_rank
+        shift_sq = np.square(shift, dtype=np.float64)
+        shift_sum += shift.sum(axis=0)
+        shift_sq_sum += shift_sq.sum(axis=0)
+        np.minimum(best_rank, ranks.min(axis=0), out=best_rank)
+        np.maximum(worst_rank, ranks.max(axis=0), out=worst_rank)
+        flip_count += ((overall < band_low) | (overall >= band_high)).sum(axis=0)
+
+        if n > 1:
+            spearman.extend((1 - 6 * shift_sq.sum(axis=1) / (n * (n * n - 1.0))).tolist())
+
+    mean_shift = shift_sum / samples
+    mean_rank = base_rank + mean_shift
+    rank_std = np.sqrt(np.maximum(shift_sq_sum / samples - mean_shift ** 2, 0.0))
+
+    deals = []
+    for i in np.argsort(base_rank):
+        deals.append({
+            "key": matrix.keys[i],
+            "overall": float(matrix.overall[i]),
+            "recommendation": str(matrix.recommendations[i]),
+            "rank": int(base_rank[i]),
+            "mean_rank": round(float(mean_rank[i]), 2),
+            "rank_std": round(float(rank_std[i]), 2),
+            "best_rank": int(best_rank[i]),
+            "worst_rank": int(worst_rank[i]),
+            "p_top_k": float(top_k_count[i]) / samples,
+            "flip_rate": float(flip_count[i]) / samples
+        })
+
+    return {
+        "samples": samples,
+        "concentration": concentration,
+        "top_k": top_k,
+        "mean_spearman": float(np.mean(spearman)) if spearman else 1.0,
+        "deals": deals
+    }
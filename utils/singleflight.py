@@ -0,0 +1,125 @@
+"""
+Single-flight coalescing of concurrent identical work
+"""
+
+import copy
+import threading
+from concurrent.futures import Future
+
+from utils.scheduler import LaneCell, current_lane, current_lane_cell, use_lane
+
+
+class _Progress:
+    """Fans a shared call's progress events out to every caller waiting on it"""
+
+    def __init__(self):
+        self.events = []
+        self.callbacks = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Send callback the events so far, then every later one"""
+        with self._lock:
+            for stage, detail in self.events:
+                callback(stage, detail)
+            self.callbacks.append(callback)
+
+    def __call__(self, stage, detail=None):
+        with self._lock:
+            self.events.append((stage, detail))
+            for callback in self.callbacks:
+                callback(stage, detail)
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesce concurrent calls that share a key
+
+        The first caller for a key runs the work; callers arriving while it
+        is in flight wait for and receive (a deep copy of) the same result or
+        exception. In-flight calls are tracked as concurrent.futures.Future
+        objects, so any number of threads can share one instance.
+
+        The work runs in its own scheduler lane, raised to the lane of the
+        highest-priority caller waiting on it: an interactive caller joining
+        a bulk caller's call isn't left waiting behind bulk work.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key, progress_callback=None):
+        """Return (future, is_leader) for key, subscribing progress_callback to its events"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                future.progress = _Progress()
+                future.lane = LaneCell(current_lane(), parent=current_lane_cell())
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+                future.lane.raise_to(current_lane())
+            if progress_callback:
+                future.progress.subscribe(progress_callback)
+            return future, leader
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless an identical call is already running
+
+        Returns:
+            The result of fn, shared with concurrent callers for the same key
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            with use_lane(future.lane):
+                result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+        self._finish(key, future, result=result)
+        return result
+
+    def do_with_progress(self, key, fn, *args, progress_callback=None, **kwargs):
+        """
+        do() for work that reports progress
+
+        fn is called with a progress_callback that forwards each (stage,
+        detail) event to every caller sharing the call; callers that join
+        late first receive the events sent so far.
+
+        Returns:
+            The result of fn, shared with concurrent callers for the same key
+        """
+        future, leader = self._join(key, progress_callback)
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            with use_lane(future.lane):
+                result = fn(*args, progress_callback=future.progress, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+        self._finish(key, future, result=result)
+        return result
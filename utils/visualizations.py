@@ -1,43 +1,114 @@
 """
 Visualization utilities for M&A analysis dashboard
+
+Score charts are memoized in FIGURES, keyed by chart, theme and the scores
+drawn, so Streamlit reruns and tab switches reuse figures instead of
+rebuilding them. Figures are shared between sessions: treat them as
+read-only. FIGURE_CACHE_SIZE bounds the cache (default 512 figures);
+portfolio thumbnails have their own cache, THUMBNAILS, so a page of them
+can't evict the charts of the deal being viewed.
 """
 
+import base64
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
+
+from config.scoring import DIMENSION_LABELS, DIMENSIONS
+from utils import metrics
+from utils.scoring import chart_series
+
+# Text colors per Streamlit theme type
+THEMES = {
+    'dark': {'text': '#FFFFFF', 'bar_text': '#333', 'grid': 'lightgray'},
+    'light': {'text': '#31333F', 'bar_text': '#31333F', 'grid': 'lightgray'}
+}
+
+THUMBNAIL_SIZE = 64
+
+
+def _theme(theme):
+    if theme not in THEMES:
+        raise ValueError(f"Unknown chart theme '{theme}'. Use one of: {', '.join(THEMES)}")
+    return THEMES[theme]
+
+
+class FigureCache:
+    def __init__(self, max_entries=None):
+        """
+        Bounded least-recently-used cache of built charts
+
+        Args:
+            max_entries: Charts kept (or set FIGURE_CACHE_SIZE, default 512)
+        """
+        self.max_entries = max_entries or int(os.getenv('FIGURE_CACHE_SIZE', '512'))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """Return the chart cached under key, building it with build() on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                metrics.inc('ma_figure_cache_total', chart=key[0], outcome='hit')
+                return self._entries[key]
+
+        # Built outside the lock; two sessions missing at once both build, one wins
+        value = build()
+        metrics.inc('ma_figure_cache_total', chart=key[0], outcome='miss')
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
-def create_radar_chart(dimensions_data):
+FIGURES = FigureCache()
+THUMBNAILS = FigureCache(max_entries=int(os.getenv('THUMBNAIL_CACHE_SIZE', '4096')))
+
+
+def create_radar_chart(dimensions_data, theme='dark'):
     """
     Create radar chart for 5 strategic dimensions
     
     Args:
         dimensions_data: dict with dimension scores
+        theme: 'dark' or 'light'
     
     Returns:
-        plotly figure
+        plotly figure (memoized; don't modify)
     """
     # Extract dimension names and scores
-    dimensions = {
-        'technology_synergy': 'Technology Synergy',
-        'market_overlap': 'Market Overlap',
-        'product_complementarity': 'Product Complementarity',
-        'cultural_alignment': 'Cultural Alignment',
-        'financial_health': 'Financial Health'
-    }
-    
-    categories = []
-    scores = []
-    
-    for key, label in dimensions.items():
-        if key in dimensions_data:
-            categories.append(label)
-            scores.append(dimensions_data[key].get('score', 0))
+    categories, scores = chart_series(dimensions_data)
+    scores = tuple(scores.tolist())
     
+    return FIGURES.get(
+        ('radar', theme, tuple(categories), scores),
+        lambda: _build_radar_chart(categories, scores, _theme(theme))
+    )
+
+
+def _build_radar_chart(categories, scores, palette):
     # Create radar chart
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
-        r=scores,
+        r=list(scores),
         theta=categories,
         fill='toself',
         fillcolor='rgba(0, 128, 96, 0.2)',  # Shopify green with transparency
@@ -52,10 +123,10 @@ def create_radar_chart(dimensions_data):
                 visible=True,
                 range=[0, 100],
                 tickfont=dict(size=10),
-                gridcolor='lightgray'
+                gridcolor=palette['grid']
             ),
             angularaxis=dict(
-                tickfont=dict(size=11, color='#FFFFFF')
+                tickfont=dict(size=11, color=palette['text'])
             )
         ),
         showlegend=False,
@@ -68,17 +139,26 @@ def create_radar_chart(dimensions_data):
     return fig
 
 
-def create_gauge_chart(overall_score, recommendation):
+def create_gauge_chart(overall_score, recommendation, theme='dark'):
     """
     Create gauge chart for overall fit score
     
     Args:
         overall_score: numeric score 0-100
         recommendation: text recommendation
+        theme: 'dark' or 'light'
     
     Returns:
-        plotly figure
+        plotly figure (memoized; don't modify)
     """
+    # The gauge only draws the score
+    return FIGURES.get(
+        ('gauge', theme, overall_score),
+        lambda: _build_gauge_chart(overall_score, _theme(theme))
+    )
+
+
+def _build_gauge_chart(overall_score, palette):
     # Determine color based on score
     if overall_score >= 80:
         color = "#50B83C"  # Green
@@ -93,7 +173,7 @@ def create_gauge_chart(overall_score, recommendation):
         mode="gauge+number",
         value=overall_score,
         domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Overall Strategic Fit", 'font': {'size': 20, 'color': '#FFFFFF'}},
+        title={'text': "Overall Strategic Fit", 'font': {'size': 20, 'color': palette['text']}},
         number={'font': {'size': 50, 'color': color}},
         gauge={
             'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "darkgray"},
@@ -124,54 +204,42 @@ def create_gauge_chart(overall_score, recommendation):
     return fig
 
 
-def create_dimension_bar_chart(dimensions_data):
+def create_dimension_bar_chart(dimensions_data, theme='dark'):
     """
     Create horizontal bar chart for dimension scores
     
     Args:
         dimensions_data: dict with dimension scores
+        theme: 'dark' or 'light'
     
     Returns:
-        plotly figure
+        plotly figure (memoized; don't modify)
     """
-    dimensions = {
-        'technology_synergy': 'Technology Synergy',
-        'market_overlap': 'Market Overlap',
-        'product_complementarity': 'Product Complementarity',
-        'cultural_alignment': 'Cultural Alignment',
-        'financial_health': 'Financial Health'
-    }
+    categories, scores = chart_series(dimensions_data)
     
-    categories = []
-    scores = []
-    colors = []
-    
-    for key, label in dimensions.items():
-        if key in dimensions_data:
-            score = dimensions_data[key].get('score', 0)
-            categories.append(label)
-            scores.append(score)
-            
-            # Color based on score
-            if score >= 75:
-                colors.append('#50B83C')
-            elif score >= 60:
-                colors.append('#FFC453')
-            else:
-                colors.append('#FF8C42')
+    return FIGURES.get(
+        ('bar', theme, tuple(categories), tuple(scores.tolist())),
+        lambda: _build_dimension_bar_chart(categories, scores, _theme(theme))
+    )
+
+
+def _build_dimension_bar_chart(categories, scores, palette):
+    # Color based on score
+    colors = np.select([scores >= 75, scores >= 60], ['#50B83C', '#FFC453'], default='#FF8C42')
+    scores = [int(score) if score.is_integer() else score for score in scores.tolist()]
     
     fig = go.Figure(go.Bar(
         x=scores,
         y=categories,
         orientation='h',
-        marker=dict(color=colors),
+        marker=dict(color=colors.tolist()),
         text=scores,
         textposition='outside',
-        textfont=dict(size=12, color='#333')
+        textfont=dict(size=12, color=palette['bar_text'])
     ))
     
     fig.update_layout(
-        xaxis=dict(range=[0, 100], title="Score", gridcolor='lightgray'),
+        xaxis=dict(range=[0, 100], title="Score", gridcolor=palette['grid']),
         yaxis=dict(title=""),
         height=300,
         margin=dict(l=20, r=20, t=20, b=40),
@@ -182,6 +250,199 @@ def create_dimension_bar_chart(dimensions_data):
     return fig
 
 
+def create_recommendation_chart(counts):
+    """
+    Create bar chart of deals per recommendation band
+    
+    Args:
+        counts: dict of recommendation -> number of deals, in display order
+    
+    Returns:
+        plotly figure
+    """
+    labels = list(counts)
+    
+    fig = go.Figure(go.Bar(
+        x=labels,
+        y=list(counts.values()),
+        marker=dict(color=[get_recommendation_color(label) for label in labels]),
+        text=list(counts.values()),
+        textposition='outside'
+    ))
+    
+    fig.update_layout(
+        yaxis=dict(title="Deals", gridcolor='lightgray'),
+        height=300,
+        margin=dict(l=20, r=20, t=20, b=40),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    
+    return fig
+
+
+def create_distribution_heatmap(histograms, bins):
+    """
+    Create heatmap of score distributions, one row per dimension
+    
+    Args:
+        histograms: dict of 'overall' or dimension -> deal count per bin
+        bins: bin edges, one more than the counts per row
+    
+    Returns:
+        plotly figure
+    """
+    names = list(histograms)
+    labels = [DIMENSION_LABELS.get(name, name.title()) for name in names]
+    columns = [f"{low}-{high}" for low, high in zip(bins[:-1], bins[1:])]
+    
+    fig = go.Figure(go.Heatmap(
+        z=[histograms[name] for name in names],
+        x=columns,
+        y=labels,
+        colorscale=[[0, '#FFFFFF'], [1, '#008060']],
+        hovertemplate="%{y}<br>Score %{x}: %{z} deals<extra></extra>"
+    ))
+    
+    fig.update_layout(
+        xaxis=dict(title="Score"),
+        yaxis=dict(autorange='reversed'),
+        height=320,
+        margin=dict(l=20, r=20, t=20, b=40),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    
+    return fig
+
+
+def _thumbnail_scores(scores):
+    scores = tuple(round(float(score), 1) for score in scores)
+    if len(scores) != len(DIMENSIONS):
+        raise ValueError(f"Expected {len(DIMENSIONS)} scores, got {len(scores)}")
+    return scores
+
+
+def _build_thumbnail_svg(scores, size, palette):
+    # Same orientation as the radar chart: first dimension at 3 o'clock, counterclockwise
+    center = size / 2
+    radius = size / 2 - 2
+    
+    def polygon(values):
+        return " ".join(
+            f"{center + radius * value / 100 * math.cos(angle):.1f},"
+            f"{center - radius * value / 100 * math.sin(angle):.1f}"
+            for value, angle in zip(values, np.linspace(0, 2 * math.pi, len(values), endpoint=False))
+        )
+    
+    return (
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{size}' height='{size}' viewBox='0 0 {size} {size}'>"
+        f"<polygon points='{polygon([100] * len(scores))}' fill='none' stroke='{palette['grid']}' stroke-width='1'/>"
+        f"<polygon points='{polygon([50] * len(scores))}' fill='none' stroke='{palette['grid']}' stroke-width='0.5'/>"
+        f"<polygon points='{polygon(scores)}' fill='rgba(0, 128, 96, 0.35)' stroke='#008060' stroke-width='1.5'/>"
+        "</svg>"
+    )
+
+
+def radar_thumbnail_svg(scores, size=THUMBNAIL_SIZE, theme='dark'):
+    """
+    Create small static radar of dimension scores as an SVG document
+    
+    Drawn directly rather than through Plotly, so a page of hundreds of
+    deals renders in milliseconds.
+    
+    Args:
+        scores: scores in DIMENSIONS order
+        size: width and height in pixels
+        theme: 'dark' or 'light'
+    
+    Returns:
+        str: SVG markup (memoized)
+    """
+    scores = _thumbnail_scores(scores)
+    return THUMBNAILS.get(
+        ('thumbnail', theme, size, scores),
+        lambda: _build_thumbnail_svg(scores, size, _theme(theme))
+    )
+
+
+def thumbnail_data_uri(scores, size=THUMBNAIL_SIZE, theme='dark'):
+    """Radar thumbnail as a data URI, for image columns in tables"""
+    svg = radar_thumbnail_svg(scores, size, theme)
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+
+def _thumbnail_figure(scores, size, palette):
+    fig = _build_radar_chart([DIMENSION_LABELS[dim] for dim in DIMENSIONS], scores, palette)
+    fig.update_layout(
+        polar=dict(radialaxis=dict(showticklabels=False), angularaxis=dict(showticklabels=False)),
+        width=size,
+        height=size,
+        margin=dict(l=4, r=4, t=4, b=4)
+    )
+    return fig
+
+
+def _check_png_support():
+    """Fail early, before any rendering, if Plotly can't batch-export PNGs"""
+    if not hasattr(pio, 'write_images'):
+        raise RuntimeError("PNG thumbnails need plotly>=6.1 (pip install -U plotly), or use svg")
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        raise RuntimeError("PNG thumbnails need kaleido>=1.0 (pip install 'kaleido>=1.0'), or use svg") from None
+
+
+def render_thumbnails(score_rows, directory, fmt='svg', size=THUMBNAIL_SIZE, theme='dark'):
+    """
+    Write radar thumbnails for many deals, skipping ones already on disk
+    
+    Files are named by a hash of the scores, size and theme, so a deal is
+    rendered once however often it's listed. SVGs are drawn directly; PNGs
+    are rendered by Plotly in one batch, which needs plotly>=6.1, the
+    optional kaleido>=1.0 package and Chrome (plotly_get_chrome).
+    
+    Args:
+        score_rows: scores in DIMENSIONS order per deal
+        directory: where thumbnails are written
+        fmt: 'svg' or 'png'
+    
+    Returns:
+        list: file path per row of score_rows
+    """
+    if fmt not in ('svg', 'png'):
+        raise ValueError(f"Unknown thumbnail format '{fmt}'. Use svg or png.")
+    if fmt == 'png':
+        _check_png_support()
+    palette = _theme(theme)
+    os.makedirs(directory, exist_ok=True)
+    
+    paths = []
+    missing = {}
+    for scores in score_rows:
+        scores = _thumbnail_scores(scores)
+        digest = hashlib.sha1(repr((scores, size, theme)).encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(directory, f"radar-{digest}.{fmt}")
+        paths.append(path)
+        if not os.path.exists(path):
+            missing[path] = scores
+    
+    if fmt == 'svg':
+        for path, scores in missing.items():
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(radar_thumbnail_svg(scores, size, theme))
+            os.replace(tmp_path, path)
+    elif missing:
+        # One Kaleido session for the whole batch instead of one per image
+        pio.write_images(
+            [_thumbnail_figure(scores, size, palette) for scores in missing.values()],
+            list(missing), format='png', width=size, height=size
+        )
+    
+    return paths
+
+
 def get_recommendation_color(recommendation):
     """Get color for recommendation badge"""
     colors = {
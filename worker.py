@@ -0,0 +1,240 @@
+"""
+M&A Strategic Fit Analyzer - durable queue workers
+
+Deals are enqueued as 'collect' tasks; a completed collect task enqueues the
+deal's 'analyze' task. Run workers on every core (and on other machines that
+share the queue database) to spread a large screen out.
+
+Usage:
+    python worker.py enqueue deals.csv --mode fast
+    python worker.py work --processes 4 --threads 2 [--exit-when-empty]
+    python worker.py stats
+    python worker.py dead
+    python worker.py requeue [TASK_ID ...]
+    python worker.py export results.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from agents import DataCollector, GeminiAnalyzer
+from agents.pipeline import analyze_collected
+from agents.screening import load_deals
+from agents.task_queue import TaskQueue
+from scrapers import WebsiteScraper
+from utils.scheduler import use_lane
+
+
+class QueueWorker:
+    def __init__(self, queue, kinds=None):
+        """
+        Pulls tasks from the queue and runs them
+
+        Args:
+            queue: TaskQueue
+            kinds: Task kinds to handle (default: collect and analyze)
+        """
+        self.queue = queue
+        self.kinds = kinds or ['collect', 'analyze']
+        self._scraper = WebsiteScraper()
+        self._collectors = {}
+        self._analyzer = None
+        self._lock = threading.Lock()
+
+    def _collector(self, mode):
+        with self._lock:
+            if mode not in self._collectors:
+                self._collectors[mode] = DataCollector(mode=mode, scraper=self._scraper)
+            return self._collectors[mode]
+
+    def _get_analyzer(self):
+        with self._lock:
+            if self._analyzer is None:
+                self._analyzer = GeminiAnalyzer()
+            return self._analyzer
+
+    def handle_collect(self, payload, task_id=None):
+        deal = payload['deal']
+        collected_data = self._collector(payload['mode']).collect_deal_data(
+            acquirer_name=deal['acquirer']['name'],
+            acquirer_website=deal['acquirer'].get('website'),
+            acquirer_industry=deal['acquirer']['industry'],
+            target_name=deal['target']['name'],
+            target_website=deal['target'].get('website'),
+            target_industry=deal['target']['industry']
+        )
+
+        # Keyed to this collect task and enqueued once: a collect task re-run after
+        # its lease expired doesn't analyze the deal again, even if the first
+        # analyze task already finished, while a later re-screen of the deal does
+        self.queue.enqueue(
+            'analyze',
+            {"deal": deal, "mode": payload['mode'], "collected_data": collected_data},
+            dedupe_key=f"analyze:{deal['key']}:{payload['mode']}:{task_id}",
+            once=task_id is not None
+        )
+        return {"data_sources": {
+            side: collected_data[side].get('data_sources', []) for side in ('acquirer', 'target')
+        }}
+
+    def handle_analyze(self, payload, task_id=None):
+        result = analyze_collected(payload['deal'], payload['collected_data'], self._get_analyzer())
+        if result['analysis'].get('note'):
+            # Fallback analysis means the model call failed - let the queue retry
+            raise RuntimeError(result['analysis']['note'])
+        return result
+
+    def run_task(self, task, worker_id):
+        """Run one leased task, heartbeating its lease until it finishes"""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.queue.visibility_timeout / 3):
+                if not self.queue.heartbeat(task, worker_id):
+                    print(f"   ⚠️ Lost lease on task {task.id}")
+                    return
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            handler = getattr(self, f"handle_{task.kind}")
+            with use_lane('bulk'):
+                result = handler(task.payload, task.id)
+        except Exception as e:
+            print(f"❌ Task {task.id} ({task.kind}) attempt {task.attempts}/{task.max_attempts} failed: {e}")
+            self.queue.fail(task, worker_id, e)
+        else:
+            self.queue.complete(task, worker_id, result)
+            print(f"✅ Task {task.id} ({task.kind}) done")
+        finally:
+            done.set()
+
+    def run(self, worker_id, exit_when_empty=False, idle_sleep=1.0):
+        """Lease and run tasks until interrupted (or until the queue is drained)"""
+        while True:
+            task = self.queue.lease(worker_id, self.kinds)
+            if task is None:
+                if exit_when_empty and not self._has_pending():
+                    return
+                time.sleep(idle_sleep)
+                continue
+            self.run_task(task, worker_id)
+
+    def _has_pending(self):
+        stats = self.queue.stats()
+        return any(
+            counts.get('ready', 0) or counts.get('leased', 0)
+            for kind, counts in stats.items() if kind in self.kinds
+        )
+
+
+def _work_process(queue_path, visibility_timeout, threads, exit_when_empty):
+    load_dotenv()
+    queue = TaskQueue(queue_path, visibility_timeout=visibility_timeout)
+    worker = QueueWorker(queue)
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    runners = [
+        threading.Thread(target=worker.run, args=(f"{prefix}:{i}", exit_when_empty), daemon=True)
+        for i in range(threads)
+    ]
+    for runner in runners:
+        runner.start()
+    try:
+        for runner in runners:
+            runner.join()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Durable queue for large screens")
+    parser.add_argument('--queue', default=os.getenv('TASK_QUEUE_DB', 'task_queue.db'), help="Queue database")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="Add deals from a CSV/JSONL file")
+    enqueue.add_argument('deals')
+    enqueue.add_argument('--mode', choices=['fast', 'deep'], default='fast')
+
+    work = commands.add_parser('work', help="Run worker processes")
+    work.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    work.add_argument('--threads', type=int, default=2, help="Concurrent tasks per process")
+    work.add_argument('--visibility-timeout', type=int, default=300,
+                      help="Seconds before a silent worker's task is handed to another worker")
+    work.add_argument('--exit-when-empty', action='store_true')
+
+    commands.add_parser('stats', help="Show task counts")
+    commands.add_parser('dead', help="List dead-lettered tasks")
+
+    requeue = commands.add_parser('requeue', help="Retry dead-lettered tasks")
+    requeue.add_argument('task_ids', nargs='*', type=int)
+
+    export = commands.add_parser('export', help="Write completed analyses to JSONL")
+    export.add_argument('output')
+
+    args = parser.parse_args(argv)
+    queue = TaskQueue(args.queue)
+
+    if args.command == 'enqueue':
+        added = 0
+        deals = load_deals(args.deals)
+        for deal in deals:
+            if queue.enqueue('collect', {"deal": deal, "mode": args.mode},
+                             dedupe_key=f"collect:{deal['key']}:{args.mode}"):
+                added += 1
+        print(f"📥 Enqueued {added} deals ({len(deals) - added} already queued)")
+
+    elif args.command == 'work':
+        processes = [
+            multiprocessing.Process(
+                target=_work_process,
+                args=(args.queue, args.visibility_timeout, args.threads, args.exit_when_empty)
+            )
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+
+    elif args.command == 'stats':
+        print(json.dumps(queue.stats(), indent=2))
+
+    elif args.command == 'dead':
+        for task in queue.dead_letters():
+            print(f"{task['id']:>6} {task['kind']:<8} attempts={task['attempts']} {task['error']}")
+
+    elif args.command == 'requeue':
+        print(f"🔁 Requeued {queue.requeue_dead(args.task_ids)} tasks")
+
+    elif args.command == 'export':
+        count = 0
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for payload, result, completed_at in queue.iter_results('analyze'):
+                # Same record fields as a screen's results JSONL
+                f.write(json.dumps({
+                    "key": payload['deal']['key'],
+                    "status": "fallback" if result['analysis'].get('note') else "ok",
+                    "deal": payload['deal'],
+                    **result,
+                    "completed_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(completed_at))
+                }) + "\n")
+                count += 1
+        print(f"💾 Wrote {count} analyses to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())